@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "provider_lookup.settings")
 
 application = get_asgi_application()
+
+# Start loading the quick search prefix index as the worker starts, off the request path
+from search_function.autocomplete import start_autocomplete_index_load  # noqa: E402
+
+start_autocomplete_index_load()
@@ -10,12 +10,13 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from copy import deepcopy
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-from decouple import config
+from decouple import Csv, config
 
 # Replace the hardcoded values with:
 SECRET_KEY = config('SECRET_KEY')
@@ -58,6 +59,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "search_function.routers.ReplicaRoutingMiddleware",
+    "search_function.profiling.SQLProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "provider_lookup.urls"
@@ -116,6 +119,163 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Provider search
+# How search endpoints produce total_results when no ?count= is given:
+# 'exact' (cached COUNT(*)), 'estimated' (planner estimate) or 'capped'
+
+PROVIDER_COUNT_STRATEGY = config('PROVIDER_COUNT_STRATEGY', default='exact')
+
+PROVIDER_COUNT_CAP = config('PROVIDER_COUNT_CAP', default=10000, cast=int)
+
+PROVIDER_COUNT_CACHE_TIMEOUT = config('PROVIDER_COUNT_CACHE_TIMEOUT', default=3600, cast=int)
+
+# match=phonetic ranks at most this many distinct sound-alike spellings per
+# name by edit distance; matches with other spellings are listed after them
+
+PHONETIC_MAX_CANDIDATES = config('PHONETIC_MAX_CANDIDATES', default=1000, cast=int)
+
+# POST /api/providers/batch/ limits: NPIs per request and per ANY(%s) query
+
+BATCH_LOOKUP_MAX_NPIS = config('BATCH_LOOKUP_MAX_NPIS', default=10000, cast=int)
+
+BATCH_LOOKUP_CHUNK_SIZE = config('BATCH_LOOKUP_CHUNK_SIZE', default=5000, cast=int)
+
+# Rows fetched per server-side cursor round trip by /api/export/
+
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Serve search, advanced search, quick search and detail with the async
+# views (concurrent count and page queries); enable when running under ASGI
+
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+
+# Response cache for search, detail and suggestion endpoints: a per-worker
+# LRU (entries, seconds) in front of Django's cache. Set CACHE_REDIS_URL to
+# share the second tier across workers; RESPONSE_CACHE_TIMEOUT=0 disables it
+
+RESPONSE_CACHE_MAX_ENTRIES = config('RESPONSE_CACHE_MAX_ENTRIES', default=1000, cast=int)
+
+RESPONSE_CACHE_LOCAL_TTL = config('RESPONSE_CACHE_LOCAL_TTL', default=30, cast=int)
+
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=300, cast=int)
+
+CACHE_REDIS_URL = config('CACHE_REDIS_URL', default='')
+
+if CACHE_REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_REDIS_URL,
+        }
+    }
+
+# Snapshot written by `manage.py build_autocomplete_index` and rewritten by
+# every ingestion command; workers load it in the background. Unset: each
+# worker builds its quick search prefix index from the database
+
+AUTOCOMPLETE_INDEX_PATH = config('AUTOCOMPLETE_INDEX_PATH', default=None)
+
+# Snapshot of individual providers by NPI, written by load_nppes,
+# apply_nppes_delta and `manage.py build_npi_snapshot` and memory-mapped by
+# every worker; detail and batch lookups read it instead of Postgres while
+# it matches the current data version. Unset: always query Postgres
+
+NPI_SNAPSHOT_PATH = config('NPI_SNAPSHOT_PATH', default=None)
+
+# Per-request SQL profiling: query count and database time in a
+# Server-Timing header, query budgets logged when a view exceeds them, and
+# ?_profile=1 (staff only) for the statements and EXPLAIN inline
+
+SQL_PROFILING = config('SQL_PROFILING', default=True, cast=bool)
+
+# Database connection reuse. DB_POOL keeps a psycopg 3 pool (psycopg[pool])
+# of open connections per worker, sized by the DB_POOL_* settings (timeout:
+# seconds to wait for a free connection; max idle and lifetime in seconds).
+# Without it each thread keeps its connection for DB_CONN_MAX_AGE seconds.
+# Either way a reused connection is health-checked before it is handed out
+
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=2, cast=int)
+
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=10, cast=int)
+
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=10, cast=float)
+
+DB_POOL_MAX_IDLE = config('DB_POOL_MAX_IDLE', default=300, cast=float)
+
+DB_POOL_MAX_LIFETIME = config('DB_POOL_MAX_LIFETIME', default=3600, cast=float)
+
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)
+
+# Server-side prepared statements for the hot search page, count and detail
+# queries (search_function/prepared.py). Needs direct connections or a
+# session-mode pooler: PgBouncer in transaction mode cannot keep them
+
+DB_PREPARED_STATEMENTS = config('DB_PREPARED_STATEMENTS', default=False, cast=bool)
+
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+if DB_POOL:
+    # Django's pool replaces persistent connections (CONN_MAX_AGE must be 0)
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+            'max_idle': DB_POOL_MAX_IDLE,
+            'max_lifetime': DB_POOL_MAX_LIFETIME,
+        },
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+
+if DB_PREPARED_STATEMENTS:
+    DATABASES['default'].setdefault('OPTIONS', {}).update({
+        'server_side_binding': True,
+        # psycopg only honours prepare=True with a threshold set; one this
+        # high means nothing outside prepared_statements() is ever prepared
+        'prepare_threshold': 2 ** 31 - 1,
+    })
+
+# Read replicas for search traffic: comma-separated host[:port] list, same
+# database and credentials as the primary. search_function views read from
+# one per request (round_robin or least_loaded selection); writes,
+# ingestion and management commands stay on the primary. A replica more
+# than DB_REPLICA_MAX_LAG seconds behind, checked every
+# DB_REPLICA_CHECK_INTERVAL seconds, is taken out of rotation
+
+DB_REPLICA_HOSTS = config('DB_REPLICA_HOSTS', default='', cast=Csv())
+
+DB_REPLICA_SELECTION = config('DB_REPLICA_SELECTION', default='round_robin')
+
+DB_REPLICA_MAX_LAG = config('DB_REPLICA_MAX_LAG', default=30, cast=float)
+
+DB_REPLICA_CHECK_INTERVAL = config('DB_REPLICA_CHECK_INTERVAL', default=5, cast=float)
+
+# Seconds to wait when connecting to a replica, so an unreachable one is
+# found out quickly
+
+DB_REPLICA_CONNECT_TIMEOUT = config('DB_REPLICA_CONNECT_TIMEOUT', default=2, cast=int)
+
+DB_REPLICAS = []
+for number, replica in enumerate(DB_REPLICA_HOSTS, 1):
+    host, _, port = replica.partition(':')
+    DATABASES[f'replica_{number}'] = {
+        **deepcopy(DATABASES['default']),
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'OPTIONS': {
+            **deepcopy(DATABASES['default'].get('OPTIONS', {})),
+            'connect_timeout': DB_REPLICA_CONNECT_TIMEOUT,
+        },
+        # Tests read replicas through the test database
+        'TEST': {'MIRROR': 'default'},
+    }
+    DB_REPLICAS.append(f'replica_{number}')
+
+if DB_REPLICAS:
+    DATABASE_ROUTERS = ['search_function.routers.ReplicaRouter']
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
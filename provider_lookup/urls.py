@@ -17,28 +17,45 @@ Including another URLconf
 # provider_lookup/urls.py
 from django.contrib import admin
 from django.urls import path, include
+from django.db import DatabaseError
 from django.http import JsonResponse
+from search_function.stats import get_provider_stats
 
 def api_info(request):
+    try:
+        total_individual_providers = f'{get_provider_stats().total_individual_providers:,} providers available'
+    except DatabaseError:
+        # The index stays up while the database is unreachable or not yet migrated
+        total_individual_providers = 'unavailable'
     return JsonResponse({
         'message': 'Individual Healthcare Provider Lookup API',
         'version': '2.0',
         'description': 'Search for individual healthcare providers only (excludes organizations)',
-        'total_individual_providers': '6,881,257 providers available',
+        'total_individual_providers': total_individual_providers,
         'endpoints': {
             'search': {
                 'url': '/api/search/',
                 'method': 'GET/POST',
                 'description': 'Search individual providers by name, location, specialty',
                 'parameters': {
+                    'q': 'Free-text search over name, city and specialty, ranked by relevance',
                     'first_name': 'Provider first name',
                     'last_name': 'Provider last name', 
+                    'match': 'phonetic to also find names that sound alike (Smyth for Smith), closest spelling first',
                     'city': 'Practice city',
                     'state': 'US state abbreviation (e.g., CA, NY)',
                     'zip_code': 'ZIP code (5 or 9 digits)',
                     'specialty': 'Medical specialty',
+                    'lat': 'Latitude for radius search (with lon)',
+                    'lon': 'Longitude for radius search (with lat)',
+                    'near_zip': 'Radius search around this ZIP code instead of lat/lon',
+                    'radius_miles': 'Search radius in miles (default: 25, max: 250)',
+                    'sort': 'distance to order radius search results nearest first',
                     'page': 'Page number (default: 1)',
-                    'page_size': 'Results per page (max: 100, default: 25)'
+                    'page_size': 'Results per page (max: 100, default: 25)',
+                    'cursor': 'Keyset pagination cursor (empty for first page, then next_cursor/prev_cursor)',
+                    'group_by_specialty': 'Group results by specialty (true/false)',
+                    'group': 'Specialty group to page through when grouping'
                 }
             },
             'quick_search': {
@@ -57,11 +74,31 @@ def api_info(request):
                 'method': 'GET',
                 'description': 'Get detailed information for specific individual provider'
             },
+            'export': {
+                'url': '/api/export/',
+                'method': 'GET',
+                'description': 'Stream all matching individual providers (gzip with Accept-Encoding)',
+                'parameters': {
+                    'format': 'ndjson (default) or csv',
+                    '...': 'Same search parameters as /api/search/'
+                }
+            },
+            'provider_batch': {
+                'url': '/api/providers/batch/',
+                'method': 'POST',
+                'description': 'Look up to 10,000 individual providers by NPI in one request',
+                'parameters': {'npis': 'JSON list of NPIs'}
+            },
             'health_check': {
                 'url': '/api/health/',
                 'method': 'GET',
                 'description': 'Database connectivity and stats'
             },
+            'cache_stats': {
+                'url': '/api/cache-stats/',
+                'method': 'GET',
+                'description': 'Response cache hit/miss counts per endpoint (this worker)'
+            },
             'states': {
                 'url': '/api/states/',
                 'method': 'GET',
@@ -95,6 +132,8 @@ def api_info(request):
             'entity_types': 'Only individual providers (entity_type_code = 1) are included',
             'data_source': 'NPPES (National Plan and Provider Enumeration System)',
             'us_states_only': 'State dropdown limited to 50 US states + DC',
+            'profiling': 'Every response has a Server-Timing header (SQL queries, db and app time); '
+                         'staff can add _profile=1 for the statements and EXPLAIN inline',
             'search_tips': [
                 'Use first_name and last_name separately for better results',
                 'State must be 2-letter abbreviation (CA, NY, TX, etc.)',
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class SearchFunctionConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "search_function"
+
+    def ready(self):
+        from .prepared import install_preparing_cursor
+
+        connection_created.connect(install_preparing_cursor)
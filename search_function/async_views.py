@@ -0,0 +1,231 @@
+# search_function/async_views.py
+"""
+Async versions of the search, advanced search, quick search and detail views.
+
+Served in place of the sync views when ASYNC_VIEWS is enabled and the
+project runs under ASGI (provider_lookup/asgi.py). A waiting request then
+holds no worker thread, and the independent queries of a page - the result
+count and the page rows - run at the same time, each in its own thread pool
+worker on its own database connection. Responses are the same as the sync
+views'.
+"""
+import asyncio
+import json
+from contextlib import nullcontext
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+
+from .counts import COUNT_STRATEGIES, count_results
+from .geo import GeoSearchError
+from .models import Provider
+from .npi_snapshot import get_npi_snapshot
+from .pagination import CountedPaginator, InvalidCursor, KeysetPaginator
+from .prepared import prepared_statements
+from .profiling import query_budget
+from .response_cache import cache_response
+from .serializers import FastJsonResponse
+from .views import (
+    ProviderSearchService, advanced_search_result, count_info, cursor_pagination_info, cursor_unavailable,
+    grouped_search_data, page_number_or_first, provider_detail_data, quick_search_suggestions, search_result,
+)
+
+
+def _with_own_connection(func, *args):
+    # Threads outside the request thread keep their own connections;
+    # close them per CONN_MAX_AGE like request_finished does
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def in_own_connection(func, *args):
+    """Run a sync ORM call in a pool thread with its own database connection"""
+    return await sync_to_async(_with_own_connection, thread_sensitive=False)(func, *args)
+
+
+def _serialize(rows, serialize, prepare=False):
+    with prepared_statements() if prepare else nullcontext():
+        return [serialize(provider) for provider in rows]
+
+
+async def offset_page(queryset, page_number, page_size, result_count_args, serialize):
+    """OFFSET page and its count, fetched concurrently
+
+    serialize is a RowSerializer; page rows are fetched through its
+    values(). Returns (results, pagination). A page past the end is
+    replaced by the last page, as Paginator.get_page does.
+    """
+    number = page_number_or_first(page_number)
+    offset = (number - 1) * page_size
+    rows = serialize.values(queryset)
+    result_count, results = await asyncio.gather(
+        in_own_connection(count_results, queryset, *result_count_args),
+        # Each OFFSET is a statement of its own: only the first page is prepared
+        in_own_connection(_serialize, rows[offset:offset + page_size], serialize, number == 1),
+    )
+
+    paginator = CountedPaginator(rows, page_size, result_count)
+    if number > paginator.num_pages:
+        number = paginator.num_pages
+        offset = (number - 1) * page_size
+        results = await in_own_connection(_serialize, rows[offset:offset + page_size], serialize, number == 1)
+
+    return results, {
+        'current_page': number,
+        'total_pages': paginator.num_pages,
+        'has_next': number < paginator.num_pages,
+        'has_previous': number > 1,
+        **count_info(result_count)
+    }
+
+
+async def cursor_page(queryset, cursor, page_size, result_count_args, serialize):
+    """Keyset page, plus its count (concurrently) when result_count_args is given
+
+    Raises InvalidCursor.
+    """
+    def fetch():
+        page_obj = KeysetPaginator(serialize.values(queryset), page_size).get_page(cursor)
+        return page_obj, _serialize(page_obj, serialize)
+
+    if not result_count_args:
+        page_obj, results = await in_own_connection(fetch)
+        return results, cursor_pagination_info(page_obj)
+
+    (page_obj, results), result_count = await asyncio.gather(
+        in_own_connection(fetch),
+        in_own_connection(count_results, queryset, *result_count_args),
+    )
+    return results, {**cursor_pagination_info(page_obj), **count_info(result_count)}
+
+
+# Data version, ZIP centroid or phonetic spellings, count, page
+@query_budget(4)
+@cache_response('search', normalized=ProviderSearchService.FILTER_PARAMS, echo='search_params')
+async def search_providers_view(request):
+    """Main search view that handles both GET and POST requests"""
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    else:
+        data = request.GET
+
+    try:
+        queryset = await sync_to_async(ProviderSearchService.search_providers)(data)
+    except GeoSearchError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    count_strategy = data.get('count') or settings.PROVIDER_COUNT_STRATEGY
+    if count_strategy not in COUNT_STRATEGIES:
+        return JsonResponse({'error': f"count must be one of: {', '.join(COUNT_STRATEGIES)}"}, status=400)
+    count_args = (count_strategy, ProviderSearchService.canonical_params(data, ProviderSearchService.FILTER_PARAMS))
+
+    page_size = min(int(data.get('page_size', 25)), 100)
+
+    if data.get('group_by_specialty', 'false').lower() == 'true':
+        response_data = await in_own_connection(grouped_search_data, queryset, data, page_size)
+        return FastJsonResponse(response_data)
+
+    cursor = data.get('cursor')
+    if cursor is not None:
+        if cursor_unavailable(data):
+            return JsonResponse({'error': cursor_unavailable(data)}, status=400)
+        try:
+            results, pagination = await cursor_page(
+                queryset, cursor, page_size, count_args if data.get('count') else None, search_result
+            )
+        except InvalidCursor:
+            return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    else:
+        results, pagination = await offset_page(
+            queryset, data.get('page', 1), page_size, count_args, search_result
+        )
+        pagination['page_size'] = page_size
+
+    return FastJsonResponse({
+        'results': results,
+        'pagination': pagination,
+        'search_params': data
+    })
+
+
+# Data version, ZIP centroid or phonetic spellings, count, page
+@query_budget(4)
+@require_http_methods(["GET"])
+@cache_response(
+    'advanced_search',
+    normalized=ProviderSearchService.FILTER_PARAMS + ProviderSearchService.ADVANCED_PARAMS
+)
+async def advanced_search_view(request):
+    """Advanced search with multiple filters"""
+    try:
+        queryset = await sync_to_async(ProviderSearchService.advanced_search)(request.GET)
+    except GeoSearchError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    page_size = min(int(request.GET.get('page_size', 50)), 100)
+
+    count_strategy = request.GET.get('count') or settings.PROVIDER_COUNT_STRATEGY
+    if count_strategy not in COUNT_STRATEGIES:
+        return JsonResponse({'error': f"count must be one of: {', '.join(COUNT_STRATEGIES)}"}, status=400)
+    count_args = (count_strategy, ProviderSearchService.canonical_params(
+        request.GET, ProviderSearchService.FILTER_PARAMS + ProviderSearchService.ADVANCED_PARAMS
+    ))
+
+    cursor = request.GET.get('cursor')
+    if cursor is not None:
+        if cursor_unavailable(request.GET):
+            return JsonResponse({'error': cursor_unavailable(request.GET)}, status=400)
+        try:
+            results, pagination = await cursor_page(
+                queryset, cursor, page_size, count_args if request.GET.get('count') else None,
+                advanced_search_result
+            )
+        except InvalidCursor:
+            return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    else:
+        results, pagination = await offset_page(
+            queryset, request.GET.get('page', 1), page_size, count_args, advanced_search_result
+        )
+
+    return FastJsonResponse({
+        'results': results,
+        'pagination': pagination
+    })
+
+
+# Data version, plus a name search while the prefix index is still loading
+@query_budget(4)
+@require_http_methods(["GET"])
+@cache_response('quick_search', normalized=('q',))
+async def quick_search_view(request):
+    """Quick search endpoint for autocomplete/suggestions"""
+    query = request.GET.get('q', '').strip()
+    suggestions = await sync_to_async(quick_search_suggestions)(query)
+    return JsonResponse({'suggestions': suggestions})
+
+
+# Data version, taxonomy version, provider (unless the NPI snapshot has it)
+@query_budget(3)
+@require_http_methods(["GET"])
+@cache_response('provider_detail')
+async def provider_detail_view(request, npi):
+    """Get detailed information for a specific provider"""
+    snapshot = await sync_to_async(get_npi_snapshot)()
+    provider = snapshot.get(npi) if snapshot is not None else None
+    if provider is None:
+        # Only allow individual providers
+        with prepared_statements():
+            provider = await Provider.objects.filter(npi=npi, entity_type_code='1').afirst()
+    if provider is None:
+        return JsonResponse({'error': 'Individual provider not found'}, status=404)
+
+    return JsonResponse(await sync_to_async(provider_detail_data)(provider))
@@ -0,0 +1,343 @@
+# search_function/autocomplete.py
+"""
+In-memory prefix index for quick_search autocomplete.
+
+Every individual provider contributes two keys, "last first" and
+"first last", normalized to lowercase ASCII letters, digits and single
+spaces. Identical keys are merged into one entry whose weight is the number
+of providers sharing the name (its popularity) and which points at a
+representative NPI and that provider's display fields.
+
+Entries are kept sorted in a single bytes blob with an offsets array, so a
+prefix lookup is a binary search. The best entries for every short prefix
+(where a range can hold hundreds of thousands of names) are precomputed;
+longer prefixes scan a small, bounded range. The index can be built from
+the database or loaded from a snapshot file written by
+``manage.py build_autocomplete_index`` and rewritten by every ingestion
+command. Workers load it on a background thread at start and again once
+ingestion bumps the data version.
+"""
+import bisect
+import heapq
+import json
+import logging
+import os
+import re
+import threading
+import time
+from array import array
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .data_version import get_data_version
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b'PLAUTOCOMPLETE1\n'
+
+MIN_PREFIX_LENGTH = 2
+TOP_PREFIX_LENGTH = 4
+TOP_K = 10
+MAX_SCAN = 2000
+FIELD_SEPARATOR = '\x1f'
+NO_ENTRY = 0xFFFFFFFF
+
+# Keep in step with normalize_key()
+KEY_SQL = "regexp_replace(regexp_replace(lower(coalesce({column}, '')), '[^a-z0-9 ]', '', 'g'), ' +', ' ', 'g')"
+
+INDEX_SQL = f"""
+    WITH individuals AS (
+        SELECT npi, first_name, middle_name, last_name,
+               practice_city, practice_state, primary_taxonomy_code,
+               {KEY_SQL.format(column='last_name')} AS last_key,
+               {KEY_SQL.format(column='first_name')} AS first_key
+        FROM providers
+        WHERE entity_type_code = '1'
+    ),
+    keyed AS (
+        SELECT trim(last_key || ' ' || first_key) COLLATE "C" AS key, * FROM individuals
+        UNION ALL
+        SELECT trim(first_key || ' ' || last_key) COLLATE "C" AS key, * FROM individuals
+    )
+    SELECT DISTINCT ON (key)
+           key, COUNT(*) OVER (PARTITION BY key), npi, first_name, middle_name, last_name,
+           practice_city, practice_state, primary_taxonomy_code
+    FROM keyed
+    WHERE key <> ''
+    ORDER BY key, npi
+"""
+
+PAYLOAD_FIELDS = (
+    'first_name', 'middle_name', 'last_name',
+    'practice_city', 'practice_state', 'primary_taxonomy_code',
+)
+
+
+def normalize_key(text):
+    """Lowercase ASCII letters, digits and single spaces (mirrors KEY_SQL)"""
+    text = re.sub(r'[^a-z0-9 ]', '', (text or '').lower())
+    return re.sub(r' +', ' ', text).strip()
+
+
+class _Keys:
+    """Sequence view of the sorted entry keys, for bisect"""
+
+    def __init__(self, index):
+        self.index = index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, position):
+        record = self.index.record(position)
+        return record[:record.index(b'\x1f')]
+
+
+class PrefixIndex:
+    """Sorted, weighted name keys with NPI pointers and display payloads"""
+
+    def __init__(self, offsets, weights, npis, records, prefixes, prefix_top, version=0):
+        self.offsets = offsets
+        self.weights = weights
+        self.npis = npis
+        self.records = records
+        self.prefix_slots = {prefix: slot for slot, prefix in enumerate(prefixes)}
+        self.prefix_top = prefix_top
+        self.version = version
+        self.identity = None
+        self._keys = _Keys(self)
+
+    def __len__(self):
+        return len(self.weights)
+
+    def record(self, position):
+        return self.records[self.offsets[position]:self.offsets[position + 1]]
+
+    def entry(self, position):
+        """Decoded entry: key, weight, npi and the representative's display fields"""
+        key, *payload = self.record(position).decode().split(FIELD_SEPARATOR)
+        entry = dict(zip(PAYLOAD_FIELDS, (value or None for value in payload)))
+        entry.update(key=key, weight=self.weights[position], npi=f"{self.npis[position]:010d}")
+        return entry
+
+    def lookup(self, query, limit=TOP_K):
+        """Return up to limit entries whose key starts with query, most popular first"""
+        prefix = normalize_key(query)
+        if len(prefix) < MIN_PREFIX_LENGTH:
+            return []
+
+        slot = self.prefix_slots.get(prefix)
+        if slot is not None and limit <= TOP_K:
+            positions = self.prefix_top[slot * TOP_K:(slot + 1) * TOP_K]
+            return [self.entry(position) for position in positions[:limit] if position != NO_ENTRY]
+        if len(prefix) <= TOP_PREFIX_LENGTH and limit <= TOP_K:
+            # Short prefixes are all precomputed: absent means no match
+            return []
+
+        encoded = prefix.encode()
+        start = bisect.bisect_left(self._keys, encoded)
+        end = min(bisect.bisect_left(self._keys, encoded + b'\xff', start), start + MAX_SCAN)
+        best = heapq.nlargest(limit, range(start, end), key=lambda position: self.weights[position])
+        return [self.entry(position) for position in best]
+
+    @classmethod
+    def from_rows(cls, rows, version=0):
+        """Build from (key, weight, npi, *PAYLOAD_FIELDS) rows sorted by key"""
+        offsets = array('Q', [0])
+        weights = array('I')
+        npis = array('Q')
+        records = bytearray()
+        prefixes = []
+        prefix_top = array('I')
+        # One bounded heap per prefix length; rows arrive sorted, so each
+        # prefix's rows are contiguous and its heap is flushed when it ends
+        open_prefixes = {length: (None, []) for length in range(MIN_PREFIX_LENGTH, TOP_PREFIX_LENGTH + 1)}
+
+        def flush(prefix, heap):
+            if prefix is None:
+                return
+            prefixes.append(prefix)
+            best = [position for _weight, _neg, position in sorted(heap, reverse=True)]
+            prefix_top.extend(best + [NO_ENTRY] * (TOP_K - len(best)))
+
+        for position, (key, weight, npi, *payload) in enumerate(rows):
+            values = [(value or '').replace(FIELD_SEPARATOR, ' ') for value in payload]
+            records += FIELD_SEPARATOR.join([key] + values).encode()
+            offsets.append(len(records))
+            weights.append(min(weight, NO_ENTRY))
+            npis.append(int(npi))
+
+            for length, (prefix, heap) in open_prefixes.items():
+                if len(key) < length:
+                    continue
+                if key[:length] != prefix:
+                    flush(prefix, heap)
+                    prefix, heap = key[:length], []
+                    open_prefixes[length] = (prefix, heap)
+                # Ties go to the alphabetically first key
+                item = (weight, -position, position)
+                if len(heap) < TOP_K:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+
+        for prefix, heap in open_prefixes.values():
+            flush(prefix, heap)
+
+        return cls(offsets, weights, npis, bytes(records), prefixes, prefix_top, version)
+
+    @classmethod
+    def from_database(cls, chunk_size=10000):
+        """Build from the providers table, streaming rows through a server-side cursor"""
+        version = get_data_version(refresh=True)
+
+        def rows():
+            with transaction.atomic(), connection.chunked_cursor() as cursor:
+                cursor.execute(INDEX_SQL)
+                while True:
+                    chunk = cursor.fetchmany(chunk_size)
+                    if not chunk:
+                        break
+                    yield from chunk
+
+        return cls.from_rows(rows(), version)
+
+    def save(self, path):
+        """Write a snapshot that load() can map back in without touching Postgres"""
+        header = {
+            'version': self.version,
+            'entries': len(self),
+            'record_bytes': len(self.records),
+            'prefixes': sorted(self.prefix_slots, key=self.prefix_slots.get),
+            'top_k': TOP_K,
+            'typecodes': [self.offsets.typecode, self.weights.typecode, self.npis.typecode],
+        }
+        temporary = f"{path}.tmp"
+        with open(temporary, 'wb') as handle:
+            handle.write(SNAPSHOT_MAGIC)
+            handle.write(json.dumps(header).encode() + b'\n')
+            self.offsets.tofile(handle)
+            self.weights.tofile(handle)
+            self.npis.tofile(handle)
+            handle.write(self.records)
+            self.prefix_top.tofile(handle)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as handle:
+            if handle.readline() != SNAPSHOT_MAGIC:
+                raise ValueError(f"{path} is not an autocomplete snapshot")
+            header = json.loads(handle.readline())
+            if header['top_k'] != TOP_K:
+                raise ValueError(f"{path} was built with a different TOP_K")
+
+            offsets_code, weights_code, npis_code = header['typecodes']
+            entries = header['entries']
+            offsets, weights, npis = array(offsets_code), array(weights_code), array(npis_code)
+            offsets.fromfile(handle, entries + 1)
+            weights.fromfile(handle, entries)
+            npis.fromfile(handle, entries)
+            records = handle.read(header['record_bytes'])
+            prefix_top = array('I')
+            prefix_top.fromfile(handle, len(header['prefixes']) * TOP_K)
+
+        return cls(offsets, weights, npis, records, header['prefixes'], prefix_top, header['version'])
+
+
+_index = None
+_index_lock = threading.Lock()
+_loader = None
+
+
+def snapshot_identity(path):
+    """(device, inode, mtime) of the snapshot file, or None if there is none"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_dev, stat.st_ino, stat.st_mtime_ns
+
+
+def load_autocomplete_index():
+    """Load the snapshot named by AUTOCOMPLETE_INDEX_PATH, or build from the database
+
+    A snapshot older than the current data version is still loaded: every
+    ingestion command rewrites it right after bumping the version, which
+    is far cheaper than each worker scanning providers itself.
+    """
+    started = time.monotonic()
+    path = getattr(settings, 'AUTOCOMPLETE_INDEX_PATH', None)
+    identity = snapshot_identity(path) if path else None
+    if identity is not None:
+        index = PrefixIndex.load(path)
+        source = path
+        if index.version < get_data_version():
+            logger.warning("Autocomplete snapshot %s is at data version %s - using it until it is rewritten",
+                           path, index.version)
+    else:
+        index = PrefixIndex.from_database()
+        source = 'database'
+    index.identity = identity
+    logger.info("Autocomplete index: %s entries from %s in %.1fs", len(index), source, time.monotonic() - started)
+    return index
+
+
+def refresh_autocomplete_index():
+    """Rewrite AUTOCOMPLETE_INDEX_PATH after a data version bump; (entries, version), or None if unset
+
+    Workers pick the new snapshot up in the background, so each command
+    that bumps the provider data version calls this.
+    """
+    path = getattr(settings, 'AUTOCOMPLETE_INDEX_PATH', None)
+    if not path:
+        return None
+    index = PrefixIndex.from_database()
+    index.save(path)
+    return len(index), index.version
+
+
+def _load_in_background():
+    global _index
+    try:
+        _index = load_autocomplete_index()
+    except Exception:
+        logger.exception("Autocomplete index load failed")
+    finally:
+        connection.close()
+
+
+def start_autocomplete_index_load():
+    """Load the index on a background thread unless a load is already running
+
+    Called at worker start and whenever a request finds the index missing
+    or older than the data version. With AUTOCOMPLETE_INDEX_PATH set, only a
+    newly written snapshot is loaded again.
+    """
+    global _loader
+    path = getattr(settings, 'AUTOCOMPLETE_INDEX_PATH', None)
+    with _index_lock:
+        if _loader is not None and _loader.is_alive():
+            return
+        index = _index
+        if path and index is not None and index.identity is not None \
+                and snapshot_identity(path) == index.identity:
+            return
+        _loader = threading.Thread(target=_load_in_background, name='autocomplete-index', daemon=True)
+        _loader.start()
+
+
+def get_autocomplete_index():
+    """Return the process-wide index, or None until its first load finishes
+
+    Loads and rebuilds run on a background thread, never on the request
+    path: once the data version moves past the index's, requests keep
+    the previous index until the new one is ready.
+    """
+    index = _index
+    # A replica behind the index's version is not a reason to rebuild
+    if index is None or index.version < get_data_version():
+        start_autocomplete_index_load()
+    return index
@@ -0,0 +1,77 @@
+# search_function/counts.py
+"""
+Result count strategies for paginated searches.
+
+A full COUNT(*) over a broad search can cost more than fetching the page
+itself, so callers choose how total_results is produced:
+
+    exact      COUNT(*), cached per normalized search and data version
+    estimated  the Postgres planner's row estimate (EXPLAIN, no scan)
+    capped     count at most PROVIDER_COUNT_CAP rows, reported as "10,000+"
+"""
+import hashlib
+import json
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .data_version import get_data_version
+from .prepared import prepared_statements
+
+
+COUNT_STRATEGIES = ('exact', 'estimated', 'capped')
+
+ResultCount = namedtuple('ResultCount', ['total', 'strategy', 'is_exact', 'display'])
+
+
+def count_cache_key(cache_params):
+    """Cache key for an exact count: normalized search parameters + data version"""
+    payload = json.dumps(cache_params, sort_keys=True, separators=(',', ':'))
+    digest = hashlib.sha1(payload.encode()).hexdigest()
+    return f"provider_count:v{get_data_version()}:{digest}"
+
+
+def exact_count(queryset, cache_params=None):
+    """COUNT(*) the queryset, reusing a cached value for identical searches"""
+    if cache_params is None:
+        with prepared_statements():
+            total = queryset.count()
+    else:
+        key = count_cache_key(cache_params)
+        total = cache.get(key)
+        if total is None:
+            with prepared_statements():
+                total = queryset.count()
+            cache.set(key, total, getattr(settings, 'PROVIDER_COUNT_CACHE_TIMEOUT', 3600))
+    return ResultCount(total, 'exact', True, f"{total:,}")
+
+
+def estimated_count(queryset):
+    """Row estimate from the planner for the search query (no rows are read)"""
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    # Depending on the driver the json column arrives as text (the whole
+    # [{"Plan": ...}] document) or parsed, and Django dumps its one element
+    if isinstance(plan, list):
+        plan = plan[0]
+    total = int(plan['Plan']['Plan Rows'])
+    return ResultCount(total, 'estimated', False, f"~{total:,}")
+
+
+def capped_count(queryset, cap=None):
+    """Count up to cap rows; anything beyond is reported as cap+"""
+    cap = cap or getattr(settings, 'PROVIDER_COUNT_CAP', 10000)
+    with prepared_statements():
+        total = queryset.order_by()[:cap + 1].count()
+    if total > cap:
+        return ResultCount(cap, 'capped', False, f"{cap:,}+")
+    return ResultCount(total, 'capped', True, f"{total:,}")
+
+
+def count_results(queryset, strategy='exact', cache_params=None):
+    """Count a search queryset using one of COUNT_STRATEGIES"""
+    if strategy == 'estimated':
+        return estimated_count(queryset)
+    if strategy == 'capped':
+        return capped_count(queryset)
+    return exact_count(queryset, cache_params)
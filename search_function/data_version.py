@@ -0,0 +1,49 @@
+# search_function/data_version.py
+"""
+Data version shared by every worker.
+
+Ingestion bumps the version after it changes the providers or taxonomy
+tables. Cache keys include it, so a reload makes every cached count and
+response unreachable without having to flush the cache. The version is
+read from the database the request reads from, so a lagging replica's
+results are cached under the version it actually holds.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import router
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DataVersion
+
+
+PROVIDER_DATA = 'providers'
+
+_cached = {}
+_cached_lock = threading.Lock()
+
+
+def get_data_version(name=PROVIDER_DATA, refresh=False):
+    """Return the current version number, re-read at most every few seconds"""
+    ttl = getattr(settings, 'DATA_VERSION_CHECK_INTERVAL', 5)
+    now = time.monotonic()
+    alias = router.db_for_read(DataVersion)
+    cached = _cached.get((alias, name))
+    if cached and not refresh and now - cached[1] < ttl:
+        return cached[0]
+
+    version = DataVersion.objects.using(alias).filter(name=name).values_list('version', flat=True).first() or 0
+    with _cached_lock:
+        _cached[(alias, name)] = (version, now)
+    return version
+
+
+def bump_data_version(name=PROVIDER_DATA):
+    """Increment the version after ingestion and return the new value"""
+    DataVersion.objects.get_or_create(name=name)
+    DataVersion.objects.filter(name=name).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    return get_data_version(name, refresh=True)
@@ -0,0 +1,79 @@
+# search_function/export.py
+"""
+Streaming export of search results.
+
+Rows are read through a Postgres server-side cursor (QuerySet.iterator) and
+encoded into NDJSON or CSV a few hundred rows at a time, so an export of a
+whole state uses the same memory as an export of ten providers.
+"""
+import csv
+import io
+import json
+import zlib
+
+
+EXPORT_COLUMNS = (
+    'npi', 'first_name', 'middle_name', 'last_name',
+    'practice_address_line1', 'practice_address_line2', 'practice_city',
+    'practice_state', 'practice_postal_code', 'practice_phone', 'primary_taxonomy_code',
+)
+
+EXPORT_FIELDS = EXPORT_COLUMNS + ('taxonomy_classification', 'taxonomy_specialization', 'taxonomy_grouping')
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+}
+
+# Roughly how much encoded text to buffer before handing a chunk to the server
+FLUSH_BYTES = 64 * 1024
+
+
+def iter_export_rows(queryset, chunk_size=2000):
+    """Yield one tuple per provider (a ProviderSearch queryset) in EXPORT_FIELDS order"""
+    return queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def ndjson_chunks(rows):
+    buffer = []
+    size = 0
+    for row in rows:
+        line = json.dumps(dict(zip(EXPORT_FIELDS, row)), separators=(',', ':')) + '\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def csv_chunks(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_chunks(queryset, export_format, chunk_size=2000):
+    """Encoded text chunks for the queryset in one of EXPORT_FORMATS"""
+    rows = iter_export_rows(queryset, chunk_size)
+    if export_format == 'csv':
+        return csv_chunks(rows)
+    return ndjson_chunks(rows)
+
+
+def gzip_chunks(chunks):
+    """Gzip a stream of text chunks incrementally"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,128 @@
+# search_function/geo.py
+"""
+Radius search over practice locations.
+
+A provider's location is the centroid of their 5-digit practice ZIP, from
+the zip_centroids table (manage.py load_zip_centroids). A search first picks
+the centroids inside a latitude/longitude bounding box (an index range scan),
+keeps those whose haversine distance is within the radius, and then matches
+providers on the indexed provider_search.zip5. Distances
+are computed in SQL, so only the candidate ZIPs are ever measured.
+"""
+import math
+from collections import namedtuple
+
+from django.db.models import F, FloatField, OuterRef, Subquery, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+
+from .models import ZipCentroid
+
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LATITUDE = 69.05
+
+DEFAULT_RADIUS_MILES = 25
+MAX_RADIUS_MILES = 250
+
+GEO_PARAMS = ('lat', 'lon', 'near_zip', 'radius_miles')
+
+GeoOrigin = namedtuple('GeoOrigin', 'latitude longitude radius_miles')
+
+
+class GeoSearchError(ValueError):
+    """Raised when lat/lon, near_zip or radius_miles cannot be used"""
+
+
+def _param(search_params, key):
+    value = search_params.get(key)
+    return str(value).strip() if value is not None else ''
+
+
+def parse_geo_params(search_params):
+    """Return the GeoOrigin a search asks for, or None when it is not a radius search"""
+    near_zip = _param(search_params, 'near_zip')
+    lat = _param(search_params, 'lat')
+    lon = _param(search_params, 'lon')
+    radius = _param(search_params, 'radius_miles')
+
+    if near_zip:
+        if not near_zip[:5].isdigit():
+            raise GeoSearchError("near_zip must be a 5-digit ZIP code")
+        centroid = ZipCentroid.objects.filter(zip_code=near_zip[:5]).first()
+        if centroid is None:
+            raise GeoSearchError(f"Unknown ZIP code: {near_zip[:5]}")
+        latitude, longitude = centroid.latitude, centroid.longitude
+    elif lat or lon:
+        try:
+            latitude, longitude = float(lat), float(lon)
+        except ValueError:
+            raise GeoSearchError("lat and lon must both be given as decimal degrees")
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise GeoSearchError("lat must be within [-90, 90] and lon within [-180, 180]")
+    elif radius:
+        raise GeoSearchError("radius_miles requires lat/lon or near_zip")
+    else:
+        return None
+
+    try:
+        radius_miles = float(radius) if radius else DEFAULT_RADIUS_MILES
+    except ValueError:
+        raise GeoSearchError("radius_miles must be a number")
+    if not 0 < radius_miles <= MAX_RADIUS_MILES:
+        raise GeoSearchError(f"radius_miles must be greater than 0 and at most {MAX_RADIUS_MILES}")
+
+    return GeoOrigin(latitude, longitude, radius_miles)
+
+
+def bounding_box(latitude, longitude, radius_miles):
+    """(min_lat, max_lat, min_lon, max_lon) of a box containing the search circle"""
+    lat_delta = radius_miles / MILES_PER_DEGREE_LATITUDE
+    min_lat, max_lat = max(latitude - lat_delta, -90.0), min(latitude + lat_delta, 90.0)
+    # A degree of longitude shrinks with the cosine of the latitude; use the
+    # box edge nearest a pole so the box still covers the whole circle
+    widest = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if widest < 1e-6:
+        return min_lat, max_lat, -180.0, 180.0
+    lon_delta = min(radius_miles / (MILES_PER_DEGREE_LATITUDE * widest), 180.0)
+    return min_lat, max_lat, longitude - lon_delta, longitude + lon_delta
+
+
+def haversine_miles(latitude, longitude, lat_field='latitude', lon_field='longitude'):
+    """ORM expression for the great-circle distance from a point to the row's coordinates"""
+    half_dlat = Radians(F(lat_field) - Value(latitude)) / Value(2.0)
+    half_dlon = Radians(F(lon_field) - Value(longitude)) / Value(2.0)
+    a = (
+        Power(Sin(half_dlat), 2)
+        + Value(math.cos(math.radians(latitude))) * Cos(Radians(F(lat_field))) * Power(Sin(half_dlon), 2)
+    )
+    # Least() guards asin() against rounding just above 1 for antipodal points
+    return Value(2 * EARTH_RADIUS_MILES) * ASin(Least(Sqrt(a), Value(1.0)))
+
+
+def centroids_within(origin):
+    """ZipCentroid queryset annotated with distance, limited to the search circle"""
+    min_lat, max_lat, min_lon, max_lon = bounding_box(*origin)
+    return ZipCentroid.objects.filter(
+        latitude__range=(min_lat, max_lat),
+        longitude__range=(min_lon, max_lon),
+    ).annotate(
+        distance=haversine_miles(origin.latitude, origin.longitude)
+    ).filter(distance__lte=origin.radius_miles)
+
+
+def filter_by_radius(queryset, origin):
+    """Limit a ProviderSearch queryset to the circle and annotate distance_miles"""
+    nearby = centroids_within(origin)
+    return queryset.filter(
+        zip5__in=nearby.values('zip_code')
+    ).annotate(
+        distance_miles=Subquery(
+            nearby.filter(zip_code=OuterRef('zip5')).values('distance')[:1],
+            output_field=FloatField(),
+        )
+    )
+
+
+def distance_value(distance):
+    """distance_miles for a search result (0 when the search had no origin)"""
+    return round(distance, 2) if distance is not None else 0
@@ -0,0 +1,554 @@
+# search_function/ingest.py
+"""
+Helpers shared by the NPPES ingestion management commands.
+
+NPPES dissemination files have 300+ columns; only the ones backing the
+Provider model are kept. Rows are streamed from the CSV (or the zip CMS
+publishes) straight into Postgres with COPY, so memory use does not grow
+with the size of the file.
+"""
+import csv
+import hashlib
+import io
+import os
+import re
+import resource
+import sys
+import zipfile
+
+from .phonetic import phonetic_key
+
+
+# Provider column -> NPPES CSV header
+NPPES_COLUMNS = [
+    ('npi', 'NPI'),
+    ('entity_type_code', 'Entity Type Code'),
+    ('organization_name', 'Provider Organization Name (Legal Business Name)'),
+    ('last_name', 'Provider Last Name (Legal Name)'),
+    ('first_name', 'Provider First Name'),
+    ('middle_name', 'Provider Middle Name'),
+    ('practice_address_line1', 'Provider First Line Business Practice Location Address'),
+    ('practice_address_line2', 'Provider Second Line Business Practice Location Address'),
+    ('practice_city', 'Provider Business Practice Location Address City Name'),
+    ('practice_state', 'Provider Business Practice Location Address State Name'),
+    ('practice_postal_code', 'Provider Business Practice Location Address Postal Code'),
+    ('practice_phone', 'Provider Business Practice Location Address Telephone Number'),
+]
+
+# Double Metaphone keys of the first and last name, derived while streaming
+PHONETIC_FIELDS = ['first_name_phonetic', 'last_name_phonetic']
+
+PROVIDER_FIELDS = [field for field, _header in NPPES_COLUMNS] + ['primary_taxonomy_code'] + PHONETIC_FIELDS
+
+# NPPES lists up to 15 taxonomies per provider; the primary one is flagged 'Y'
+TAXONOMY_SLOTS = 15
+TAXONOMY_CODE_HEADER = 'Healthcare Provider Taxonomy Code_{}'
+TAXONOMY_SWITCH_HEADER = 'Healthcare Provider Primary Taxonomy Switch_{}'
+
+PROVIDERS_TABLE_DDL = """
+    CREATE TABLE {table} (
+        npi varchar(10) NOT NULL,
+        entity_type_code varchar(1),
+        organization_name text,
+        last_name text,
+        first_name text,
+        middle_name text,
+        practice_address_line1 text,
+        practice_address_line2 text,
+        practice_city text,
+        practice_state varchar(2),
+        practice_postal_code varchar(20),
+        practice_phone varchar(20),
+        primary_taxonomy_code varchar(20),
+        first_name_phonetic varchar(8),
+        last_name_phonetic varchar(8),
+        search_vector tsvector
+    )
+"""
+
+# Full-text document of a provider row aliased p, for individuals only:
+# names weigh most, then the practice city, then the taxonomy text. The
+# 'simple' configuration lowercases without stemming, which suits names.
+FULL_TEXT_CONFIG = 'simple'
+
+SEARCH_VECTOR_SQL = f"""
+    CASE WHEN p.entity_type_code = '1' THEN
+        setweight(to_tsvector('{FULL_TEXT_CONFIG}', concat_ws(' ', p.first_name, p.middle_name, p.last_name)), 'A')
+        || setweight(to_tsvector('{FULL_TEXT_CONFIG}', coalesce(p.practice_city, '')), 'B')
+        || setweight(to_tsvector('{FULL_TEXT_CONFIG}', coalesce((
+            SELECT concat_ws(' ', nt.classification, nt.specialization)
+            FROM nucc_taxonomy nt
+            WHERE nt.code = p.primary_taxonomy_code
+        ), '')), 'C')
+    END
+"""
+
+# Indexes on the providers table, built after a bulk load. Searches read
+# provider_search, so providers only needs its primary key (detail and
+# batch lookups).
+PROVIDER_INDEXES = [
+    ('providers_pkey', "ALTER TABLE {table} ADD CONSTRAINT {name} PRIMARY KEY (npi)", False),
+]
+
+# provider_search: the list endpoints' read model. One row per individual
+# provider with everything a result needs precomputed (display name and
+# address, the joined taxonomy text, lowercase search keys, ZIP5), so
+# searches filter, sort and serialize a single narrow table without joins.
+#
+# It is list partitioned on practice_state, one partition per state or
+# territory plus a default partition for blank and unknown values, so a
+# state-filtered search reads (and its indexes cover) a single partition,
+# and a state can be rebuilt on its own (refresh_provider_search_partitions).
+PROVIDER_SEARCH_TABLE = 'provider_search'
+
+PARTITION_STATES = [
+    'AK', 'AL', 'AR', 'AZ', 'CA', 'CO', 'CT', 'DC', 'DE', 'FL', 'GA', 'HI', 'IA', 'ID', 'IL', 'IN', 'KS',
+    'KY', 'LA', 'MA', 'MD', 'ME', 'MI', 'MN', 'MO', 'MS', 'MT', 'NC', 'ND', 'NE', 'NH', 'NJ', 'NM', 'NV',
+    'NY', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VA', 'VT', 'WA', 'WI', 'WV', 'WY',
+    # Territories and military post offices
+    'AS', 'GU', 'MP', 'PR', 'VI', 'AA', 'AE', 'AP',
+]
+
+DEFAULT_PARTITION = 'DEFAULT'
+
+PROVIDER_SEARCH_DDL = """
+    CREATE TABLE {table} (
+        npi varchar(10) NOT NULL,
+        first_name text,
+        middle_name text,
+        last_name text,
+        full_name text NOT NULL,
+        practice_address_line1 text,
+        practice_address_line2 text,
+        practice_city text,
+        practice_state varchar(2),
+        practice_postal_code varchar(20),
+        zip5 varchar(5),
+        practice_phone varchar(20),
+        full_address text NOT NULL,
+        primary_taxonomy_code varchar(20),
+        taxonomy_classification text,
+        taxonomy_specialization text,
+        taxonomy_grouping text,
+        specialty_key text NOT NULL,
+        first_name_lower text,
+        last_name_lower text,
+        city_lower text,
+        specialty_lower text,
+        first_name_phonetic varchar(8),
+        last_name_phonetic varchar(8),
+        search_vector tsvector
+    ){partitioning}
+"""
+
+PROVIDER_SEARCH_COLUMNS = """
+    npi, first_name, middle_name, last_name, full_name,
+    practice_address_line1, practice_address_line2, practice_city, practice_state,
+    practice_postal_code, zip5, practice_phone, full_address,
+    primary_taxonomy_code, taxonomy_classification, taxonomy_specialization, taxonomy_grouping,
+    specialty_key, first_name_lower, last_name_lower, city_lower, specialty_lower,
+    first_name_phonetic, last_name_phonetic, search_vector
+"""
+
+# provider_search rows for the individuals of a providers-shaped table
+# {source}; the display strings mirror Provider.full_name / full_address
+PROVIDER_SEARCH_SELECT = """
+    SELECT p.npi, p.first_name, p.middle_name, p.last_name,
+           CASE WHEN NULLIF(p.organization_name, '') IS NOT NULL THEN p.organization_name
+                ELSE COALESCE(NULLIF(concat_ws(' ', NULLIF(p.first_name, ''), NULLIF(p.middle_name, ''),
+                                               NULLIF(p.last_name, '')), ''), 'Unknown Individual')
+           END,
+           p.practice_address_line1, p.practice_address_line2, p.practice_city, UPPER(p.practice_state),
+           p.practice_postal_code, SUBSTRING(p.practice_postal_code, 1, 5), p.practice_phone,
+           concat_ws(', ', NULLIF(p.practice_address_line1, ''), NULLIF(p.practice_address_line2, ''),
+                     NULLIF(p.practice_city, ''), NULLIF(p.practice_state, ''), NULLIF(p.practice_postal_code, '')),
+           p.primary_taxonomy_code, nt.classification, nt.specialization, nt.grouping,
+           COALESCE(NULLIF(nt.grouping, ''), NULLIF(nt.classification, ''), 'Unknown Specialty'),
+           LOWER(p.first_name), LOWER(p.last_name), LOWER(p.practice_city),
+           LOWER(concat_ws('|', nt.classification, nt.specialization, nt.grouping)),
+           p.first_name_phonetic, p.last_name_phonetic, p.search_vector
+    FROM {source} p
+    LEFT JOIN nucc_taxonomy nt ON nt.code = p.primary_taxonomy_code
+    WHERE p.entity_type_code = '1'
+"""
+
+# Indexes on provider_search, created on the partitioned table and so
+# built per partition; trigram indexes are only built when pg_trgm is
+# installed. NPIs are not declared unique: a primary key on a partitioned
+# table has to include practice_state. Partition pruning stands in for an
+# index on practice_state.
+PROVIDER_SEARCH_INDEXES = [
+    ('provider_search_npi_idx', "CREATE INDEX {name} ON {table} (npi)", False),
+    ('provider_search_first_name_trgm_idx',
+     "CREATE INDEX {name} ON {table} USING gin (first_name_lower gin_trgm_ops)", True),
+    ('provider_search_last_name_trgm_idx',
+     "CREATE INDEX {name} ON {table} USING gin (last_name_lower gin_trgm_ops)", True),
+    ('provider_search_city_trgm_idx',
+     "CREATE INDEX {name} ON {table} USING gin (city_lower gin_trgm_ops)", True),
+    ('provider_search_specialty_trgm_idx',
+     "CREATE INDEX {name} ON {table} USING gin (specialty_lower gin_trgm_ops)", True),
+    ('provider_search_name_npi_idx',
+     "CREATE INDEX {name} ON {table} (last_name, first_name, npi)", False),
+    ('provider_search_zip5_idx', "CREATE INDEX {name} ON {table} (zip5)", False),
+    ('provider_search_last_phonetic_idx',
+     "CREATE INDEX {name} ON {table} (last_name_phonetic, first_name_phonetic)", False),
+    ('provider_search_first_phonetic_idx',
+     "CREATE INDEX {name} ON {table} (first_name_phonetic)", False),
+    ('provider_search_vector_idx', "CREATE INDEX {name} ON {table} USING gin (search_vector)", False),
+]
+
+
+# nucc_taxonomy column -> NUCC CSV header
+NUCC_COLUMNS = [
+    ('code', 'Code'),
+    ('grouping', 'Grouping'),
+    ('classification', 'Classification'),
+    ('specialization', 'Specialization'),
+    ('definition', 'Definition'),
+    ('notes', 'Notes'),
+    ('display_name', 'Display Name'),
+    ('section', 'Section'),
+]
+
+NUCC_TAXONOMY_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS nucc_taxonomy (
+        code varchar(50) PRIMARY KEY,
+        grouping text,
+        classification text,
+        specialization text,
+        definition text,
+        notes text,
+        display_name text,
+        section text
+    )
+"""
+
+
+def open_nppes_file(path):
+    """Open an NPPES CSV, or the npidata CSV inside a dissemination zip, as text"""
+    if zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        members = [
+            info for info in archive.infolist()
+            if info.filename.lower().endswith('.csv')
+            and 'npidata' in os.path.basename(info.filename).lower()
+            and 'fileheader' not in info.filename.lower()
+        ]
+        if not members:
+            raise ValueError(f"No npidata CSV found in {path}")
+        member = max(members, key=lambda info: info.file_size)
+        return io.TextIOWrapper(archive.open(member), encoding='utf-8', errors='replace', newline='')
+    return open(path, encoding='utf-8', errors='replace', newline='')
+
+
+def iter_provider_rows(path, limit=None):
+    """Yield one tuple per NPPES record, in PROVIDER_FIELDS order"""
+    with open_nppes_file(path) as handle:
+        reader = csv.reader(handle)
+        header = next(reader)
+        positions = {name: index for index, name in enumerate(header)}
+
+        missing = [name for _field, name in NPPES_COLUMNS if name not in positions]
+        if missing:
+            raise ValueError(f"Not an NPPES file, missing columns: {', '.join(missing)}")
+
+        column_indexes = [positions[name] for _field, name in NPPES_COLUMNS]
+        state_position = PROVIDER_FIELDS.index('practice_state')
+        first_name_position = PROVIDER_FIELDS.index('first_name')
+        last_name_position = PROVIDER_FIELDS.index('last_name')
+        taxonomy_slots = [
+            (positions[TAXONOMY_CODE_HEADER.format(slot)], positions.get(TAXONOMY_SWITCH_HEADER.format(slot)))
+            for slot in range(1, TAXONOMY_SLOTS + 1)
+            if TAXONOMY_CODE_HEADER.format(slot) in positions
+        ]
+
+        for count, record in enumerate(reader):
+            if limit is not None and count >= limit:
+                break
+            values = [record[index] or None for index in column_indexes]
+            # Foreign practice locations carry full province names, which do
+            # not fit the two-letter practice_state column
+            if values[state_position] and len(values[state_position]) > 2:
+                values[state_position] = None
+            values.append(primary_taxonomy_code(record, taxonomy_slots))
+            values.append(phonetic_key(values[first_name_position]))
+            values.append(phonetic_key(values[last_name_position]))
+            yield tuple(values)
+
+
+def primary_taxonomy_code(record, taxonomy_slots):
+    """Taxonomy flagged as primary, falling back to the first one listed"""
+    first_code = None
+    for code_index, switch_index in taxonomy_slots:
+        code = record[code_index]
+        if not code:
+            continue
+        if switch_index is not None and record[switch_index] == 'Y':
+            return code
+        first_code = first_code or code
+    return first_code
+
+
+def iter_deactivated_npis(path):
+    """Yield the NPIs listed in a deactivation report exported as CSV
+
+    The report has a title and header rows before the data, so any row
+    whose first cell is not a 10-digit NPI is skipped.
+    """
+    with open(path, encoding='utf-8', errors='replace', newline='') as handle:
+        for record in csv.reader(handle):
+            if record and re.fullmatch(r'\d{10}', record[0].strip()):
+                yield record[0].strip()
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Content hash used to recognise delta files that were already applied"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def taxonomy_release_version(path):
+    """NUCC release from a file name like nucc_taxonomy_251.csv ('25.1'), or None"""
+    match = re.search(r'nucc_taxonomy_(\d{2})(\d)', os.path.basename(path))
+    return f"{match.group(1)}.{match.group(2)}" if match else None
+
+
+def iter_taxonomy_rows(path):
+    """Yield one tuple per NUCC taxonomy code, in NUCC_COLUMNS order"""
+    with open(path, encoding='utf-8-sig', errors='replace', newline='') as handle:
+        reader = csv.DictReader(handle)
+        missing = [name for _field, name in NUCC_COLUMNS if name not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"Not a NUCC taxonomy file, missing columns: {', '.join(missing)}")
+
+        for record in reader:
+            values = tuple((record[name] or '').strip() or None for _field, name in NUCC_COLUMNS)
+            if values[0]:
+                yield values
+
+
+# Accepted headers for ZIP centroid files: the Census Gazetteer ZCTA file
+# (tab-delimited GEOID/INTPTLAT/INTPTLONG) or a plain zip,lat,lon CSV
+ZIP_CENTROID_HEADERS = {
+    'zip_code': ('geoid', 'zcta5', 'zcta', 'zip', 'zip_code', 'zipcode'),
+    'latitude': ('intptlat', 'lat', 'latitude'),
+    'longitude': ('intptlong', 'lon', 'lng', 'long', 'longitude'),
+}
+
+
+def iter_zip_centroid_rows(path):
+    """Yield (zip_code, latitude, longitude) once per 5-digit ZIP"""
+    with open(path, encoding='utf-8-sig', errors='replace', newline='') as handle:
+        sample = handle.readline()
+        handle.seek(0)
+        reader = csv.reader(handle, delimiter='\t' if '\t' in sample else ',')
+        header = [name.strip().lower() for name in next(reader)]
+
+        positions = []
+        for field, names in ZIP_CENTROID_HEADERS.items():
+            found = [header.index(name) for name in names if name in header]
+            if not found:
+                raise ValueError(f"Not a ZIP centroid file, no {field} column (expected one of: {', '.join(names)})")
+            positions.append(found[0])
+
+        seen = set()
+        for record in reader:
+            try:
+                zip_code, latitude, longitude = (record[position].strip() for position in positions)
+                latitude, longitude = float(latitude), float(longitude)
+            except (IndexError, ValueError):
+                continue
+            zip_code = zip_code.zfill(5)
+            if len(zip_code) != 5 or not zip_code.isdigit() or zip_code in seen:
+                continue
+            seen.add(zip_code)
+            yield zip_code, latitude, longitude
+
+
+def missing_taxonomy_references(cursor):
+    """Providers whose primary taxonomy code is not in nucc_taxonomy
+
+    Returns (provider_count, [(code, providers), ...]) from one set-based query.
+    """
+    cursor.execute("""
+        SELECT p.primary_taxonomy_code, COUNT(*)
+        FROM providers p
+        WHERE p.primary_taxonomy_code IS NOT NULL
+          AND p.primary_taxonomy_code <> ''
+          AND NOT EXISTS (
+              SELECT 1 FROM nucc_taxonomy nt WHERE nt.code = p.primary_taxonomy_code
+          )
+        GROUP BY p.primary_taxonomy_code
+        ORDER BY COUNT(*) DESC
+    """)
+    missing = cursor.fetchall()
+    return sum(count for _code, count in missing), missing
+
+
+def copy_rows(cursor, table, columns, rows):
+    """Stream rows into table with COPY FROM STDIN; returns the row count
+
+    Requires psycopg 3 (Django's preferred PostgreSQL driver).
+    """
+    raw_cursor = getattr(cursor, 'cursor', cursor)
+    if not hasattr(raw_cursor, 'copy'):
+        raise RuntimeError("COPY loading requires psycopg 3 (pip install 'psycopg[binary]')")
+
+    count = 0
+    with raw_cursor.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+        for row in rows:
+            copy.write_row(row)
+            count += 1
+    return count
+
+
+def update_search_vectors(cursor, where='TRUE', params=()):
+    """Recompute search_vector for the individual providers matching where (alias p)"""
+    cursor.execute(f"""
+        UPDATE providers p SET search_vector = {SEARCH_VECTOR_SQL}
+        WHERE p.entity_type_code = '1' AND ({where})
+    """, params)
+    return cursor.rowcount
+
+
+def provider_search_partitions(table=PROVIDER_SEARCH_TABLE):
+    """(partition key, partition table, FOR VALUES clause) for each partition of table"""
+    partitions = [(state, f"{table}_{state.lower()}", f"FOR VALUES IN ('{state}')") for state in PARTITION_STATES]
+    partitions.append((DEFAULT_PARTITION, f"{table}_default", 'DEFAULT'))
+    return partitions
+
+
+def provider_search_partition(key, table=PROVIDER_SEARCH_TABLE):
+    """The (key, partition table, bounds) of the partition holding state key"""
+    key = key.upper()
+    if key not in PARTITION_STATES:
+        key = DEFAULT_PARTITION
+    return next(partition for partition in provider_search_partitions(table) if partition[0] == key)
+
+
+def partition_filter(key):
+    """SQL condition (alias p) and params selecting the providers of a partition"""
+    if key == DEFAULT_PARTITION:
+        return "(p.practice_state IS NULL OR UPPER(p.practice_state) <> ALL(%s))", [PARTITION_STATES]
+    return "UPPER(p.practice_state) = %s", [key]
+
+
+def build_provider_search(cursor, table=PROVIDER_SEARCH_TABLE, source='providers', index_suffix=''):
+    """Create and fill a partitioned provider_search table from source, then index it
+
+    Returns the number of rows. Index names get index_suffix so a staging
+    copy can be built next to the live table.
+    """
+    cursor.execute(PROVIDER_SEARCH_DDL.format(table=table, partitioning=' PARTITION BY LIST (practice_state)'))
+    for _key, partition, bounds in provider_search_partitions(table):
+        cursor.execute(f"CREATE TABLE {partition} PARTITION OF {table} {bounds}")
+    cursor.execute(f"INSERT INTO {table} ({PROVIDER_SEARCH_COLUMNS}) {PROVIDER_SEARCH_SELECT.format(source=source)}")
+    rows = cursor.rowcount
+    trigram = has_pg_trgm(cursor)
+    for name, create_sql, needs_trigram in PROVIDER_SEARCH_INDEXES:
+        if needs_trigram and not trigram:
+            continue
+        cursor.execute(create_sql.format(name=f"{name}{index_suffix}", table=table))
+    cursor.execute(f"ANALYZE {table}")
+    return rows
+
+
+def rename_provider_search(cursor, table, new_table):
+    """Rename a provider_search table along with its partitions"""
+    cursor.execute(f"ALTER TABLE {table} RENAME TO {new_table}")
+    for (_key, partition, _bounds), (_key, new_partition, _bounds) in zip(
+        provider_search_partitions(table), provider_search_partitions(new_table)
+    ):
+        cursor.execute(f"ALTER TABLE IF EXISTS {partition} RENAME TO {new_partition}")
+
+
+def build_provider_search_partition(cursor, key, source='providers'):
+    """Fill and index a standalone copy of one provider_search partition
+
+    The copy ({partition}_new) carries the partition's indexes and a CHECK
+    constraint matching its bounds, so attaching it in place of the live
+    partition (swap_provider_search_partition) neither rebuilds indexes
+    nor scans the rows. Returns the number of rows.
+    """
+    key, partition, _bounds = provider_search_partition(key)
+    staging = f"{partition}_new"
+    where, params = partition_filter(key)
+    cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+    cursor.execute(PROVIDER_SEARCH_DDL.format(table=staging, partitioning=''))
+    cursor.execute(f"""
+        INSERT INTO {staging} ({PROVIDER_SEARCH_COLUMNS})
+        {PROVIDER_SEARCH_SELECT.format(source=source)}
+        AND {where}
+    """, params)
+    rows = cursor.rowcount
+    if key != DEFAULT_PARTITION:
+        cursor.execute(
+            f"ALTER TABLE {staging} ADD CONSTRAINT {staging}_bounds "
+            f"CHECK (practice_state IS NOT NULL AND practice_state = '{key}')"
+        )
+
+    # Only the indexes the partitioned table has, so each one is adopted
+    cursor.execute("""
+        SELECT c.relname FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = %s::regclass
+    """, [PROVIDER_SEARCH_TABLE])
+    existing = {name for name, in cursor.fetchall()}
+    for name, create_sql, _needs_trigram in PROVIDER_SEARCH_INDEXES:
+        if name in existing:
+            cursor.execute(create_sql.format(name=name.replace(PROVIDER_SEARCH_TABLE, staging, 1), table=staging))
+    cursor.execute(f"ANALYZE {staging}")
+    return rows
+
+
+def swap_provider_search_partition(cursor, key):
+    """Attach the copy built by build_provider_search_partition in place of the live partition
+
+    Run it in a transaction. Detaching locks provider_search exclusively,
+    so it is taken up front; searches wait only for the swap itself, which
+    changes the catalog and moves no rows.
+    """
+    key, partition, bounds = provider_search_partition(key)
+    staging = f"{partition}_new"
+    cursor.execute(f"LOCK TABLE {PROVIDER_SEARCH_TABLE} IN ACCESS EXCLUSIVE MODE")
+    cursor.execute(f"ALTER TABLE {PROVIDER_SEARCH_TABLE} DETACH PARTITION {partition}")
+    cursor.execute(f"DROP TABLE {partition}")
+    cursor.execute(f"ALTER TABLE {PROVIDER_SEARCH_TABLE} ATTACH PARTITION {staging} {bounds}")
+    cursor.execute(f"ALTER TABLE {staging} RENAME TO {partition}")
+    if key != DEFAULT_PARTITION:
+        cursor.execute(f"ALTER TABLE {partition} DROP CONSTRAINT {staging}_bounds")
+    for name, _create_sql, _needs_trigram in PROVIDER_SEARCH_INDEXES:
+        cursor.execute(
+            f"ALTER INDEX IF EXISTS {name.replace(PROVIDER_SEARCH_TABLE, staging, 1)} "
+            f"RENAME TO {name.replace(PROVIDER_SEARCH_TABLE, partition, 1)}"
+        )
+
+
+def refresh_provider_search(cursor, npis_sql, params=()):
+    """Rewrite the provider_search rows of the NPIs selected by npis_sql
+
+    Rows of NPIs that are no longer individual providers are removed.
+    Returns the number of rows written.
+    """
+    cursor.execute(f"DELETE FROM {PROVIDER_SEARCH_TABLE} WHERE npi IN ({npis_sql})", params)
+    cursor.execute(f"""
+        INSERT INTO {PROVIDER_SEARCH_TABLE} ({PROVIDER_SEARCH_COLUMNS})
+        {PROVIDER_SEARCH_SELECT.format(source='providers')}
+        AND p.npi IN ({npis_sql})
+    """, params)
+    return cursor.rowcount
+
+
+def has_pg_trgm(cursor):
+    cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    return cursor.fetchone() is not None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in KB on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
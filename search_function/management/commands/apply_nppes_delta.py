@@ -0,0 +1,166 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from search_function.autocomplete import refresh_autocomplete_index
+from search_function.data_version import bump_data_version
+from search_function.ingest import (
+    NUCC_TAXONOMY_TABLE_DDL, PROVIDER_FIELDS, PROVIDERS_TABLE_DDL, SEARCH_VECTOR_SQL,
+    copy_rows, file_sha256, iter_deactivated_npis, iter_provider_rows, refresh_provider_search,
+)
+from search_function.models import NppesDeltaFile
+from search_function.npi_snapshot import patch_npi_snapshot
+from search_function.stats import refresh_provider_stats
+
+
+DELTA_TABLE = 'provider_delta'
+
+# Rows whose data is unchanged are skipped so a re-sent record does not
+# rewrite the tuple (and bloat the table and its indexes)
+UPSERT_SQL = """
+    INSERT INTO providers ({columns}, search_vector)
+    SELECT {columns}, {search_vector} FROM {delta} p
+    WHERE p.entity_type_code IS NOT NULL
+    ON CONFLICT (npi) DO UPDATE SET {assignments}, search_vector = EXCLUDED.search_vector
+    WHERE ({current}) IS DISTINCT FROM ({incoming})
+"""
+
+
+class Command(BaseCommand):
+    help = 'Apply NPPES weekly update files and deactivation reports to the providers table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help='Weekly npidata CSVs or weekly dissemination zips, oldest first')
+        parser.add_argument('--deactivations', action='append', default=[],
+                            help='Deactivated NPI report exported as CSV (repeatable)')
+        parser.add_argument('--force', action='store_true',
+                            help='Re-apply files that were already applied')
+
+    def handle(self, *args, **options):
+        if not options['paths'] and not options['deactivations']:
+            raise CommandError("Nothing to apply: pass weekly files and/or --deactivations")
+
+        self.stdout.write("=== APPLYING NPPES DELTAS ===\n")
+        applied = 0
+        # What the applied files changed, so stats and the NPI snapshot are
+        # patched rather than rebuilt from the whole table
+        self.changed_states = set()
+        self.changed_npis = set()
+
+        for path in options['paths']:
+            applied += self.apply_file(path, NppesDeltaFile.KIND_WEEKLY, options['force'])
+        for path in options['deactivations']:
+            applied += self.apply_file(path, NppesDeltaFile.KIND_DEACTIVATION, options['force'])
+
+        if applied:
+            refresh_provider_stats(self.changed_states)
+            version = bump_data_version()
+            snapshot = patch_npi_snapshot(self.changed_npis)
+            autocomplete = refresh_autocomplete_index()
+            if snapshot:
+                self.stdout.write(self.style.SUCCESS(f"✓ NPI snapshot written ({snapshot[0]:,} providers)"))
+            if autocomplete:
+                self.stdout.write(self.style.SUCCESS(f"✓ Autocomplete index written ({autocomplete[0]:,} name keys)"))
+            self.stdout.write(f"\nData version: {version}")
+        self.stdout.write(self.style.SUCCESS(f"\n=== {applied} FILE(S) APPLIED ==="))
+
+    def apply_file(self, path, kind, force):
+        if not os.path.exists(path):
+            raise CommandError(f"File not found: {path}")
+
+        file_name = os.path.basename(path)
+        sha256 = file_sha256(path)
+        previous = NppesDeltaFile.objects.filter(sha256=sha256).first()
+        if previous and not force:
+            self.stdout.write(
+                self.style.WARNING(f"⚠ {file_name} already applied on {previous.applied_at:%Y-%m-%d %H:%M} - skipping")
+            )
+            return 0
+
+        started = time.monotonic()
+        try:
+            with transaction.atomic():
+                if kind == NppesDeltaFile.KIND_WEEKLY:
+                    upserted, deactivated = self.apply_weekly(path)
+                else:
+                    upserted, deactivated = 0, self.apply_deactivations(path)
+
+                NppesDeltaFile.objects.filter(sha256=sha256).delete()
+                NppesDeltaFile.objects.create(
+                    file_name=file_name, sha256=sha256, kind=kind,
+                    rows_upserted=upserted, rows_deactivated=deactivated,
+                )
+        except (OSError, ValueError, RuntimeError) as e:
+            raise CommandError(f"Failed to apply {file_name}: {e}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ {file_name}: {upserted:,} upserted, {deactivated:,} deactivated "
+                f"in {time.monotonic() - started:.1f}s"
+            )
+        )
+        return 1
+
+    def apply_weekly(self, path):
+        """Upsert the file's records; records without an entity type are deactivations"""
+        columns = ', '.join(PROVIDER_FIELDS)
+        changed = [field for field in PROVIDER_FIELDS if field != 'npi']
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                PROVIDERS_TABLE_DDL.format(table=DELTA_TABLE).replace('CREATE TABLE', 'CREATE TEMP TABLE', 1)
+                + " ON COMMIT DROP"
+            )
+            copy_rows(cursor, DELTA_TABLE, PROVIDER_FIELDS, iter_provider_rows(path))
+
+            # Practice states of the individuals before and after the update
+            cursor.execute(f"""
+                SELECT UPPER(practice_state) FROM {DELTA_TABLE} WHERE entity_type_code = '1'
+                UNION
+                SELECT UPPER(p.practice_state) FROM providers p JOIN {DELTA_TABLE} d USING (npi)
+                WHERE p.entity_type_code = '1'
+            """)
+            self.changed_states.update(state for state, in cursor.fetchall())
+            cursor.execute(f"SELECT npi FROM {DELTA_TABLE}")
+            self.changed_npis.update(npi for npi, in cursor.fetchall())
+
+            cursor.execute(f"""
+                DELETE FROM providers p USING {DELTA_TABLE} d
+                WHERE p.npi = d.npi AND d.entity_type_code IS NULL
+            """)
+            deactivated = cursor.rowcount
+
+            # Search vectors read taxonomy text; the table may not be loaded yet
+            cursor.execute(NUCC_TAXONOMY_TABLE_DDL)
+            cursor.execute(UPSERT_SQL.format(
+                columns=columns,
+                delta=DELTA_TABLE,
+                search_vector=SEARCH_VECTOR_SQL,
+                assignments=', '.join(f"{field} = EXCLUDED.{field}" for field in changed),
+                current=', '.join(f"providers.{field}" for field in changed),
+                incoming=', '.join(f"EXCLUDED.{field}" for field in changed),
+            ))
+            upserted = cursor.rowcount
+
+            refresh_provider_search(cursor, f"SELECT npi FROM {DELTA_TABLE}")
+
+        return upserted, deactivated
+
+    def apply_deactivations(self, path):
+        npis = list(iter_deactivated_npis(path))
+        if not npis:
+            raise ValueError("no NPIs found in deactivation report")
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT DISTINCT UPPER(practice_state) FROM providers WHERE npi = ANY(%s) AND entity_type_code = '1'",
+                [npis]
+            )
+            self.changed_states.update(state for state, in cursor.fetchall())
+            self.changed_npis.update(npis)
+            cursor.execute("DELETE FROM providers WHERE npi = ANY(%s)", [npis])
+            deactivated = cursor.rowcount
+            refresh_provider_search(cursor, "SELECT unnest(%s::varchar[])", [npis])
+            return deactivated
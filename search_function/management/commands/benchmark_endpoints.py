@@ -0,0 +1,237 @@
+import json
+import math
+import platform
+import statistics
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from search_function.data_version import get_data_version
+from search_function.models import Provider
+from search_function.response_cache import clear_response_cache
+
+
+PERCENTILES = (50, 95, 99)
+
+# NPIs spread evenly over the NPI range, for detail, batch and name lookups
+SAMPLE_SIZE = 1000
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = 'Time every API endpoint over representative query shapes and write the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='Timed requests per query shape')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per query shape')
+        parser.add_argument('--only', help='Comma-separated query shape names to run')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--compare', help='Earlier --output file to print p50/p95 changes against')
+        parser.add_argument('--response-cache', action='store_true',
+                            help='Leave the response cache on (by default every request runs its queries)')
+
+    def sample_providers(self):
+        """Individual providers at evenly spaced points of the NPI range"""
+        sample = []
+        step = 9_000_000_000 // SAMPLE_SIZE
+        with connection.cursor() as cursor:
+            for start in range(1_000_000_000, 9_999_999_999, step):
+                cursor.execute(
+                    "SELECT npi, first_name, last_name, practice_state FROM providers "
+                    "WHERE npi >= %s AND entity_type_code = '1' ORDER BY npi LIMIT 1",
+                    [str(start)]
+                )
+                row = cursor.fetchone()
+                if row and (not sample or row[0] != sample[-1][0]):
+                    sample.append(row)
+        return sample
+
+    def query_shapes(self, sample):
+        """(name, method, path, params or body) for every endpoint in search_function/urls.py"""
+        npis = [npi for npi, _first, _last, _state in sample]
+        _npi, first_name, last_name, state = sample[len(sample) // 2]
+        # Export streams every match, so it runs on the state with the fewest providers
+        small_state = (
+            Provider.objects.filter(entity_type_code='1', practice_state__isnull=False)
+            .values('practice_state').annotate(providers=Count('npi'))
+            .order_by('providers', 'practice_state').values_list('practice_state', flat=True).first()
+        ) or state
+
+        return [
+            ('search: selective name', 'get', '/api/search/',
+             {'first_name': first_name, 'last_name': last_name}),
+            ('search: last name', 'get', '/api/search/', {'last_name': last_name}),
+            ('search: broad state', 'get', '/api/search/', {'state': state}),
+            ('search: specialty', 'get', '/api/search/', {'specialty': 'family', 'state': state}),
+            ('search: deep page', 'get', '/api/search/', {'state': state, 'page': 200}),
+            ('search: full text', 'get', '/api/search/', {'q': last_name}),
+            ('search: phonetic', 'get', '/api/search/', {'last_name': last_name, 'match': 'phonetic'}),
+            ('search: grouped', 'get', '/api/search/', {'state': state, 'group_by_specialty': 'true'}),
+            ('advanced search', 'get', '/api/advanced-search/',
+             {'state': state, 'specialty_group': 'Allopathic & Osteopathic Physicians'}),
+            ('quick search', 'get', '/api/quick-search/', {'q': last_name[:3]}),
+            ('provider detail', 'get', '/api/provider/{npi}/', npis),
+            ('provider batch', 'post', '/api/providers/batch/', {'npis': npis}),
+            ('export', 'get', '/api/export/', {'state': small_state}),
+            ('health check', 'get', '/api/health/', {}),
+            ('cache stats', 'get', '/api/cache-stats/', {}),
+            ('states', 'get', '/api/states/', {}),
+            ('cities', 'get', '/api/cities/', {'state': state}),
+            ('taxonomies', 'get', '/api/taxonomies/', {'q': 'cardio'}),
+            ('specialty groups', 'get', '/api/specialty-groups/', {}),
+            ('specialty classifications', 'get', '/api/specialty-classifications/',
+             {'group': 'Allopathic & Osteopathic Physicians'}),
+            ('search page', 'get', '/search/', {}),
+        ]
+
+    def request(self, client, method, path, params, iteration):
+        """Send one request and read its whole body; returns (seconds, queries, status)"""
+        if '{npi}' in path:
+            path, params = path.format(npi=params[iteration % len(params)]), {}
+        started = time.perf_counter()
+        if method == 'post':
+            response = client.post(path, json.dumps(params), content_type='application/json')
+        else:
+            response = client.get(path, params)
+        streamed = 0
+        if response.streaming:
+            # A streaming view runs its queries after the profiling middleware has returned
+            with CaptureQueriesContext(connection) as captured:
+                for _chunk in response.streaming_content:
+                    pass
+            streamed = len(captured)
+        else:
+            response.content
+        elapsed = time.perf_counter() - started
+        # The test client skips this request_finished handler; without it
+        # every request would reuse one connection whatever CONN_MAX_AGE says
+        close_old_connections()
+        profile = getattr(response.wsgi_request, 'sql_profile', None)
+        return elapsed, len(profile.queries) + streamed if profile else None, response.status_code
+
+    def run_shape(self, client, shape, options):
+        name, method, path, params = shape
+        for iteration in range(options['warmup']):
+            self.request(client, method, path, params, iteration)
+
+        latencies, queries, statuses = [], [], set()
+        for iteration in range(options['iterations']):
+            elapsed, query_count, status = self.request(client, method, path, params, iteration)
+            latencies.append(elapsed * 1000)
+            queries.append(query_count)
+            statuses.add(status)
+
+        result = {
+            'name': name,
+            'method': method.upper(),
+            'path': path,
+            'params': params if '{npi}' not in path else None,
+            'status': sorted(statuses),
+            'mean_ms': round(statistics.fmean(latencies), 2),
+            'max_ms': round(max(latencies), 2),
+            'queries_mean': round(statistics.fmean(queries), 2) if None not in queries else None,
+            'queries_max': max(queries) if None not in queries else None,
+        }
+        if method == 'post':
+            result['params'] = {'npis': f"{len(params['npis'])} sampled NPIs"}
+        for p in PERCENTILES:
+            result[f'p{p}_ms'] = round(percentile(latencies, p), 2)
+        return result
+
+    def print_results(self, results, previous):
+        header = f"{'query shape':<28}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'status':>8}"
+        if previous:
+            header += f"{'p50 Δ':>9}{'p95 Δ':>9}"
+        self.stdout.write(header)
+        for result in results:
+            queries = '-' if result['queries_mean'] is None else f"{result['queries_mean']:g}"
+            status = ','.join(str(code) for code in result['status'])
+            line = (
+                f"{result['name']:<28}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+                f"{result['p99_ms']:>9.2f}{queries:>9}{status:>8}"
+            )
+            before = previous.get(result['name'])
+            if before:
+                for key in ('p50_ms', 'p95_ms'):
+                    change = (result[key] - before[key]) / before[key] * 100 if before[key] else 0
+                    line += f"{change:>+8.0f}%"
+            self.stdout.write(line)
+
+    def handle(self, *args, **options):
+        self.stdout.write("=== ENDPOINT BENCHMARK ===\n")
+        if options['iterations'] < 1:
+            raise CommandError("--iterations must be at least 1")
+
+        previous = {}
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    previous = {result['name']: result for result in json.load(f)['results']}
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Cannot read {options['compare']}: {e}")
+
+        sample = self.sample_providers()
+        if not sample:
+            raise CommandError("No individual providers loaded; run seed_synthetic_providers first")
+        shapes = self.query_shapes(sample)
+        if options['only']:
+            wanted = {name.strip() for name in options['only'].split(',')}
+            shapes = [shape for shape in shapes if shape[0] in wanted]
+            if not shapes:
+                raise CommandError(f"No query shape named {', '.join(sorted(wanted))}")
+
+        dataset = {
+            'individual_providers': Provider.objects.filter(entity_type_code='1').count(),
+            'data_version': get_data_version(refresh=True),
+        }
+        self.stdout.write(f"Individual providers: {dataset['individual_providers']:,}")
+        self.stdout.write(f"Iterations: {options['iterations']} (+{options['warmup']} warm-up) per query shape\n")
+
+        overrides = {
+            'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'],
+            'SQL_PROFILING': True,
+        }
+        if not options['response_cache']:
+            overrides['RESPONSE_CACHE_TIMEOUT'] = 0
+        results = []
+        with override_settings(**overrides):
+            clear_response_cache()
+            client = Client()
+            for shape in shapes:
+                results.append(self.run_shape(client, shape, options))
+
+        self.print_results(results, previous)
+
+        if options['output']:
+            report = {
+                'created': timezone.now().isoformat(),
+                'dataset': dataset,
+                'settings': {
+                    'iterations': options['iterations'],
+                    'warmup': options['warmup'],
+                    'response_cache': options['response_cache'],
+                    'async_views': settings.ASYNC_VIEWS,
+                    'count_strategy': settings.PROVIDER_COUNT_STRATEGY,
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                    'postgres': connection.pg_version,
+                },
+                'results': results,
+            }
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"\nResults written to {options['output']}")
+
+        self.stdout.write(self.style.SUCCESS("\n✓ Benchmark complete"))
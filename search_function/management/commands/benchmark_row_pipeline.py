@@ -0,0 +1,99 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import JsonResponse, QueryDict
+
+from search_function import serializers
+from search_function.geo import distance_value
+from search_function.views import (
+    PROVIDER_RESULT_FIELDS, TAXONOMY_RESULT_FIELDS, ProviderSearchService, search_result,
+)
+
+
+class Command(BaseCommand):
+    help = 'Measure per-request CPU time of a search page: model instances vs values_list rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--params', default='',
+                            help='Search query string, e.g. "state=CA&specialty=cardio"')
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def model_page(self, queryset, page_size):
+        """The pipeline the list views used before: model instances, getattr, JsonResponse"""
+        fields = {**PROVIDER_RESULT_FIELDS, **TAXONOMY_RESULT_FIELDS}
+        timings = {}
+
+        started = time.process_time()
+        providers = list(queryset[:page_size])
+        timings['fetch'] = time.process_time() - started
+
+        started = time.process_time()
+        results = []
+        for provider in providers:
+            result = {'entity_type_display': 'Individual'}
+            for key, column in fields.items():
+                result[key] = getattr(provider, column, None)
+            result['distance_miles'] = distance_value(result['distance_miles'])
+            results.append(result)
+        timings['serialize'] = time.process_time() - started
+
+        started = time.process_time()
+        body = JsonResponse({'results': results}).content
+        timings['encode'] = time.process_time() - started
+        return timings, body
+
+    def row_page(self, queryset, page_size):
+        """values_list rows through the precompiled search_result serializer"""
+        timings = {}
+
+        started = time.process_time()
+        rows = list(search_result.values(queryset)[:page_size])
+        timings['fetch'] = time.process_time() - started
+
+        started = time.process_time()
+        results = [search_result(row) for row in rows]
+        timings['serialize'] = time.process_time() - started
+
+        started = time.process_time()
+        body = serializers.dumps({'results': results})
+        timings['encode'] = time.process_time() - started
+        return timings, body
+
+    def run(self, pipeline, queryset, options):
+        pipeline(queryset, options['page_size'])  # warm up connection and query plans
+        samples = {'fetch': [], 'serialize': [], 'encode': []}
+        for _ in range(options['iterations']):
+            timings, body = pipeline(queryset, options['page_size'])
+            for stage, seconds in timings.items():
+                samples[stage].append(seconds * 1000)
+        medians = {stage: statistics.median(values) for stage, values in samples.items()}
+        medians['total'] = sum(medians.values())
+        return medians, body
+
+    def handle(self, *args, **options):
+        self.stdout.write("=== ROW PIPELINE BENCHMARK ===\n")
+
+        queryset = ProviderSearchService.search_providers(QueryDict(options['params']))
+        encoder = 'orjson' if serializers.orjson is not None else 'json (orjson not installed)'
+        self.stdout.write(f"Search: {options['params'] or '(all providers)'}")
+        self.stdout.write(f"Page size: {options['page_size']}, iterations: {options['iterations']}")
+        self.stdout.write(f"Encoder: {encoder}\n")
+
+        model, model_body = self.run(self.model_page, queryset, options)
+        rows, row_body = self.run(self.row_page, queryset, options)
+
+        if json.loads(model_body) != json.loads(row_body):
+            self.stdout.write(self.style.ERROR("✗ Pipelines produced different results"))
+            return
+
+        self.stdout.write(f"{'CPU ms (median)':<16}{'model':>10}{'rows':>10}")
+        for stage in ('fetch', 'serialize', 'encode', 'total'):
+            self.stdout.write(f"{stage:<16}{model[stage]:>10.2f}{rows[stage]:>10.2f}")
+
+        speedup = model['total'] / rows['total'] if rows['total'] else float('inf')
+        self.stdout.write(
+            self.style.SUCCESS(f"\n✓ values_list rows use {speedup:.1f}x less CPU per page")
+        )
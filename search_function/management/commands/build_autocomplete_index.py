@@ -0,0 +1,48 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from search_function.autocomplete import PrefixIndex
+from search_function.ingest import peak_rss_mb
+
+
+class Command(BaseCommand):
+    help = 'Build the quick search prefix index from the database and write it as a snapshot file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=getattr(settings, 'AUTOCOMPLETE_INDEX_PATH', None),
+                            help='Snapshot path (default: settings.AUTOCOMPLETE_INDEX_PATH)')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        if not output:
+            raise CommandError("No output path: pass --output or set AUTOCOMPLETE_INDEX_PATH")
+
+        self.stdout.write("=== BUILDING AUTOCOMPLETE INDEX ===\n")
+        started = time.monotonic()
+        index = PrefixIndex.from_database()
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ {len(index):,} name keys indexed in {time.monotonic() - started:.1f}s")
+        )
+
+        index.save(output)
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ Snapshot written to {output} ({os.path.getsize(output) / 1024 / 1024:,.1f} MB)")
+        )
+
+        # Sanity check the snapshot and report lookup latency
+        loaded = PrefixIndex.load(output)
+        queries = ['sm', 'smi', 'john', 'john sm', 'garcia mar']
+        started = time.perf_counter()
+        for query in queries:
+            loaded.lookup(query)
+        average_us = (time.perf_counter() - started) / len(queries) * 1_000_000
+
+        self.stdout.write(f"Data version: {loaded.version}")
+        self.stdout.write(f"Average lookup: {average_us:,.0f} µs")
+        self.stdout.write(f"Peak RSS: {peak_rss_mb():,.1f} MB")
+        self.stdout.write(
+            self.style.SUCCESS("\n=== AUTOCOMPLETE INDEX COMPLETE ===")
+        )
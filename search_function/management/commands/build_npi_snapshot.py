@@ -0,0 +1,47 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from search_function.ingest import peak_rss_mb
+from search_function.npi_snapshot import NpiSnapshot, export_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Export individual providers to the memory-mapped NPI snapshot used by detail and batch lookups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=getattr(settings, 'NPI_SNAPSHOT_PATH', None),
+                            help='Snapshot path (default: settings.NPI_SNAPSHOT_PATH)')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        if not output:
+            raise CommandError("No output path: pass --output or set NPI_SNAPSHOT_PATH")
+
+        self.stdout.write("=== BUILDING NPI SNAPSHOT ===\n")
+        started = time.monotonic()
+        rows, version = export_snapshot(output)
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ {rows:,} providers exported in {time.monotonic() - started:.1f}s")
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ Snapshot written to {output} ({os.path.getsize(output) / 1024 / 1024:,.1f} MB)")
+        )
+
+        # Sanity check the snapshot and report lookup latency
+        snapshot = NpiSnapshot.open(output)
+        npis = [f"{snapshot.npis[position]:010d}" for position in range(0, len(snapshot), max(len(snapshot) // 1000, 1))]
+        started = time.perf_counter()
+        for npi in npis:
+            if snapshot.get(npi) is None:
+                raise CommandError(f"NPI {npi} missing from the snapshot just written")
+        average_us = (time.perf_counter() - started) / len(npis) * 1_000_000 if npis else 0
+
+        self.stdout.write(f"Data version: {version}")
+        self.stdout.write(f"Average lookup: {average_us:,.1f} µs")
+        self.stdout.write(f"Peak RSS: {peak_rss_mb():,.1f} MB")
+        self.stdout.write(
+            self.style.SUCCESS("\n=== NPI SNAPSHOT COMPLETE ===")
+        )
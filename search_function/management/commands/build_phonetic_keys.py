@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from search_function.ingest import PHONETIC_FIELDS, copy_rows, refresh_provider_search
+from search_function.phonetic import phonetic_key
+
+
+KEYS_TABLE = 'provider_phonetic_keys'
+
+
+class Command(BaseCommand):
+    help = 'Fill the phonetic name keys for existing providers (ingestion maintains them afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50000,
+                            help='Providers updated per transaction')
+
+    def handle(self, *args, **options):
+        self.stdout.write("=== BUILDING PHONETIC KEYS ===\n")
+        started = time.monotonic()
+        batch_size = options['batch_size']
+        last_npi = ''
+        total = 0
+
+        # Keys are computed in Python (the same code ingestion uses), so each
+        # batch is read, encoded and written back through a temp table
+        while True:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT npi, first_name, last_name FROM providers
+                    WHERE entity_type_code = '1' AND npi > %s
+                    ORDER BY npi LIMIT %s
+                """, [last_npi, batch_size])
+                batch = cursor.fetchall()
+                if not batch:
+                    break
+
+                cursor.execute(
+                    f"CREATE TEMP TABLE {KEYS_TABLE} "
+                    f"(npi varchar(10), {', '.join(f'{field} varchar(8)' for field in PHONETIC_FIELDS)}) "
+                    "ON COMMIT DROP"
+                )
+                copy_rows(cursor, KEYS_TABLE, ['npi'] + PHONETIC_FIELDS, (
+                    (npi, phonetic_key(first_name), phonetic_key(last_name))
+                    for npi, first_name, last_name in batch
+                ))
+                cursor.execute(f"""
+                    UPDATE providers p
+                    SET {', '.join(f'{field} = k.{field}' for field in PHONETIC_FIELDS)}
+                    FROM {KEYS_TABLE} k
+                    WHERE p.npi = k.npi
+                      AND ({', '.join(f'p.{field}' for field in PHONETIC_FIELDS)})
+                          IS DISTINCT FROM ({', '.join(f'k.{field}' for field in PHONETIC_FIELDS)})
+                """)
+                refresh_provider_search(cursor, f"SELECT npi FROM {KEYS_TABLE}")
+            total += len(batch)
+            last_npi = batch[-1][0]
+            self.stdout.write(f"  {total:,} providers...")
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE providers")
+            cursor.execute("ANALYZE provider_search")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"\n✓ Phonetic keys built for {total:,} providers in {time.monotonic() - started:.1f}s")
+        )
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from django.db import connection
+from search_function.ingest import missing_taxonomy_references
 from search_function.models import Provider, NuccTaxonomy
 
 
@@ -103,6 +104,20 @@ class Command(BaseCommand):
                         self.style.WARNING(f"⚠ Taxonomy code {taxonomy_code} not found in taxonomy table")
                     )
             
+            # Every provider at once, not just the sample
+            with connection.cursor() as cursor:
+                missing_providers, missing_codes = missing_taxonomy_references(cursor)
+            if missing_codes:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"⚠ {missing_providers:,} providers reference {len(missing_codes):,} unknown taxonomy codes"
+                    )
+                )
+            else:
+                self.stdout.write(
+                    self.style.SUCCESS("✓ All provider taxonomy codes found in taxonomy table")
+                )
+            
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f"✗ Relationship check error: {e}")
@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+
+# Indexes on provider_search (partitioned, one index per partition),
+# built by migrations 0012/0013 and every full load
+EXPECTED_INDEXES = [
+    ('provider_search_npi_idx', 'delta refreshes'),
+    ('provider_search_first_name_trgm_idx', 'first_name'),
+    ('provider_search_last_name_trgm_idx', 'last_name'),
+    ('provider_search_city_trgm_idx', 'city'),
+    ('provider_search_specialty_trgm_idx', 'specialty'),
+    ('provider_search_name_npi_idx', "order_by('last_name', 'first_name', 'npi') and cursor pages"),
+    ('provider_search_zip5_idx', 'zip_code and radius search (lat/lon, near_zip)'),
+    ('provider_search_last_phonetic_idx', 'match=phonetic'),
+    ('provider_search_first_phonetic_idx', 'match=phonetic (first name or single name)'),
+    ('provider_search_vector_idx', 'full-text search (q)'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Report which provider search indexes exist and are valid'
+
+    def handle(self, *args, **options):
+        self.stdout.write("=== CHECKING SEARCH INDEXES ===\n")
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT extversion FROM pg_extension WHERE extname = 'pg_trgm'"
+                )
+                row = cursor.fetchone()
+
+                # A partitioned index is valid once every partition has
+                # its index; its size is theirs
+                cursor.execute("""
+                    SELECT c.relname, i.indisvalid, i.indisready,
+                           pg_size_pretty((SELECT SUM(pg_relation_size(t.relid)) FROM pg_partition_tree(c.oid) t)::bigint)
+                    FROM pg_index i
+                    JOIN pg_class c ON c.oid = i.indexrelid
+                    WHERE c.relname = ANY(%s)
+                """, [[name for name, _ in EXPECTED_INDEXES]])
+                found = {name: (valid, ready, size) for name, valid, ready, size in cursor.fetchall()}
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f"✗ Index check failed: {e}")
+            )
+            return
+
+        if row:
+            self.stdout.write(
+                self.style.SUCCESS(f"✓ pg_trgm extension installed (version {row[0]})")
+            )
+        else:
+            self.stdout.write(
+                self.style.ERROR("✗ pg_trgm extension not installed")
+            )
+
+        missing = 0
+        for name, used_by in EXPECTED_INDEXES:
+            if name not in found:
+                missing += 1
+                self.stdout.write(
+                    self.style.ERROR(f"✗ {name} missing ({used_by})")
+                )
+                continue
+
+            valid, ready, size = found[name]
+            if valid and ready:
+                self.stdout.write(
+                    self.style.SUCCESS(f"✓ {name} valid, {size} ({used_by})")
+                )
+            else:
+                # An interrupted CREATE INDEX CONCURRENTLY leaves an invalid index behind
+                missing += 1
+                self.stdout.write(
+                    self.style.WARNING(f"⚠ {name} exists but is INVALID - drop it and re-run migrate")
+                )
+
+        if missing:
+            self.stdout.write(
+                self.style.WARNING(f"\n{missing} of {len(EXPECTED_INDEXES)} search indexes need attention")
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS("\n=== ALL SEARCH INDEXES VALID ===")
+            )
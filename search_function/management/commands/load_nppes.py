@@ -0,0 +1,155 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from search_function.autocomplete import refresh_autocomplete_index
+from search_function.data_version import bump_data_version
+from search_function.ingest import (
+    NUCC_TAXONOMY_TABLE_DDL, PROVIDER_FIELDS, PROVIDER_INDEXES, PROVIDER_SEARCH_INDEXES, PROVIDER_SEARCH_TABLE,
+    PROVIDERS_TABLE_DDL, SEARCH_VECTOR_SQL, build_provider_search, copy_rows, has_pg_trgm, iter_provider_rows,
+    peak_rss_mb, rename_provider_search,
+)
+from search_function.npi_snapshot import refresh_npi_snapshot
+from search_function.stats import refresh_provider_stats
+
+
+RAW_TABLE = 'providers_raw'
+STAGING_TABLE = 'providers_staging'
+OLD_TABLE = 'providers_old'
+SEARCH_STAGING_TABLE = 'provider_search_staging'
+SEARCH_OLD_TABLE = 'provider_search_old'
+
+
+class Command(BaseCommand):
+    help = 'Load a full NPPES dissemination file into the providers table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='NPPES npidata CSV or the dissemination zip')
+        parser.add_argument('--limit', type=int, help='Only load the first N records')
+        parser.add_argument('--keep-old', action='store_true',
+                            help=f'Keep the previous tables as {OLD_TABLE} and {SEARCH_OLD_TABLE} instead of dropping them')
+
+    def handle(self, *args, **options):
+        self.stdout.write("=== LOADING NPPES FILE ===\n")
+        self.load(iter_provider_rows(options['path'], options['limit']), keep_old=options['keep_old'])
+        self.stdout.write(self.style.SUCCESS("\n=== NPPES LOAD COMPLETE ==="))
+
+    def load(self, rows, keep_old=False):
+        """Replace providers and provider_search with rows (tuples in PROVIDER_FIELDS order)"""
+        started = time.monotonic()
+
+        # 1. Stream the file into an unlogged raw table with COPY
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {RAW_TABLE}")
+            cursor.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+            cursor.execute(
+                PROVIDERS_TABLE_DDL.format(table=RAW_TABLE).replace('CREATE TABLE', 'CREATE UNLOGGED TABLE', 1)
+            )
+            try:
+                loaded = copy_rows(cursor, RAW_TABLE, PROVIDER_FIELDS, rows)
+            except (OSError, ValueError, RuntimeError) as e:
+                cursor.execute(f"DROP TABLE IF EXISTS {RAW_TABLE}")
+                raise CommandError(f"Load failed: {e}")
+
+        load_seconds = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ Copied {loaded:,} records into {RAW_TABLE} in {load_seconds:.1f}s")
+        )
+
+        # 2. Write the staging table once, deriving the full-text vectors on the way
+        derive_started = time.monotonic()
+        columns = ', '.join(PROVIDER_FIELDS)
+        with connection.cursor() as cursor:
+            # Vectors read taxonomy text; load_taxonomy fills them in later if
+            # the taxonomy table is not loaded yet
+            cursor.execute(NUCC_TAXONOMY_TABLE_DDL)
+            cursor.execute(PROVIDERS_TABLE_DDL.format(table=STAGING_TABLE))
+            cursor.execute(f"""
+                INSERT INTO {STAGING_TABLE} ({columns}, search_vector)
+                SELECT {columns}, {SEARCH_VECTOR_SQL} FROM {RAW_TABLE} p
+            """)
+            cursor.execute(f"DROP TABLE {RAW_TABLE}")
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ Search vectors built in {time.monotonic() - derive_started:.1f}s")
+        )
+
+        # 3. Build indexes once, after the data is in place
+        index_started = time.monotonic()
+        self.build_indexes()
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {STAGING_TABLE}")
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ Indexes built in {time.monotonic() - index_started:.1f}s")
+        )
+
+        # 4. Project the individuals into the search table the list endpoints read
+        search_started = time.monotonic()
+        with connection.cursor() as cursor:
+            if not has_pg_trgm(cursor):
+                self.stdout.write(
+                    self.style.WARNING("⚠ pg_trgm not installed - skipping trigram indexes")
+                )
+            cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_STAGING_TABLE}")
+            projected = build_provider_search(cursor, SEARCH_STAGING_TABLE, STAGING_TABLE, index_suffix='_new')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ {projected:,} providers projected into {SEARCH_STAGING_TABLE} "
+                f"in {time.monotonic() - search_started:.1f}s"
+            )
+        )
+
+        # 5. Swap both tables in together; searches keep using the old ones until commit
+        self.swap_tables(keep_old=keep_old)
+        self.stdout.write(self.style.SUCCESS(f"✓ providers and {PROVIDER_SEARCH_TABLE} tables swapped"))
+
+        refresh_provider_stats()
+        self.stdout.write(self.style.SUCCESS("✓ Provider stats refreshed"))
+
+        version = bump_data_version()
+        snapshot = refresh_npi_snapshot()
+        autocomplete = refresh_autocomplete_index()
+        if snapshot:
+            self.stdout.write(self.style.SUCCESS(f"✓ NPI snapshot written ({snapshot[0]:,} providers)"))
+        if autocomplete:
+            self.stdout.write(self.style.SUCCESS(f"✓ Autocomplete index written ({autocomplete[0]:,} name keys)"))
+        elapsed = time.monotonic() - started
+        self.stdout.write(f"\nRecords loaded: {loaded:,}")
+        self.stdout.write(f"Total time: {elapsed:.1f}s")
+        self.stdout.write(f"Throughput: {loaded / load_seconds if load_seconds else 0:,.0f} rows/sec (COPY)")
+        self.stdout.write(f"Peak RSS: {peak_rss_mb():,.1f} MB")
+        self.stdout.write(f"Data version: {version}")
+
+    def build_indexes(self):
+        with connection.cursor() as cursor:
+            for name, create_sql, _needs_trigram in PROVIDER_INDEXES:
+                cursor.execute(create_sql.format(name=f"{name}_new", table=STAGING_TABLE))
+
+    def swap_tables(self, keep_old=False):
+        swaps = [
+            (STAGING_TABLE, 'providers', OLD_TABLE, PROVIDER_INDEXES, rename_table),
+            # provider_search's partitions are renamed along with it
+            (SEARCH_STAGING_TABLE, PROVIDER_SEARCH_TABLE, SEARCH_OLD_TABLE, PROVIDER_SEARCH_INDEXES,
+             rename_provider_search),
+        ]
+        with transaction.atomic(), connection.cursor() as cursor:
+            for staging, live, old, indexes, rename in swaps:
+                cursor.execute(f"DROP TABLE IF EXISTS {old}")
+                cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [live])
+                if cursor.fetchone()[0]:
+                    rename(cursor, live, old)
+                    for name, _create_sql, _needs_trigram in indexes:
+                        cursor.execute(f"ALTER INDEX IF EXISTS {name} RENAME TO {name}_old")
+
+                rename(cursor, staging, live)
+                for name, _create_sql, _needs_trigram in indexes:
+                    cursor.execute(f"ALTER INDEX IF EXISTS {name}_new RENAME TO {name}")
+
+        if not keep_old:
+            with connection.cursor() as cursor:
+                for _staging, _live, old, _indexes, _rename in swaps:
+                    cursor.execute(f"DROP TABLE IF EXISTS {old}")
+
+
+def rename_table(cursor, table, new_table):
+    cursor.execute(f"ALTER TABLE {table} RENAME TO {new_table}")
@@ -0,0 +1,145 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from search_function.autocomplete import refresh_autocomplete_index
+from search_function.data_version import PROVIDER_DATA, bump_data_version
+from search_function.ingest import (
+    NUCC_COLUMNS, NUCC_TAXONOMY_TABLE_DDL,
+    iter_taxonomy_rows, missing_taxonomy_references, refresh_provider_search, taxonomy_release_version,
+    update_search_vectors,
+)
+from search_function.models import NuccTaxonomy, TaxonomyRelease
+from search_function.npi_snapshot import refresh_npi_snapshot
+from search_function.taxonomy import TAXONOMY_DATA, TAXONOMY_FIELDS, reload_taxonomy_registry
+
+
+class Command(BaseCommand):
+    help = 'Load a NUCC taxonomy CSV release into nucc_taxonomy, applying only the changes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?',
+                            default=os.path.join(settings.BASE_DIR, 'nucc_taxonomy_251.csv'),
+                            help='NUCC taxonomy CSV (default: the release shipped with the project)')
+        parser.add_argument('--release', help="Release version, e.g. 25.1 (default: taken from the file name)")
+        parser.add_argument('--dry-run', action='store_true', help='Report the diff without changing anything')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        release = options['release'] or taxonomy_release_version(path)
+        if not release:
+            raise CommandError("Cannot tell the release from the file name; pass --release")
+
+        self.stdout.write(f"=== LOADING NUCC TAXONOMY {release} ===\n")
+        try:
+            incoming = {row[0]: row for row in iter_taxonomy_rows(path)}
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(NUCC_TAXONOMY_TABLE_DDL)
+
+            current = {row[0]: row for row in NuccTaxonomy.objects.values_list(*TAXONOMY_FIELDS)}
+            added = sorted(set(incoming) - set(current))
+            removed = sorted(set(current) - set(incoming))
+            changed = sorted(
+                code for code in set(incoming) & set(current)
+                if incoming[code] != self.normalize(current[code])
+            )
+
+            self.report_diff(current, incoming, added, removed, changed)
+
+            fields = [field for field, _header in NUCC_COLUMNS]
+            NuccTaxonomy.objects.bulk_create(
+                [NuccTaxonomy(**dict(zip(fields, incoming[code]))) for code in added], batch_size=500
+            )
+            NuccTaxonomy.objects.filter(code__in=removed).delete()
+            NuccTaxonomy.objects.bulk_update(
+                [NuccTaxonomy(**dict(zip(fields, incoming[code]))) for code in changed],
+                fields[1:], batch_size=500
+            )
+
+            self.refresh_search_vectors(added + removed + changed)
+
+            TaxonomyRelease.objects.create(
+                version=release, file_name=os.path.basename(path), codes=len(incoming),
+                added=len(added), removed=len(removed), changed=len(changed),
+            )
+
+            self.report_missing_references()
+
+            if options['dry_run']:
+                transaction.set_rollback(True)
+                self.stdout.write(self.style.WARNING("\nDry run - no changes saved"))
+                return
+
+        if added or removed or changed:
+            bump_data_version(TAXONOMY_DATA)
+            # Cached search responses embed taxonomy text
+            bump_data_version(PROVIDER_DATA)
+            snapshot = refresh_npi_snapshot()
+            autocomplete = refresh_autocomplete_index()
+            if snapshot:
+                self.stdout.write(self.style.SUCCESS(f"✓ NPI snapshot written ({snapshot[0]:,} providers)"))
+            if autocomplete:
+                self.stdout.write(self.style.SUCCESS(f"✓ Autocomplete index written ({autocomplete[0]:,} name keys)"))
+        reload_taxonomy_registry()
+
+        self.stdout.write(self.style.SUCCESS(f"\n=== NUCC TAXONOMY {release} LOADED ==="))
+
+    @staticmethod
+    def normalize(row):
+        """Compare like the CSV reader: blank strings are NULL"""
+        return tuple((value or '').strip() or None for value in row)
+
+    def report_diff(self, current, incoming, added, removed, changed):
+        latest = TaxonomyRelease.objects.first()
+        self.stdout.write(
+            f"Currently loaded: {latest.version if latest else 'unknown release'} ({len(current):,} codes)"
+        )
+        self.stdout.write(f"New release: {len(incoming):,} codes")
+        self.stdout.write(f"  Added: {len(added):,}")
+        self.stdout.write(f"  Removed: {len(removed):,}")
+        self.stdout.write(f"  Changed: {len(changed):,}")
+        for label, codes in (('+', added), ('-', removed), ('~', changed)):
+            for code in codes[:5]:
+                row = incoming.get(code) or current.get(code)
+                self.stdout.write(f"    {label} {code} {row[2] or ''}")
+
+    def refresh_search_vectors(self, codes):
+        """Full-text vectors and provider_search rows embed taxonomy text; rebuild those that changed"""
+        if not codes:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('providers') IS NOT NULL, to_regclass('provider_search') IS NOT NULL")
+            has_providers, has_search = cursor.fetchone()
+            if not has_providers:
+                return
+            updated = update_search_vectors(cursor, "p.primary_taxonomy_code = ANY(%s)", [codes])
+            if has_search:
+                refresh_provider_search(
+                    cursor, "SELECT npi FROM providers WHERE primary_taxonomy_code = ANY(%s)", [codes]
+                )
+        self.stdout.write(f"Search vectors updated: {updated:,} providers")
+
+    def report_missing_references(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('providers') IS NOT NULL")
+            if not cursor.fetchone()[0]:
+                return
+            providers, missing = missing_taxonomy_references(cursor)
+
+        if not missing:
+            self.stdout.write(self.style.SUCCESS("✓ Every provider taxonomy code is in this release"))
+            return
+
+        self.stdout.write(
+            self.style.WARNING(
+                f"⚠ {providers:,} providers reference {len(missing):,} codes missing from this release"
+            )
+        )
+        for code, count in missing[:5]:
+            self.stdout.write(f"    {code}: {count:,} providers")
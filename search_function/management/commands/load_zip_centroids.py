@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from search_function.autocomplete import refresh_autocomplete_index
+from search_function.data_version import PROVIDER_DATA, bump_data_version
+from search_function.ingest import copy_rows, iter_zip_centroid_rows
+from search_function.models import ZipCentroid
+from search_function.npi_snapshot import refresh_npi_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Replace zip_centroids with a Census ZCTA Gazetteer file (or a zip,lat,lon CSV) for radius search'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Gazetteer ZCTA file (e.g. 2024_Gaz_zcta_national.txt) or CSV')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        self.stdout.write("=== LOADING ZIP CENTROIDS ===\n")
+        previous = ZipCentroid.objects.count()
+
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {ZipCentroid._meta.db_table}")
+                loaded = copy_rows(
+                    cursor, ZipCentroid._meta.db_table, ['zip_code', 'latitude', 'longitude'],
+                    iter_zip_centroid_rows(path)
+                )
+                if not loaded:
+                    raise ValueError("no ZIP centroids found")
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot load {path}: {e}")
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {ZipCentroid._meta.db_table}")
+
+        # Radius search results (and their cached counts) depend on the centroids
+        bump_data_version(PROVIDER_DATA)
+        snapshot = refresh_npi_snapshot()
+        autocomplete = refresh_autocomplete_index()
+
+        self.stdout.write(f"Previously loaded: {previous:,} ZIP codes")
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ {loaded:,} ZIP centroids loaded")
+        )
+        if snapshot:
+            self.stdout.write(self.style.SUCCESS(f"✓ NPI snapshot written ({snapshot[0]:,} providers)"))
+        if autocomplete:
+            self.stdout.write(self.style.SUCCESS(f"✓ Autocomplete index written ({autocomplete[0]:,} name keys)"))
+        self.report_unmatched_providers()
+        self.stdout.write(
+            self.style.SUCCESS("\n=== ZIP CENTROIDS LOADED ===")
+        )
+
+    def report_unmatched_providers(self):
+        """Individual providers that radius searches cannot place"""
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('providers') IS NOT NULL")
+            if not cursor.fetchone()[0]:
+                return
+            cursor.execute("""
+                SELECT COUNT(*)
+                FROM providers p
+                WHERE p.entity_type_code = '1'
+                  AND NOT EXISTS (
+                      SELECT 1 FROM zip_centroids z
+                      WHERE z.zip_code = SUBSTRING(p.practice_postal_code, 1, 5)
+                  )
+            """)
+            unmatched = cursor.fetchone()[0]
+
+        if unmatched:
+            self.stdout.write(
+                self.style.WARNING(f"⚠ {unmatched:,} individual providers have a practice ZIP with no centroid")
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS("✓ Every individual provider's practice ZIP has a centroid"))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from search_function.stats import refresh_provider_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the provider_stats snapshot behind health, states and cities endpoints'
+
+    def handle(self, *args, **options):
+        self.stdout.write("=== REFRESHING PROVIDER STATS ===\n")
+        started = time.monotonic()
+        stats = refresh_provider_stats()
+        total = stats[0]
+
+        self.stdout.write(f"Individual providers: {total.individual_providers:,}")
+        self.stdout.write(f"States: {len(stats) - 1:,}")
+        self.stdout.write(f"Cities: {len(total.cities):,}")
+        self.stdout.write(
+            self.style.SUCCESS(f"\n✓ Provider stats refreshed in {time.monotonic() - started:.1f}s")
+        )
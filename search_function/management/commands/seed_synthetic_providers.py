@@ -0,0 +1,57 @@
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+
+from search_function.synthetic import DEFAULT_TAXONOMY_PATH, iter_synthetic_provider_rows
+
+from .load_nppes import Command as LoadNppesCommand
+
+
+class Command(LoadNppesCommand):
+    help = 'Replace the providers table with a deterministic synthetic NPPES-scale dataset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1_000_000, help='Number of providers to generate')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Random seed; the same count and seed always give the same rows')
+        parser.add_argument('--taxonomy', default=DEFAULT_TAXONOMY_PATH,
+                            help='NUCC taxonomy CSV the taxonomy codes are drawn from')
+        parser.add_argument('--replace', action='store_true',
+                            help='Required when the providers table already has data')
+        parser.add_argument('--keep-old', action='store_true',
+                            help='Keep the previous tables instead of dropping them')
+
+    def has_providers(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('providers') IS NOT NULL")
+            if not cursor.fetchone()[0]:
+                return False
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM providers)")
+            return cursor.fetchone()[0]
+
+    def has_taxonomy(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('nucc_taxonomy') IS NOT NULL")
+            if not cursor.fetchone()[0]:
+                return False
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM nucc_taxonomy)")
+            return cursor.fetchone()[0]
+
+    def handle(self, *args, **options):
+        if options['count'] < 1:
+            raise CommandError("--count must be at least 1")
+        if self.has_providers() and not options['replace']:
+            raise CommandError("The providers table already has data; pass --replace to overwrite it")
+
+        self.stdout.write("=== SEEDING SYNTHETIC PROVIDERS ===\n")
+        self.stdout.write(f"Providers: {options['count']:,}, seed: {options['seed']}")
+        if not self.has_taxonomy():
+            # Search vectors and the search projection read the taxonomy text
+            call_command('load_taxonomy', options['taxonomy'], stdout=self.stdout)
+
+        try:
+            rows = iter_synthetic_provider_rows(options['count'], options['seed'], options['taxonomy'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read {options['taxonomy']}: {e}")
+        self.load(rows, keep_old=options['keep_old'])
+        self.stdout.write(self.style.SUCCESS("\n=== SYNTHETIC DATASET READY ==="))
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NuccTaxonomy',
+            fields=[
+                ('code', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('grouping', models.TextField(blank=True, null=True)),
+                ('classification', models.TextField(blank=True, null=True)),
+                ('specialization', models.TextField(blank=True, null=True)),
+                ('definition', models.TextField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('display_name', models.TextField(blank=True, null=True)),
+                ('section', models.TextField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'nucc_taxonomy',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Provider',
+            fields=[
+                ('npi', models.CharField(max_length=10, primary_key=True, serialize=False)),
+                ('entity_type_code', models.CharField(blank=True, max_length=1, null=True)),
+                ('organization_name', models.TextField(blank=True, null=True)),
+                ('last_name', models.TextField(blank=True, null=True)),
+                ('first_name', models.TextField(blank=True, null=True)),
+                ('middle_name', models.TextField(blank=True, null=True)),
+                ('practice_address_line1', models.TextField(blank=True, null=True)),
+                ('practice_address_line2', models.TextField(blank=True, null=True)),
+                ('practice_city', models.TextField(blank=True, null=True)),
+                ('practice_state', models.CharField(blank=True, max_length=2, null=True)),
+                ('practice_postal_code', models.CharField(blank=True, max_length=20, null=True)),
+                ('practice_phone', models.CharField(blank=True, max_length=20, null=True)),
+                ('primary_taxonomy_code', models.CharField(blank=True, max_length=20, null=True)),
+            ],
+            options={
+                'db_table': 'providers',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,85 @@
+# search_function/migrations/0002_search_indexes.py
+#
+# The providers and nucc_taxonomy tables are unmanaged, so Django never
+# creates indexes for them. These indexes back the filters and ordering used
+# by ProviderSearchService.search_providers:
+#
+#   * first_name / last_name / practice_city use ``__icontains`` which Django
+#     renders as ``UPPER(col::text) LIKE UPPER('%x%')``. A GIN trigram index on
+#     the same ``UPPER(col)`` expression lets Postgres answer those lookups
+#     without a sequential scan.
+#   * Every search is restricted to ``entity_type_code = '1'`` and ordered by
+#     ``(last_name, first_name)``, so the indexes are partial on that predicate.
+#
+# Indexes are built CONCURRENTLY so a live database keeps serving searches
+# while they are created; that requires a non-atomic migration.
+
+from django.db import migrations
+
+from search_function.migrations._providers import providers_table_exists
+
+
+SEARCH_INDEXES = [
+    (
+        'providers_first_name_trgm_idx',
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS providers_first_name_trgm_idx "
+        "ON providers USING gin (UPPER(first_name) gin_trgm_ops) "
+        "WHERE entity_type_code = '1'",
+    ),
+    (
+        'providers_last_name_trgm_idx',
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS providers_last_name_trgm_idx "
+        "ON providers USING gin (UPPER(last_name) gin_trgm_ops) "
+        "WHERE entity_type_code = '1'",
+    ),
+    (
+        'providers_practice_city_trgm_idx',
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS providers_practice_city_trgm_idx "
+        "ON providers USING gin (UPPER(practice_city) gin_trgm_ops) "
+        "WHERE entity_type_code = '1'",
+    ),
+    (
+        'providers_individual_name_idx',
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS providers_individual_name_idx "
+        "ON providers (last_name, first_name) "
+        "WHERE entity_type_code = '1'",
+    ),
+    (
+        'providers_individual_state_name_idx',
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS providers_individual_state_name_idx "
+        "ON providers (UPPER(practice_state), last_name, first_name) "
+        "WHERE entity_type_code = '1'",
+    ),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    if not providers_table_exists(schema_editor):
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for _name, create_sql in SEARCH_INDEXES:
+            cursor.execute(create_sql)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if not providers_table_exists(schema_editor):
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        for name, _create_sql in SEARCH_INDEXES:
+            cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('search_function', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
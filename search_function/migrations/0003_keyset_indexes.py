@@ -0,0 +1,69 @@
+# search_function/migrations/0003_keyset_indexes.py
+#
+# Searches now order by (last_name, first_name, npi) so that cursor
+# pagination has a total order. Replace the name indexes from 0002 with
+# versions that include npi, so the keyset row comparison
+# ``(last_name, first_name, npi) > (...)`` is a pure index range scan.
+
+from django.db import migrations
+
+from search_function.migrations._providers import providers_table_exists
+
+
+KEYSET_INDEXES = [
+    (
+        'providers_individual_name_npi_idx',
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS providers_individual_name_npi_idx "
+        "ON providers (last_name, first_name, npi) "
+        "WHERE entity_type_code = '1'",
+        'providers_individual_name_idx',
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS providers_individual_name_idx "
+        "ON providers (last_name, first_name) "
+        "WHERE entity_type_code = '1'",
+    ),
+    (
+        'providers_individual_state_name_npi_idx',
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS providers_individual_state_name_npi_idx "
+        "ON providers (UPPER(practice_state), last_name, first_name, npi) "
+        "WHERE entity_type_code = '1'",
+        'providers_individual_state_name_idx',
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS providers_individual_state_name_idx "
+        "ON providers (UPPER(practice_state), last_name, first_name) "
+        "WHERE entity_type_code = '1'",
+    ),
+]
+
+
+def create_keyset_indexes(apps, schema_editor):
+    if not providers_table_exists(schema_editor):
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        # Build the replacement before dropping the old index so searches
+        # always have one to use
+        for name, create_sql, old_name, _old_create_sql in KEYSET_INDEXES:
+            cursor.execute(create_sql)
+            cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {old_name}")
+
+
+def drop_keyset_indexes(apps, schema_editor):
+    if not providers_table_exists(schema_editor):
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        for name, _create_sql, _old_name, old_create_sql in KEYSET_INDEXES:
+            cursor.execute(old_create_sql)
+            cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('search_function', '0002_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_keyset_indexes, drop_keyset_indexes),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_function', '0004_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NppesDeltaFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(max_length=255)),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('kind', models.CharField(choices=[('weekly', 'Weekly update'), ('deactivation', 'Deactivation report')], max_length=20)),
+                ('rows_upserted', models.PositiveIntegerField(default=0)),
+                ('rows_deactivated', models.PositiveIntegerField(default=0)),
+                ('applied_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'nppes_delta_files',
+                'ordering': ['applied_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_function', '0005_nppes_delta_files'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaxonomyRelease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=20)),
+                ('file_name', models.CharField(max_length=255)),
+                ('codes', models.PositiveIntegerField(default=0)),
+                ('added', models.PositiveIntegerField(default=0)),
+                ('removed', models.PositiveIntegerField(default=0)),
+                ('changed', models.PositiveIntegerField(default=0)),
+                ('loaded_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'nucc_taxonomy_releases',
+                'ordering': ['-loaded_at'],
+                'get_latest_by': 'loaded_at',
+            },
+        ),
+    ]
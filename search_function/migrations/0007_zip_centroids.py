@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_function', '0006_taxonomy_releases'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZipCentroid',
+            fields=[
+                ('zip_code', models.CharField(max_length=5, primary_key=True, serialize=False)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+            ],
+            options={
+                'db_table': 'zip_centroids',
+                'indexes': [models.Index(fields=['latitude', 'longitude'], name='zip_centroids_lat_lon_idx')],
+            },
+        ),
+    ]
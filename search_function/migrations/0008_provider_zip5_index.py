@@ -0,0 +1,45 @@
+# search_function/migrations/0008_provider_zip5_index.py
+#
+# Radius searches match providers whose 5-digit practice ZIP is one of the
+# ZIP centroids inside the search circle. Index that expression so the
+# match is an index lookup per ZIP instead of a scan of every provider.
+
+from django.db import migrations
+
+from search_function.migrations._providers import providers_table_exists
+
+
+ZIP5_INDEX = (
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS providers_individual_zip5_idx "
+    "ON providers (SUBSTRING(practice_postal_code, 1, 5)) "
+    "WHERE entity_type_code = '1'"
+)
+
+
+def create_zip5_index(apps, schema_editor):
+    if not providers_table_exists(schema_editor):
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(ZIP5_INDEX)
+
+
+def drop_zip5_index(apps, schema_editor):
+    if not providers_table_exists(schema_editor):
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS providers_individual_zip5_idx")
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('search_function', '0007_zip_centroids'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_zip5_index, drop_zip5_index),
+    ]
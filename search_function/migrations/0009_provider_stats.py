@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-17 05:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_function', '0008_provider_zip5_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderStats',
+            fields=[
+                ('state', models.CharField(max_length=3, primary_key=True, serialize=False)),
+                ('individual_providers', models.PositiveIntegerField(default=0)),
+                ('cities', models.JSONField(default=list)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'provider_stats',
+            },
+        ),
+    ]
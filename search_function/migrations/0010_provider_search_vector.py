@@ -0,0 +1,45 @@
+# search_function/migrations/0010_provider_search_vector.py
+#
+# Full-text search (?q=) matches a stored tsvector of each individual
+# provider's names, practice city and taxonomy text. Ingestion maintains
+# the column; on an existing database run `manage.py build_search_vectors`
+# once after this migration to fill it in.
+
+from django.db import migrations
+
+from search_function.migrations._providers import providers_table_exists
+
+
+def add_search_vector(apps, schema_editor):
+    if not providers_table_exists(schema_editor):
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("ALTER TABLE providers ADD COLUMN IF NOT EXISTS search_vector tsvector")
+        cursor.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS providers_search_vector_idx "
+            "ON providers USING gin (search_vector) "
+            "WHERE entity_type_code = '1'"
+        )
+
+
+def drop_search_vector(apps, schema_editor):
+    if not providers_table_exists(schema_editor):
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS providers_search_vector_idx")
+        cursor.execute("ALTER TABLE providers DROP COLUMN IF EXISTS search_vector")
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('search_function', '0009_provider_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_vector, drop_search_vector),
+    ]
@@ -0,0 +1,66 @@
+# search_function/migrations/0011_provider_phonetic_keys.py
+#
+# match=phonetic looks up misspelled names by their Double Metaphone keys.
+# Ingestion writes the keys; on an existing database run
+# `manage.py build_phonetic_keys` once after this migration to fill them in.
+
+from django.db import migrations
+
+from search_function.migrations._providers import providers_table_exists
+
+
+PHONETIC_INDEXES = [
+    (
+        'providers_individual_last_phonetic_idx',
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS providers_individual_last_phonetic_idx "
+        "ON providers (last_name_phonetic, first_name_phonetic) "
+        "WHERE entity_type_code = '1'",
+    ),
+    (
+        'providers_individual_first_phonetic_idx',
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS providers_individual_first_phonetic_idx "
+        "ON providers (first_name_phonetic) "
+        "WHERE entity_type_code = '1'",
+    ),
+]
+
+
+def add_phonetic_keys(apps, schema_editor):
+    if not providers_table_exists(schema_editor):
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "ALTER TABLE providers "
+            "ADD COLUMN IF NOT EXISTS first_name_phonetic varchar(8), "
+            "ADD COLUMN IF NOT EXISTS last_name_phonetic varchar(8)"
+        )
+        for _name, create_sql in PHONETIC_INDEXES:
+            cursor.execute(create_sql)
+
+
+def drop_phonetic_keys(apps, schema_editor):
+    if not providers_table_exists(schema_editor):
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        for name, _create_sql in PHONETIC_INDEXES:
+            cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        cursor.execute(
+            "ALTER TABLE providers "
+            "DROP COLUMN IF EXISTS first_name_phonetic, "
+            "DROP COLUMN IF EXISTS last_name_phonetic"
+        )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('search_function', '0010_provider_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_phonetic_keys, drop_phonetic_keys),
+    ]
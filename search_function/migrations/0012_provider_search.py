@@ -0,0 +1,163 @@
+# search_function/migrations/0012_provider_search.py
+#
+# The list endpoints read the provider_search projection instead of
+# providers + nucc_taxonomy. It is derived data that load_nppes rebuilds on
+# every full load; the table, its rows and its indexes are created here as
+# they were when this migration was written, so later layouts (see 0013)
+# do not change what it does. The providers search indexes it replaces are
+# dropped.
+
+from django.db import migrations
+
+from search_function.migrations._providers import providers_table_exists
+
+
+PROVIDER_SEARCH_DDL = """
+    CREATE TABLE provider_search (
+        npi varchar(10) NOT NULL,
+        first_name text,
+        middle_name text,
+        last_name text,
+        full_name text NOT NULL,
+        practice_address_line1 text,
+        practice_address_line2 text,
+        practice_city text,
+        practice_state varchar(2),
+        practice_postal_code varchar(20),
+        zip5 varchar(5),
+        practice_phone varchar(20),
+        full_address text NOT NULL,
+        primary_taxonomy_code varchar(20),
+        taxonomy_classification text,
+        taxonomy_specialization text,
+        taxonomy_grouping text,
+        specialty_key text NOT NULL,
+        first_name_lower text,
+        last_name_lower text,
+        city_lower text,
+        specialty_lower text,
+        first_name_phonetic varchar(8),
+        last_name_phonetic varchar(8),
+        search_vector tsvector
+    )
+"""
+
+FILL_PROVIDER_SEARCH_SQL = """
+    INSERT INTO provider_search (
+        npi, first_name, middle_name, last_name, full_name,
+        practice_address_line1, practice_address_line2, practice_city, practice_state,
+        practice_postal_code, zip5, practice_phone, full_address,
+        primary_taxonomy_code, taxonomy_classification, taxonomy_specialization, taxonomy_grouping,
+        specialty_key, first_name_lower, last_name_lower, city_lower, specialty_lower,
+        first_name_phonetic, last_name_phonetic, search_vector
+    )
+    SELECT p.npi, p.first_name, p.middle_name, p.last_name,
+           CASE WHEN NULLIF(p.organization_name, '') IS NOT NULL THEN p.organization_name
+                ELSE COALESCE(NULLIF(concat_ws(' ', NULLIF(p.first_name, ''), NULLIF(p.middle_name, ''),
+                                               NULLIF(p.last_name, '')), ''), 'Unknown Individual')
+           END,
+           p.practice_address_line1, p.practice_address_line2, p.practice_city, UPPER(p.practice_state),
+           p.practice_postal_code, SUBSTRING(p.practice_postal_code, 1, 5), p.practice_phone,
+           concat_ws(', ', NULLIF(p.practice_address_line1, ''), NULLIF(p.practice_address_line2, ''),
+                     NULLIF(p.practice_city, ''), NULLIF(p.practice_state, ''), NULLIF(p.practice_postal_code, '')),
+           p.primary_taxonomy_code, nt.classification, nt.specialization, nt.grouping,
+           COALESCE(NULLIF(nt.grouping, ''), NULLIF(nt.classification, ''), 'Unknown Specialty'),
+           LOWER(p.first_name), LOWER(p.last_name), LOWER(p.practice_city),
+           LOWER(concat_ws('|', nt.classification, nt.specialization, nt.grouping)),
+           p.first_name_phonetic, p.last_name_phonetic, p.search_vector
+    FROM providers p
+    LEFT JOIN nucc_taxonomy nt ON nt.code = p.primary_taxonomy_code
+    WHERE p.entity_type_code = '1'
+"""
+
+# (statement, needs pg_trgm)
+PROVIDER_SEARCH_INDEXES = [
+    ("ALTER TABLE provider_search ADD CONSTRAINT provider_search_pkey PRIMARY KEY (npi)", False),
+    ("CREATE INDEX provider_search_first_name_trgm_idx "
+     "ON provider_search USING gin (first_name_lower gin_trgm_ops)", True),
+    ("CREATE INDEX provider_search_last_name_trgm_idx "
+     "ON provider_search USING gin (last_name_lower gin_trgm_ops)", True),
+    ("CREATE INDEX provider_search_city_trgm_idx "
+     "ON provider_search USING gin (city_lower gin_trgm_ops)", True),
+    ("CREATE INDEX provider_search_specialty_trgm_idx "
+     "ON provider_search USING gin (specialty_lower gin_trgm_ops)", True),
+    ("CREATE INDEX provider_search_name_npi_idx ON provider_search (last_name, first_name, npi)", False),
+    ("CREATE INDEX provider_search_state_name_npi_idx "
+     "ON provider_search (practice_state, last_name, first_name, npi)", False),
+    ("CREATE INDEX provider_search_zip5_idx ON provider_search (zip5)", False),
+    ("CREATE INDEX provider_search_last_phonetic_idx "
+     "ON provider_search (last_name_phonetic, first_name_phonetic)", False),
+    ("CREATE INDEX provider_search_first_phonetic_idx ON provider_search (first_name_phonetic)", False),
+    ("CREATE INDEX provider_search_vector_idx ON provider_search USING gin (search_vector)", False),
+]
+
+SUPERSEDED_INDEXES = [
+    ('providers_first_name_trgm_idx',
+     "ON providers USING gin (UPPER(first_name) gin_trgm_ops) WHERE entity_type_code = '1'", True),
+    ('providers_last_name_trgm_idx',
+     "ON providers USING gin (UPPER(last_name) gin_trgm_ops) WHERE entity_type_code = '1'", True),
+    ('providers_practice_city_trgm_idx',
+     "ON providers USING gin (UPPER(practice_city) gin_trgm_ops) WHERE entity_type_code = '1'", True),
+    ('providers_individual_name_npi_idx',
+     "ON providers (last_name, first_name, npi) WHERE entity_type_code = '1'", False),
+    ('providers_individual_state_name_npi_idx',
+     "ON providers (UPPER(practice_state), last_name, first_name, npi) WHERE entity_type_code = '1'", False),
+    ('providers_individual_zip5_idx',
+     "ON providers (SUBSTRING(practice_postal_code, 1, 5)) WHERE entity_type_code = '1'", False),
+    ('providers_individual_last_phonetic_idx',
+     "ON providers (last_name_phonetic, first_name_phonetic) WHERE entity_type_code = '1'", False),
+    ('providers_individual_first_phonetic_idx',
+     "ON providers (first_name_phonetic) WHERE entity_type_code = '1'", False),
+    ('providers_search_vector_idx',
+     "ON providers USING gin (search_vector) WHERE entity_type_code = '1'", False),
+]
+
+
+def has_pg_trgm(cursor):
+    cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    return cursor.fetchone() is not None
+
+
+def create_provider_search(apps, schema_editor):
+    if not providers_table_exists(schema_editor):
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('provider_search') IS NOT NULL")
+        if not cursor.fetchone()[0]:
+            cursor.execute(PROVIDER_SEARCH_DDL)
+            cursor.execute(FILL_PROVIDER_SEARCH_SQL)
+            trigram = has_pg_trgm(cursor)
+            for create_sql, needs_trigram in PROVIDER_SEARCH_INDEXES:
+                if needs_trigram and not trigram:
+                    continue
+                cursor.execute(create_sql)
+            cursor.execute("ANALYZE provider_search")
+        for name, _definition, _needs_trigram in SUPERSEDED_INDEXES:
+            cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def drop_provider_search(apps, schema_editor):
+    if not providers_table_exists(schema_editor):
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        trigram = has_pg_trgm(cursor)
+        for name, definition, needs_trigram in SUPERSEDED_INDEXES:
+            if needs_trigram and not trigram:
+                continue
+            cursor.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} {definition}")
+        cursor.execute("DROP TABLE IF EXISTS provider_search")
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('search_function', '0011_provider_phonetic_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_provider_search, drop_provider_search),
+    ]
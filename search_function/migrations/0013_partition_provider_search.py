@@ -0,0 +1,153 @@
+# search_function/migrations/0013_partition_provider_search.py
+#
+# provider_search becomes list partitioned on practice_state (one partition
+# per state plus a default), so state-filtered searches read one partition
+# and its indexes. A partitioned copy is built next to the live table and
+# swapped in; full loads build the partitioned layout from then on. The
+# layout is spelled out here as it was when this migration was written.
+
+from django.db import migrations, transaction
+
+from search_function.migrations._providers import providers_table_exists
+
+
+STAGING_TABLE = 'provider_search_partitioned'
+
+PARTITION_STATES = [
+    'AK', 'AL', 'AR', 'AZ', 'CA', 'CO', 'CT', 'DC', 'DE', 'FL', 'GA', 'HI', 'IA', 'ID', 'IL', 'IN', 'KS',
+    'KY', 'LA', 'MA', 'MD', 'ME', 'MI', 'MN', 'MO', 'MS', 'MT', 'NC', 'ND', 'NE', 'NH', 'NJ', 'NM', 'NV',
+    'NY', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VA', 'VT', 'WA', 'WI', 'WV', 'WY',
+    # Territories and military post offices
+    'AS', 'GU', 'MP', 'PR', 'VI', 'AA', 'AE', 'AP',
+]
+
+PROVIDER_SEARCH_DDL = """
+    CREATE TABLE {table} (
+        npi varchar(10) NOT NULL,
+        first_name text,
+        middle_name text,
+        last_name text,
+        full_name text NOT NULL,
+        practice_address_line1 text,
+        practice_address_line2 text,
+        practice_city text,
+        practice_state varchar(2),
+        practice_postal_code varchar(20),
+        zip5 varchar(5),
+        practice_phone varchar(20),
+        full_address text NOT NULL,
+        primary_taxonomy_code varchar(20),
+        taxonomy_classification text,
+        taxonomy_specialization text,
+        taxonomy_grouping text,
+        specialty_key text NOT NULL,
+        first_name_lower text,
+        last_name_lower text,
+        city_lower text,
+        specialty_lower text,
+        first_name_phonetic varchar(8),
+        last_name_phonetic varchar(8),
+        search_vector tsvector
+    ) PARTITION BY LIST (practice_state)
+"""
+
+FILL_PROVIDER_SEARCH_SQL = """
+    INSERT INTO {table} (
+        npi, first_name, middle_name, last_name, full_name,
+        practice_address_line1, practice_address_line2, practice_city, practice_state,
+        practice_postal_code, zip5, practice_phone, full_address,
+        primary_taxonomy_code, taxonomy_classification, taxonomy_specialization, taxonomy_grouping,
+        specialty_key, first_name_lower, last_name_lower, city_lower, specialty_lower,
+        first_name_phonetic, last_name_phonetic, search_vector
+    )
+    SELECT p.npi, p.first_name, p.middle_name, p.last_name,
+           CASE WHEN NULLIF(p.organization_name, '') IS NOT NULL THEN p.organization_name
+                ELSE COALESCE(NULLIF(concat_ws(' ', NULLIF(p.first_name, ''), NULLIF(p.middle_name, ''),
+                                               NULLIF(p.last_name, '')), ''), 'Unknown Individual')
+           END,
+           p.practice_address_line1, p.practice_address_line2, p.practice_city, UPPER(p.practice_state),
+           p.practice_postal_code, SUBSTRING(p.practice_postal_code, 1, 5), p.practice_phone,
+           concat_ws(', ', NULLIF(p.practice_address_line1, ''), NULLIF(p.practice_address_line2, ''),
+                     NULLIF(p.practice_city, ''), NULLIF(p.practice_state, ''), NULLIF(p.practice_postal_code, '')),
+           p.primary_taxonomy_code, nt.classification, nt.specialization, nt.grouping,
+           COALESCE(NULLIF(nt.grouping, ''), NULLIF(nt.classification, ''), 'Unknown Specialty'),
+           LOWER(p.first_name), LOWER(p.last_name), LOWER(p.practice_city),
+           LOWER(concat_ws('|', nt.classification, nt.specialization, nt.grouping)),
+           p.first_name_phonetic, p.last_name_phonetic, p.search_vector
+    FROM providers p
+    LEFT JOIN nucc_taxonomy nt ON nt.code = p.primary_taxonomy_code
+    WHERE p.entity_type_code = '1'
+"""
+
+# (index name, definition, needs pg_trgm), created on the partitioned
+# table and so built per partition. NPIs are not declared unique: a
+# primary key on a partitioned table has to include practice_state
+PROVIDER_SEARCH_INDEXES = [
+    ('provider_search_npi_idx', "(npi)", False),
+    ('provider_search_first_name_trgm_idx', "USING gin (first_name_lower gin_trgm_ops)", True),
+    ('provider_search_last_name_trgm_idx', "USING gin (last_name_lower gin_trgm_ops)", True),
+    ('provider_search_city_trgm_idx', "USING gin (city_lower gin_trgm_ops)", True),
+    ('provider_search_specialty_trgm_idx', "USING gin (specialty_lower gin_trgm_ops)", True),
+    ('provider_search_name_npi_idx', "(last_name, first_name, npi)", False),
+    ('provider_search_zip5_idx', "(zip5)", False),
+    ('provider_search_last_phonetic_idx', "(last_name_phonetic, first_name_phonetic)", False),
+    ('provider_search_first_phonetic_idx', "(first_name_phonetic)", False),
+    ('provider_search_vector_idx', "USING gin (search_vector)", False),
+]
+
+
+def partitions(table):
+    """(partition table, FOR VALUES clause) for each partition of table"""
+    return [(f"{table}_{state.lower()}", f"FOR VALUES IN ('{state}')") for state in PARTITION_STATES] + [
+        (f"{table}_default", 'DEFAULT')
+    ]
+
+
+def partition_provider_search(apps, schema_editor):
+    if not providers_table_exists(schema_editor):
+        return
+
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('provider_search')")
+        row = cursor.fetchone()
+        if row and row[0] == 'p':
+            return
+
+        cursor.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+        cursor.execute(PROVIDER_SEARCH_DDL.format(table=STAGING_TABLE))
+        for partition, bounds in partitions(STAGING_TABLE):
+            cursor.execute(f"CREATE TABLE {partition} PARTITION OF {STAGING_TABLE} {bounds}")
+        cursor.execute(FILL_PROVIDER_SEARCH_SQL.format(table=STAGING_TABLE))
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        trigram = cursor.fetchone() is not None
+        for name, definition, needs_trigram in PROVIDER_SEARCH_INDEXES:
+            if needs_trigram and not trigram:
+                continue
+            cursor.execute(f"CREATE INDEX {name}_new ON {STAGING_TABLE} {definition}")
+        cursor.execute(f"ANALYZE {STAGING_TABLE}")
+
+        with transaction.atomic(using=connection.alias):
+            cursor.execute("DROP TABLE IF EXISTS provider_search")
+            cursor.execute(f"ALTER TABLE {STAGING_TABLE} RENAME TO provider_search")
+            for (partition, _bounds), (new_partition, _bounds) in zip(
+                partitions(STAGING_TABLE), partitions('provider_search')
+            ):
+                cursor.execute(f"ALTER TABLE IF EXISTS {partition} RENAME TO {new_partition}")
+            for name, _definition, _needs_trigram in PROVIDER_SEARCH_INDEXES:
+                cursor.execute(f"ALTER INDEX IF EXISTS {name}_new RENAME TO {name}")
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('search_function', '0012_provider_search'),
+    ]
+
+    operations = [
+        # Searches read the partitioned table just the same; 0012's reverse
+        # drops it either way
+        migrations.RunPython(partition_provider_search, migrations.RunPython.noop),
+    ]
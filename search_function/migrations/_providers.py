@@ -0,0 +1,14 @@
+# search_function/migrations/_providers.py
+#
+# Helpers shared by the migrations that work on the providers table. The
+# leading underscore keeps Django's migration loader from reading this
+# module as a migration.
+
+
+def providers_table_exists(schema_editor):
+    """The providers table is loaded outside of Django and may be absent (e.g. test databases)"""
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        return 'providers' in connection.introspection.table_names(cursor)
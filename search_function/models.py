@@ -32,6 +32,9 @@ class Provider(models.Model):
     practice_postal_code = models.CharField(max_length=20, blank=True, null=True)
     practice_phone = models.CharField(max_length=20, blank=True, null=True)
     primary_taxonomy_code = models.CharField(max_length=20, blank=True, null=True)
+    # Double Metaphone keys (search_function.phonetic), written at ingest
+    first_name_phonetic = models.CharField(max_length=8, blank=True, null=True)
+    last_name_phonetic = models.CharField(max_length=8, blank=True, null=True)
     
     class Meta:
         db_table = 'providers'
@@ -95,13 +98,9 @@ class Provider(models.Model):
     
     @property
     def primary_taxonomy(self):
-        """Get the primary taxonomy object if it exists"""
-        if self.primary_taxonomy_code:
-            try:
-                return NuccTaxonomy.objects.get(code=self.primary_taxonomy_code)
-            except NuccTaxonomy.DoesNotExist:
-                return None
-        return None
+        """Get the primary taxonomy entry from the in-memory registry if it exists"""
+        from .taxonomy import get_taxonomy_registry
+        return get_taxonomy_registry().get(self.primary_taxonomy_code)
     
     @property
     def specialty_description(self):
@@ -111,4 +110,137 @@ class Provider(models.Model):
             if taxonomy.specialization:
                 return taxonomy.specialization
             return taxonomy.classification
-        return None
\ No newline at end of file
+        return None
+
+class ProviderSearch(models.Model):
+    """Read model of individual providers for the list endpoints
+    
+    Built from providers and nucc_taxonomy at ingest
+    (search_function.ingest.build_provider_search), with display strings,
+    taxonomy text and lowercase search keys precomputed. List partitioned
+    on practice_state, so filter on the uppercased state to read a single
+    partition.
+    """
+    npi = models.CharField(max_length=10, primary_key=True)
+    first_name = models.TextField(blank=True, null=True)
+    middle_name = models.TextField(blank=True, null=True)
+    last_name = models.TextField(blank=True, null=True)
+    full_name = models.TextField()
+    practice_address_line1 = models.TextField(blank=True, null=True)
+    practice_address_line2 = models.TextField(blank=True, null=True)
+    practice_city = models.TextField(blank=True, null=True)
+    practice_state = models.CharField(max_length=2, blank=True, null=True)
+    practice_postal_code = models.CharField(max_length=20, blank=True, null=True)
+    zip5 = models.CharField(max_length=5, blank=True, null=True)
+    practice_phone = models.CharField(max_length=20, blank=True, null=True)
+    full_address = models.TextField()
+    primary_taxonomy_code = models.CharField(max_length=20, blank=True, null=True)
+    taxonomy_classification = models.TextField(blank=True, null=True)
+    taxonomy_specialization = models.TextField(blank=True, null=True)
+    taxonomy_grouping = models.TextField(blank=True, null=True)
+    # Grouping (or classification) used by group_by_specialty
+    specialty_key = models.TextField()
+    first_name_lower = models.TextField(blank=True, null=True)
+    last_name_lower = models.TextField(blank=True, null=True)
+    city_lower = models.TextField(blank=True, null=True)
+    specialty_lower = models.TextField(blank=True, null=True)
+    first_name_phonetic = models.CharField(max_length=8, blank=True, null=True)
+    last_name_phonetic = models.CharField(max_length=8, blank=True, null=True)
+    
+    class Meta:
+        db_table = 'provider_search'
+        managed = False
+    
+    def __str__(self):
+        return f"{self.npi} - {self.full_name}"
+    
+    @property
+    def has_taxonomy(self):
+        """Whether the provider's taxonomy code was found in nucc_taxonomy"""
+        return any((self.taxonomy_classification, self.taxonomy_specialization, self.taxonomy_grouping))
+
+class DataVersion(models.Model):
+    """Counter bumped by ingestion so caches keyed on it invalidate after a reload"""
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'search_data_version'
+    
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+class NppesDeltaFile(models.Model):
+    """NPPES weekly update or deactivation file already applied to providers"""
+    KIND_WEEKLY = 'weekly'
+    KIND_DEACTIVATION = 'deactivation'
+    KIND_CHOICES = [
+        (KIND_WEEKLY, 'Weekly update'),
+        (KIND_DEACTIVATION, 'Deactivation report'),
+    ]
+    
+    file_name = models.CharField(max_length=255)
+    sha256 = models.CharField(max_length=64, unique=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    rows_upserted = models.PositiveIntegerField(default=0)
+    rows_deactivated = models.PositiveIntegerField(default=0)
+    applied_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'nppes_delta_files'
+        ordering = ['applied_at']
+    
+    def __str__(self):
+        return f"{self.file_name} ({self.kind})"
+
+class TaxonomyRelease(models.Model):
+    """NUCC taxonomy release loaded into nucc_taxonomy by load_taxonomy"""
+    version = models.CharField(max_length=20)
+    file_name = models.CharField(max_length=255)
+    codes = models.PositiveIntegerField(default=0)
+    added = models.PositiveIntegerField(default=0)
+    removed = models.PositiveIntegerField(default=0)
+    changed = models.PositiveIntegerField(default=0)
+    loaded_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'nucc_taxonomy_releases'
+        ordering = ['-loaded_at']
+        get_latest_by = 'loaded_at'
+    
+    def __str__(self):
+        return f"NUCC {self.version} ({self.codes} codes)"
+
+class ZipCentroid(models.Model):
+    """Centroid of a 5-digit ZIP code (Census ZCTA), loaded by load_zip_centroids"""
+    zip_code = models.CharField(max_length=5, primary_key=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    
+    class Meta:
+        db_table = 'zip_centroids'
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='zip_centroids_lat_lon_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.zip_code} ({self.latitude}, {self.longitude})"
+
+class ProviderStats(models.Model):
+    """Individual provider counts and cities per state, refreshed after each ingestion
+    
+    The row whose state is ALL holds the totals across every state.
+    """
+    ALL = 'ALL'
+    
+    state = models.CharField(max_length=3, primary_key=True)
+    individual_providers = models.PositiveIntegerField(default=0)
+    cities = models.JSONField(default=list)
+    refreshed_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'provider_stats'
+    
+    def __str__(self):
+        return f"{self.state}: {self.individual_providers} providers"
@@ -0,0 +1,278 @@
+# search_function/npi_snapshot.py
+"""
+Memory-mapped snapshot of individual providers for NPI lookups.
+
+Detail and batch lookups are key lookups on data that only changes when
+ingestion runs, so ingestion can export the individuals to a file
+(NPI_SNAPSHOT_PATH) and workers answer from it without a query:
+
+    magic line, JSON header line (padded to 8 bytes)
+    npis     count x uint64, sorted
+    offsets  (count + 1) x uint64, record i is records[offsets[i]:offsets[i + 1]]
+    records  one JSON array of SNAPSHOT_FIELDS per provider
+
+Every worker maps the file read-only, so the pages are shared through the
+page cache instead of being copied into each process, and a lookup is a
+binary search over the NPI array plus decoding one record.
+
+The header carries the data version the file was exported at. A worker
+only answers from a snapshot whose version matches the current data
+version; after a reload it maps the new file (written next to the old one
+and renamed over it, so a reader never sees a partial file) and meanwhile
+reads from Postgres. Lookups that miss the snapshot fall back to Postgres
+too.
+"""
+import bisect
+import heapq
+import json
+import logging
+import mmap
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from array import array
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .data_version import get_data_version
+from .models import Provider
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b'PLNPISNAPSHOT01\n'
+
+# Provider fields stored per NPI: everything provider_detail_data() reads
+SNAPSHOT_FIELDS = (
+    'first_name', 'middle_name', 'last_name', 'organization_name',
+    'practice_address_line1', 'practice_address_line2', 'practice_city', 'practice_state',
+    'practice_postal_code', 'practice_phone', 'primary_taxonomy_code',
+)
+
+SNAPSHOT_SQL = f"""
+    SELECT npi, {', '.join(SNAPSHOT_FIELDS)}
+    FROM providers
+    WHERE entity_type_code = '1'
+    ORDER BY npi
+"""
+
+# The same rows for just the given NPIs
+SNAPSHOT_PATCH_SQL = f"""
+    SELECT npi, {', '.join(SNAPSHOT_FIELDS)}
+    FROM providers
+    WHERE entity_type_code = '1' AND npi = ANY(%s)
+    ORDER BY npi
+"""
+
+
+def encode_record(values):
+    return json.dumps(values, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def write_snapshot(path, rows, version):
+    """Write (npi, *SNAPSHOT_FIELDS) rows sorted by NPI to path; returns the row count"""
+    return write_records(path, ((int(npi), encode_record(values)) for npi, *values in rows), version)
+
+
+def write_records(path, entries, version):
+    """Write (npi as int, encoded record) entries sorted by NPI to path; returns the count
+
+    Records are spooled to a temporary file, so only the two arrays are
+    held in memory, and the finished file is renamed over path.
+    """
+    npis = array('Q')
+    offsets = array('Q', [0])
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.TemporaryFile(dir=directory) as records:
+        for value, record in entries:
+            if npis and value <= npis[-1]:
+                raise ValueError(f"NPIs must be unique and sorted ({value:010d} after {npis[-1]:010d})")
+            npis.append(value)
+            offsets.append(offsets[-1] + records.write(record))
+
+        header = json.dumps({
+            'version': version,
+            'count': len(npis),
+            'fields': list(SNAPSHOT_FIELDS),
+            'byteorder': sys.byteorder,
+        }).encode()
+        # Pad the header so the arrays start 8-byte aligned
+        header += b' ' * (-(len(SNAPSHOT_MAGIC) + len(header) + 1) % 8) + b'\n'
+
+        temporary = f"{path}.tmp"
+        with open(temporary, 'wb') as handle:
+            handle.write(SNAPSHOT_MAGIC)
+            handle.write(header)
+            npis.tofile(handle)
+            offsets.tofile(handle)
+            records.seek(0)
+            shutil.copyfileobj(records, handle)
+        os.replace(temporary, path)
+    return len(npis)
+
+
+def export_snapshot(path, chunk_size=10000):
+    """Export the individual providers to a snapshot at path; returns (rows, version)"""
+    # Read the version first: rows changed after it are newer than the label, never older
+    version = get_data_version(refresh=True)
+
+    def rows():
+        with transaction.atomic(), connection.chunked_cursor() as cursor:
+            cursor.execute(SNAPSHOT_SQL)
+            while True:
+                chunk = cursor.fetchmany(chunk_size)
+                if not chunk:
+                    break
+                yield from chunk
+
+    return write_snapshot(path, rows(), version), version
+
+
+def refresh_npi_snapshot():
+    """Re-export NPI_SNAPSHOT_PATH after a data version bump; (rows, version), or None if unset
+
+    A snapshot left at the old version is ignored by every worker, so each
+    command that bumps the provider data version calls this.
+    """
+    path = getattr(settings, 'NPI_SNAPSHOT_PATH', None)
+    if not path:
+        return None
+    return export_snapshot(path)
+
+
+def patch_npi_snapshot(npis):
+    """Re-read just these NPIs into NPI_SNAPSHOT_PATH after a version bump; (rows, version), or None if unset
+
+    Every other record is copied from the current snapshot as it is, so a
+    delta costs one pass over the file rather than a full export. That is
+    only right when the snapshot is from the version just before the bump;
+    otherwise the whole snapshot is exported again.
+    """
+    path = getattr(settings, 'NPI_SNAPSHOT_PATH', None)
+    if not path:
+        return None
+    version = get_data_version(refresh=True)
+    try:
+        snapshot = NpiSnapshot.open(path)
+    except (OSError, ValueError):
+        snapshot = None
+    if snapshot is None or snapshot.version != version - 1:
+        return export_snapshot(path)
+
+    npis = sorted(npis)
+    with connection.cursor() as cursor:
+        cursor.execute(SNAPSHOT_PATCH_SQL, [npis])
+        fresh = [(int(npi), encode_record(values)) for npi, *values in cursor.fetchall()]
+
+    changed = {int(npi) for npi in npis if npi.isdigit()}
+    kept = (
+        (value, snapshot.record(position))
+        for position, value in enumerate(snapshot.npis) if value not in changed
+    )
+    return write_records(path, heapq.merge(kept, fresh, key=lambda entry: entry[0]), version), version
+
+
+class NpiSnapshot:
+    """A mapped snapshot file; get() and get_many() return unsaved Provider objects"""
+
+    def __init__(self, buffer, identity=None):
+        if buffer[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError("Not an NPI snapshot")
+        header_end = buffer.find(b'\n', len(SNAPSHOT_MAGIC)) + 1
+        header = json.loads(buffer[len(SNAPSHOT_MAGIC):header_end])
+        if header['fields'] != list(SNAPSHOT_FIELDS) or header['byteorder'] != sys.byteorder:
+            raise ValueError("NPI snapshot was written with different fields or byte order")
+
+        self.version = header['version']
+        self.count = header['count']
+        self.identity = identity
+        view = memoryview(buffer)
+        npis_end = header_end + 8 * self.count
+        offsets_end = npis_end + 8 * (self.count + 1)
+        self.npis = view[header_end:npis_end].cast('Q')
+        self.offsets = view[npis_end:offsets_end].cast('Q')
+        self.records = view[offsets_end:]
+
+    def __len__(self):
+        return self.count
+
+    @classmethod
+    def open(cls, path):
+        with open(path, 'rb') as handle:
+            stat = os.fstat(handle.fileno())
+            # The mapping outlives the file handle (and a rename over the path)
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped, (stat.st_dev, stat.st_ino, stat.st_mtime_ns))
+
+    def position(self, npi):
+        """Index of npi in the snapshot, or None"""
+        if len(npi) != 10 or not npi.isdigit():
+            return None
+        value = int(npi)
+        position = bisect.bisect_left(self.npis, value)
+        if position < self.count and self.npis[position] == value:
+            return position
+        return None
+
+    def record(self, position):
+        """Encoded record at position"""
+        return self.records[self.offsets[position]:self.offsets[position + 1]]
+
+    def get(self, npi):
+        """The individual provider with this NPI, or None if the snapshot lacks it"""
+        position = self.position(npi)
+        if position is None:
+            return None
+        values = json.loads(bytes(self.record(position)))
+        return Provider(npi=npi, entity_type_code='1', **dict(zip(SNAPSHOT_FIELDS, values)))
+
+    def get_many(self, npis):
+        """{npi: Provider} for the NPIs the snapshot holds"""
+        found = {}
+        for npi in npis:
+            provider = self.get(npi)
+            if provider is not None:
+                found[npi] = provider
+        return found
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_npi_snapshot():
+    """The snapshot at NPI_SNAPSHOT_PATH if it matches the current data version, else None"""
+    global _snapshot
+    path = getattr(settings, 'NPI_SNAPSHOT_PATH', None)
+    if not path:
+        return None
+    version = get_data_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    with _snapshot_lock:
+        snapshot = _snapshot
+        if snapshot is None or snapshot.version != version:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                return None
+            # Only map the file again once a new one has been written
+            if snapshot is None or snapshot.identity != (stat.st_dev, stat.st_ino, stat.st_mtime_ns):
+                started = time.monotonic()
+                try:
+                    snapshot = NpiSnapshot.open(path)
+                except (OSError, ValueError) as e:
+                    logger.warning("NPI snapshot %s unusable: %s", path, e)
+                    return None
+                logger.info(
+                    "NPI snapshot: %s providers at data version %s mapped in %.3fs",
+                    len(snapshot), snapshot.version, time.monotonic() - started,
+                )
+                _snapshot = snapshot
+    return snapshot if snapshot.version == version else None
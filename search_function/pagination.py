@@ -0,0 +1,146 @@
+# search_function/pagination.py
+"""
+Keyset (cursor) pagination for provider searches.
+
+Django's Paginator pages with OFFSET, so page N has to walk past N * page_size
+rows first. Keyset pagination instead remembers the sort key of the last row
+served and asks for rows strictly after it, which the (last_name, first_name,
+npi) index answers in the same time for every page.
+"""
+import base64
+import binascii
+import json
+from contextlib import nullcontext
+
+from django.core.paginator import Paginator
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+from django.utils.functional import cached_property
+
+from .prepared import prepared_statements
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token cannot be decoded"""
+
+
+def encode_cursor(key, direction='next'):
+    """Encode a sort key tuple as an opaque URL-safe token"""
+    payload = json.dumps({'k': list(key), 'd': direction}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a token produced by encode_cursor into (key, direction)"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key, direction = payload['k'], payload['d']
+    except (binascii.Error, ValueError, TypeError, KeyError, UnicodeDecodeError):
+        raise InvalidCursor(token)
+
+    # The key is bound into the seek condition: (last_name, first_name, npi)
+    if direction not in ('next', 'prev') or not isinstance(key, list) or len(key) != 3:
+        raise InvalidCursor(token)
+    last_name, first_name, npi = key
+    if not all(name is None or isinstance(name, str) for name in (last_name, first_name)):
+        raise InvalidCursor(token)
+    if isinstance(npi, int) and not isinstance(npi, bool):
+        npi = str(npi)
+    if not isinstance(npi, str):
+        raise InvalidCursor(token)
+    return (last_name, first_name, npi), direction
+
+
+class KeysetPage:
+    """One page of keyset-paginated results"""
+
+    def __init__(self, object_list, next_cursor, prev_cursor, page_size):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.page_size = page_size
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+
+class KeysetPaginator:
+    """Paginate a Provider queryset on (last_name, first_name, npi)
+
+    NPPES requires both names for individual providers, so the row
+    comparison never sees NULL sort keys for entity_type_code = '1'.
+    The queryset may also be a values_list() one that selects the three
+    sort columns; cursors are then read from the tuples by position.
+    """
+
+    ordering = ('last_name', 'first_name', 'npi')
+
+    def __init__(self, queryset, page_size):
+        self.queryset = queryset
+        self.page_size = page_size
+
+    def _key(self, obj):
+        if isinstance(obj, tuple):
+            fields = self.queryset._fields
+            return tuple(obj[fields.index(field)] for field in self.ordering)
+        return tuple(getattr(obj, field) for field in self.ordering)
+
+    def _seek(self, key, operator):
+        columns = ', '.join(self.ordering)
+        placeholders = ', '.join(['%s'] * len(self.ordering))
+        return self.queryset.filter(RawSQL(
+            f"({columns}) {operator} ({placeholders})", key, output_field=BooleanField()
+        ))
+
+    def get_page(self, cursor=None):
+        """Return the page after (or before) the position encoded in cursor"""
+        key, direction = decode_cursor(cursor) if cursor else (None, 'next')
+        if key is not None and len(key) != len(self.ordering):
+            raise InvalidCursor(cursor)
+
+        if direction == 'next':
+            queryset = self._seek(key, '>') if key else self.queryset
+            with prepared_statements():
+                rows = list(queryset.order_by(*self.ordering)[:self.page_size + 1])
+            has_more = len(rows) > self.page_size
+            rows = rows[:self.page_size]
+            has_next, has_previous = has_more, key is not None
+        else:
+            queryset = self._seek(key, '<')
+            descending = [f'-{field}' for field in self.ordering]
+            with prepared_statements():
+                rows = list(queryset.order_by(*descending)[:self.page_size + 1])
+            has_more = len(rows) > self.page_size
+            rows = rows[:self.page_size][::-1]
+            has_next, has_previous = True, has_more
+
+        next_cursor = encode_cursor(self._key(rows[-1]), 'next') if rows and has_next else None
+        prev_cursor = encode_cursor(self._key(rows[0]), 'prev') if rows and has_previous else None
+        return KeysetPage(rows, next_cursor, prev_cursor, self.page_size)
+
+
+class CountedPaginator(Paginator):
+    """OFFSET paginator whose total comes from a counts.ResultCount"""
+
+    def __init__(self, object_list, per_page, result_count):
+        super().__init__(object_list, per_page)
+        self.result_count = result_count
+
+    @cached_property
+    def count(self):
+        return self.result_count.total
+
+    def _get_page(self, object_list, number, paginator):
+        # Fetch the page here rather than when iterated. Django writes
+        # LIMIT/OFFSET into the SQL, so every page number is a statement of
+        # its own: only the first page is prepared
+        with prepared_statements() if number == 1 else nullcontext():
+            object_list = list(object_list)
+        return super()._get_page(object_list, number, paginator)
@@ -0,0 +1,451 @@
+# search_function/phonetic.py
+"""
+Phonetic keys and edit distance for misspelled-name search.
+
+double_metaphone() implements Lawrence Philips' Double Metaphone, which maps
+names that sound alike to the same short key ("Smith" and "Smyth" -> SM0,
+"Katz" and "Kats" -> KTS) and gives an alternate key for names with a second
+common pronunciation ("Schmidt" -> XMT / SMT). Ingestion stores the primary
+key of every first and last name in indexed columns, so a phonetic search
+is an equality lookup; edit_distance() then orders the candidates.
+
+Pure Python on purpose: the keys written at ingest and the keys computed
+for a query must come from the same implementation.
+"""
+import re
+
+
+VOWELS = frozenset('AEIOUY')
+SLAVO_GERMANIC = ('W', 'K', 'CZ', 'WITZ')
+
+# Stored keys are truncated like the reference implementation's
+KEY_LENGTH = 4
+
+
+def double_metaphone(name, length=KEY_LENGTH):
+    """(primary, alternate) phonetic keys for a name; ('', '') when it has no letters
+
+    alternate equals primary when the name has only one pronunciation.
+    """
+    # Spaces are kept for multi-word names (Van Dyke, San Juan)
+    word = ' '.join(re.sub(r'[^A-Z ]', '', (name or '').upper()).split())
+    if not word:
+        return '', ''
+    return _Encoder(word).encode(length)
+
+
+def phonetic_key(name):
+    """Primary Double Metaphone key as stored at ingest, or None"""
+    return double_metaphone(name)[0] or None
+
+
+def phonetic_keys(name):
+    """Distinct keys a stored name may match for a search term"""
+    primary, alternate = double_metaphone(name)
+    return [key for key in dict.fromkeys((primary, alternate)) if key]
+
+
+def edit_distance(a, b):
+    """Levenshtein distance between two strings (case-insensitive)"""
+    a, b = (a or '').lower(), (b or '').lower()
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+class _Encoder:
+    """One Double Metaphone run over an upper-cased word of letters and spaces"""
+
+    def __init__(self, word):
+        self.word = word
+        self.last = len(word) - 1
+        self.primary = []
+        self.alternate = []
+        self.slavo_germanic = any(part in word for part in SLAVO_GERMANIC)
+
+    def at(self, pos, *options):
+        """Whether the word has one of options starting at pos"""
+        if pos < 0:
+            return False
+        return any(self.word.startswith(option, pos) for option in options)
+
+    def char(self, pos):
+        return self.word[pos] if 0 <= pos <= self.last else ''
+
+    def vowel(self, pos):
+        return self.char(pos) in VOWELS and self.char(pos) != ''
+
+    def add(self, primary, alternate=None):
+        self.primary.append(primary)
+        self.alternate.append(primary if alternate is None else alternate)
+
+    def encode(self, length):
+        word = self.word
+        pos = 0
+
+        # Initial letter exceptions
+        if self.at(0, 'GN', 'KN', 'PN', 'WR', 'PS'):
+            pos = 1
+        if word[0] == 'X':
+            # Xavier: initial X sounds like S
+            self.add('S')
+            pos = 1
+
+        while pos <= self.last and (len(''.join(self.primary)) < length or len(''.join(self.alternate)) < length):
+            step = getattr(self, f'_{word[pos]}', None)
+            pos = step(pos) if step else pos + 1
+
+        return ''.join(self.primary)[:length], ''.join(self.alternate)[:length]
+
+    def _vowel(self, pos):
+        if pos == 0:
+            self.add('A')
+        return pos + 1
+
+    _A = _E = _I = _O = _U = _Y = _vowel
+
+    def _B(self, pos):
+        self.add('P')
+        return pos + 2 if self.char(pos + 1) == 'B' else pos + 1
+
+    def _C(self, pos):
+        word = self.word
+        # Various Germanic: Bacher, Macher
+        if (pos > 1 and not self.vowel(pos - 2) and self.at(pos - 1, 'ACH')
+                and self.char(pos + 2) != 'I'
+                and (self.char(pos + 2) != 'E' or self.at(pos - 2, 'BACHER', 'MACHER'))):
+            self.add('K')
+            return pos + 2
+        # Caesar
+        if pos == 0 and self.at(pos, 'CAESAR'):
+            self.add('S')
+            return pos + 2
+        # Chianti
+        if self.at(pos, 'CHIA'):
+            self.add('K')
+            return pos + 2
+        if self.at(pos, 'CH'):
+            # Michael
+            if pos > 0 and self.at(pos, 'CHAE'):
+                self.add('K', 'X')
+                return pos + 2
+            # Greek roots: Chemistry, Chorus
+            if (pos == 0 and (self.at(pos + 1, 'HARAC', 'HARIS') or self.at(pos + 1, 'HOR', 'HYM', 'HIA', 'HEM'))
+                    and not self.at(0, 'CHORE')):
+                self.add('K')
+                return pos + 2
+            # Germanic, Greek, or otherwise 'ch' for 'kh' sound
+            if (self.at(0, 'VAN ', 'VON ', 'SCH') or self.at(pos - 2, 'ORCHES', 'ARCHIT', 'ORCHID')
+                    or self.char(pos + 2) in ('T', 'S')
+                    or ((pos == 0 or self.char(pos - 1) in ('A', 'O', 'U', 'E'))
+                        and self.char(pos + 2) in ('L', 'R', 'N', 'M', 'B', 'H', 'F', 'V', 'W', ''))):
+                self.add('K')
+            elif pos > 0:
+                if self.at(0, 'MC'):
+                    self.add('K')
+                else:
+                    self.add('X', 'K')
+            else:
+                self.add('X')
+            return pos + 2
+        # Czerny
+        if self.at(pos, 'CZ') and not self.at(pos - 2, 'WICZ'):
+            self.add('S', 'X')
+            return pos + 2
+        # Focaccia
+        if self.at(pos + 1, 'CIA'):
+            self.add('X')
+            return pos + 3
+        # Double C, but not McClellan
+        if self.at(pos, 'CC') and not (pos == 1 and word[0] == 'M'):
+            if self.char(pos + 2) in ('I', 'E', 'H') and not self.at(pos + 2, 'HU'):
+                # Accident, Accede, Succeed; Bacchus
+                if (pos == 1 and word[0] == 'A') or self.at(pos - 1, 'UCCEE', 'UCCES'):
+                    self.add('KS')
+                else:
+                    self.add('X')
+                return pos + 3
+            # Pierce's rule
+            self.add('K')
+            return pos + 2
+        if self.at(pos, 'CK', 'CG', 'CQ'):
+            self.add('K')
+            return pos + 2
+        if self.at(pos, 'CI', 'CE', 'CY'):
+            # Italian vs. English
+            if self.at(pos, 'CIO', 'CIE', 'CIA'):
+                self.add('S', 'X')
+            else:
+                self.add('S')
+            return pos + 2
+        self.add('K')
+        # Mac Caffrey, Mac Gregor
+        if self.at(pos + 1, ' C', ' Q', ' G'):
+            return pos + 3
+        if self.at(pos + 1, 'C', 'K', 'Q') and not self.at(pos + 1, 'CE', 'CI'):
+            return pos + 2
+        return pos + 1
+
+    def _D(self, pos):
+        if self.at(pos, 'DG'):
+            # Edge
+            if self.char(pos + 2) in ('I', 'E', 'Y'):
+                self.add('J')
+                return pos + 3
+            # Edgar
+            self.add('TK')
+            return pos + 2
+        self.add('T')
+        return pos + 2 if self.at(pos, 'DT', 'DD') else pos + 1
+
+    def _F(self, pos):
+        self.add('F')
+        return pos + 2 if self.char(pos + 1) == 'F' else pos + 1
+
+    def _G(self, pos):
+        if self.char(pos + 1) == 'H':
+            if pos > 0 and not self.vowel(pos - 1):
+                self.add('K')
+                return pos + 2
+            if pos == 0:
+                # Ghislane, Ghiradelli
+                self.add('J' if self.char(pos + 2) == 'I' else 'K')
+                return pos + 2
+            # Parker's rule (with some further refinements): Hugh, Bough, Broughton
+            if (self.char(pos - 2) in ('B', 'H', 'D') or self.char(pos - 3) in ('B', 'H', 'D')
+                    or self.char(pos - 4) in ('B', 'H')):
+                return pos + 2
+            # Laugh, McLaughlin, Cough, Gough, Rough, Tough
+            if pos > 2 and self.char(pos - 1) == 'U' and self.char(pos - 3) in ('C', 'G', 'L', 'R', 'T'):
+                self.add('F')
+            elif pos > 0 and self.char(pos - 1) != 'I':
+                self.add('K')
+            return pos + 2
+        if self.char(pos + 1) == 'N':
+            if pos == 1 and self.vowel(0) and not self.slavo_germanic:
+                self.add('KN', 'N')
+            elif not self.at(pos + 2, 'EY') and self.char(pos + 1) != 'Y' and not self.slavo_germanic:
+                # Not e.g. Cagney
+                self.add('N', 'KN')
+            else:
+                self.add('KN')
+            return pos + 2
+        # Tagliaro
+        if self.at(pos + 1, 'LI') and not self.slavo_germanic:
+            self.add('KL', 'L')
+            return pos + 2
+        # -ges-, -gep-, -gel-, -gie- at beginning
+        if pos == 0 and (self.char(pos + 1) == 'Y'
+                         or self.at(pos + 1, 'ES', 'EP', 'EB', 'EL', 'EY', 'IB', 'IL', 'IN', 'IE', 'EI', 'ER')):
+            self.add('K', 'J')
+            return pos + 2
+        # -ger-, -gy-
+        if ((self.at(pos + 1, 'ER') or self.char(pos + 1) == 'Y')
+                and not self.at(0, 'DANGER', 'RANGER', 'MANGER')
+                and self.char(pos - 1) not in ('E', 'I')
+                and not self.at(pos - 1, 'RGY', 'OGY')):
+            self.add('K', 'J')
+            return pos + 2
+        # Italian: Biaggi
+        if self.char(pos + 1) in ('E', 'I', 'Y') or self.at(pos - 1, 'AGGI', 'OGGI'):
+            # Obvious Germanic
+            if self.at(0, 'VAN ', 'VON ', 'SCH') or self.at(pos + 1, 'ET'):
+                self.add('K')
+            elif self.at(pos + 1, 'IER'):
+                self.add('J')
+            else:
+                self.add('J', 'K')
+            return pos + 2
+        self.add('K')
+        return pos + 2 if self.char(pos + 1) == 'G' else pos + 1
+
+    def _H(self, pos):
+        # Only keep if first and before a vowel, or between two vowels
+        if (pos == 0 or self.vowel(pos - 1)) and self.vowel(pos + 1):
+            self.add('H')
+            return pos + 2
+        return pos + 1
+
+    def _J(self, pos):
+        # Spanish: Jose, San Jacinto
+        if self.at(pos, 'JOSE') or self.at(0, 'SAN '):
+            if (pos == 0 and self.char(pos + 4) == ' ') or self.at(0, 'SAN '):
+                self.add('H')
+            else:
+                self.add('J', 'H')
+            return pos + 1
+        if pos == 0 and not self.at(pos, 'JOSE'):
+            # Yankelovich, Jankelowicz
+            self.add('J', 'A')
+        elif self.vowel(pos - 1) and not self.slavo_germanic and self.char(pos + 1) in ('A', 'O'):
+            # Spanish pronunciation of e.g. Bajador
+            self.add('J', 'H')
+        elif pos == self.last:
+            self.add('J', '')
+        elif self.char(pos + 1) not in ('L', 'T', 'K', 'S', 'N', 'M', 'B', 'Z') and self.char(pos - 1) not in ('S', 'K', 'L'):
+            self.add('J')
+        return pos + 2 if self.char(pos + 1) == 'J' else pos + 1
+
+    def _K(self, pos):
+        self.add('K')
+        return pos + 2 if self.char(pos + 1) == 'K' else pos + 1
+
+    def _L(self, pos):
+        if self.char(pos + 1) == 'L':
+            # Spanish: Cabrillo, Gallegos
+            if ((pos == self.last - 2 and self.at(pos - 1, 'ILLO', 'ILLA', 'ALLE'))
+                    or ((self.at(self.last - 1, 'AS', 'OS') or self.char(self.last) in ('A', 'O'))
+                        and self.at(pos - 1, 'ALLE'))):
+                self.add('L', '')
+                return pos + 2
+            self.add('L')
+            return pos + 2
+        self.add('L')
+        return pos + 1
+
+    def _M(self, pos):
+        self.add('M')
+        # Dumb, Thumb
+        if (self.at(pos - 1, 'UMB') and (pos + 1 == self.last or self.at(pos + 2, 'ER'))) or self.char(pos + 1) == 'M':
+            return pos + 2
+        return pos + 1
+
+    def _N(self, pos):
+        self.add('N')
+        return pos + 2 if self.char(pos + 1) == 'N' else pos + 1
+
+    def _P(self, pos):
+        if self.char(pos + 1) == 'H':
+            self.add('F')
+            return pos + 2
+        # Campbell, Raspberry
+        self.add('P')
+        return pos + 2 if self.char(pos + 1) in ('P', 'B') else pos + 1
+
+    def _Q(self, pos):
+        self.add('K')
+        return pos + 2 if self.char(pos + 1) == 'Q' else pos + 1
+
+    def _R(self, pos):
+        # French: Rogier, but exclude Hochmeier
+        if (pos == self.last and not self.slavo_germanic and self.at(pos - 2, 'IE')
+                and not self.at(pos - 4, 'ME', 'MA')):
+            self.add('', 'R')
+        else:
+            self.add('R')
+        return pos + 2 if self.char(pos + 1) == 'R' else pos + 1
+
+    def _S(self, pos):
+        # Isle, Carlisle, Carlysle
+        if self.at(pos - 1, 'ISL', 'YSL'):
+            return pos + 1
+        # Sugar
+        if pos == 0 and self.at(pos, 'SUGAR'):
+            self.add('X', 'S')
+            return pos + 1
+        if self.at(pos, 'SH'):
+            # Germanic: Holstein
+            if self.at(pos + 1, 'HEIM', 'HOEK', 'HOLM', 'HOLZ'):
+                self.add('S')
+            else:
+                self.add('X')
+            return pos + 2
+        # Italian and Armenian: Sioux, Siobhan
+        if self.at(pos, 'SIO', 'SIA', 'SIAN'):
+            if self.slavo_germanic:
+                self.add('S')
+            else:
+                self.add('S', 'X')
+            return pos + 3
+        # German and anglicisations: Smith matches Schmidt, Snider matches Schneider
+        if (pos == 0 and self.char(pos + 1) in ('M', 'N', 'L', 'W')) or self.char(pos + 1) == 'Z':
+            self.add('S', 'X')
+            return pos + 2 if self.char(pos + 1) == 'Z' else pos + 1
+        if self.at(pos, 'SC'):
+            if self.char(pos + 2) == 'H':
+                # Dutch origin: Schooner, Schermerhorn
+                if self.at(pos + 3, 'OO', 'ER', 'EN', 'UY', 'ED', 'EM'):
+                    if self.at(pos + 3, 'ER', 'EN'):
+                        self.add('X', 'SK')
+                    else:
+                        self.add('SK')
+                    return pos + 3
+                if pos == 0 and not self.vowel(3) and self.char(3) != 'W':
+                    self.add('X', 'S')
+                else:
+                    self.add('X')
+                return pos + 3
+            if self.char(pos + 2) in ('I', 'E', 'Y'):
+                self.add('S')
+                return pos + 3
+            self.add('SK')
+            return pos + 3
+        # French: Resnais, Artois
+        if pos == self.last and self.at(pos - 2, 'AI', 'OI'):
+            self.add('', 'S')
+        else:
+            self.add('S')
+        return pos + 2 if self.char(pos + 1) in ('S', 'Z') else pos + 1
+
+    def _T(self, pos):
+        if self.at(pos, 'TION', 'TIA', 'TCH'):
+            self.add('X')
+            return pos + 3
+        if self.at(pos, 'TH', 'TTH'):
+            # Thomas, Thames, or Germanic
+            if self.at(pos + 2, 'OM', 'AM') or self.at(0, 'VAN ', 'VON ', 'SCH'):
+                self.add('T')
+            else:
+                self.add('0', 'T')
+            return pos + 2
+        self.add('T')
+        return pos + 2 if self.char(pos + 1) in ('T', 'D') else pos + 1
+
+    def _V(self, pos):
+        self.add('F')
+        return pos + 2 if self.char(pos + 1) == 'V' else pos + 1
+
+    def _W(self, pos):
+        # Wr- sounds like R
+        if self.at(pos, 'WR'):
+            self.add('R')
+            return pos + 2
+        if pos == 0 and (self.vowel(pos + 1) or self.at(pos, 'WH')):
+            # Wasserman should match Vasserman
+            if self.vowel(pos + 1):
+                self.add('A', 'F')
+            else:
+                self.add('A')
+        # Arnow should match Arnoff
+        if ((pos == self.last and self.vowel(pos - 1)) or self.at(pos - 1, 'EWSKI', 'EWSKY', 'OWSKI', 'OWSKY')
+                or self.at(0, 'SCH')):
+            self.add('', 'F')
+            return pos + 1
+        # Polish: Filipowicz
+        if self.at(pos, 'WICZ', 'WITZ'):
+            self.add('TS', 'FX')
+            return pos + 4
+        return pos + 1
+
+    def _X(self, pos):
+        # French: Breaux
+        if not (pos == self.last and (self.at(pos - 3, 'IAU', 'EAU') or self.at(pos - 2, 'AU', 'OU'))):
+            self.add('KS')
+        return pos + 2 if self.char(pos + 1) in ('C', 'X') else pos + 1
+
+    def _Z(self, pos):
+        # Chinese pinyin: Zhao
+        if self.char(pos + 1) == 'H':
+            self.add('J')
+            return pos + 2
+        if self.at(pos + 1, 'ZO', 'ZI', 'ZA') or (self.slavo_germanic and pos > 0 and self.char(pos - 1) != 'T'):
+            self.add('S', 'TS')
+        else:
+            self.add('S')
+        return pos + 2 if self.char(pos + 1) == 'Z' else pos + 1
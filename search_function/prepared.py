@@ -0,0 +1,56 @@
+# search_function/prepared.py
+"""
+Server-side prepared statements for the hot queries.
+
+Search pages, counts and detail lookups run the same few statement shapes
+over and over; preparing them once per connection saves parsing and
+planning on every later execution. With DB_PREPARED_STATEMENTS on, the
+connection binds parameters server side and statements run inside
+prepared_statements() are prepared on first use. psycopg keeps each
+connection's prepared statements, so they pay off with persistent or
+pooled connections (DB_CONN_MAX_AGE, DB_POOL).
+
+Everything else keeps running unprepared, so one-off statement shapes
+(deep OFFSET pages, maintenance commands, DDL) don't crowd the hot ones
+out of psycopg's per-connection cache of prepared statements.
+"""
+import contextvars
+from contextlib import contextmanager
+
+
+_prepare = contextvars.ContextVar('prepare_statements', default=False)
+
+_cursor_class = None
+
+
+@contextmanager
+def prepared_statements():
+    """Prepare the statements run in this block (when DB_PREPARED_STATEMENTS is on)"""
+    token = _prepare.set(True)
+    try:
+        yield
+    finally:
+        _prepare.reset(token)
+
+
+def preparing_cursor_class():
+    """Django's server-binding cursor, preparing statements inside prepared_statements()"""
+    global _cursor_class
+    if _cursor_class is None:
+        from django.db.backends.postgresql.base import ServerBindingCursor
+
+        class PreparingCursor(ServerBindingCursor):
+            def execute(self, query, params=None, *, prepare=None, **kwargs):
+                if prepare is None and _prepare.get():
+                    prepare = True
+                return super().execute(query, params, prepare=prepare, **kwargs)
+
+        _cursor_class = PreparingCursor
+    return _cursor_class
+
+
+def install_preparing_cursor(connection, **kwargs):
+    """connection_created receiver: use PreparingCursor on server-binding connections"""
+    if connection.vendor != 'postgresql' or connection.settings_dict['OPTIONS'].get('server_side_binding') is not True:
+        return
+    connection.connection.cursor_factory = preparing_cursor_class()
@@ -0,0 +1,271 @@
+# search_function/profiling.py
+"""
+Per-request SQL profiling and query budgets.
+
+SQLProfilingMiddleware times every SQL statement a request runs through a
+database execute wrapper. The request's profile is held in a context
+variable, so statements the async views run on pool threads, on their own
+connections, are counted too. Each response gets a Server-Timing header
+with the query count, database time and Python time, and the same summary
+is logged. A streaming response (the export) runs most of its queries
+after its headers are sent, so it gets no header: it is profiled until the
+stream closes and then logged and budget-checked.
+
+Staff users can add ?_profile=1 to a JSON endpoint to get the captured
+statements, their timings and the EXPLAIN ANALYZE of the slowest SELECT
+inline, under a "_profile" key. Such requests bypass the response cache.
+
+Views declare how many statements they should need with @query_budget(n).
+A request over budget is logged as a warning and flagged in the
+X-Query-Budget header, which is how an N+1 (one query per result row)
+shows up the first time it runs.
+"""
+import contextvars
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections, transaction
+from django.db.backends.signals import connection_created
+
+from .serializers import dumps
+
+
+logger = logging.getLogger(__name__)
+
+# Query string parameter asking for the inline profile (staff only)
+PROFILE_PARAM = '_profile'
+
+_current = contextvars.ContextVar('sql_profile', default=None)
+
+
+def query_budget(max_queries):
+    """Declare the most SQL statements a view should run per request"""
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+class RequestProfile:
+    """SQL statements and timings collected for one request"""
+
+    def __init__(self, inline=False):
+        self.inline = inline
+        self.queries = []
+        self.started = time.perf_counter()
+        self.finished = None
+        self.view_name = None
+        self.budget = None
+
+    def add(self, alias, sql, params, duration, executed=None):
+        # list.append is atomic, so pool threads can record concurrently
+        self.queries.append((alias, sql, params, duration, executed))
+
+    def stop(self, resolver_match=None):
+        self.finished = time.perf_counter()
+        if resolver_match is not None:
+            self.view_name = resolver_match.view_name
+            self.budget = getattr(resolver_match.func, 'query_budget', None)
+
+    @property
+    def total_time(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def db_time(self):
+        return sum(query[3] for query in self.queries)
+
+    @property
+    def python_time(self):
+        # Concurrent statements (async views) can add up to more than the request
+        return max(self.total_time - self.db_time, 0)
+
+    @property
+    def slowest(self):
+        return max(self.queries, key=lambda query: query[3], default=None)
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and len(self.queries) > self.budget
+
+    def server_timing(self):
+        return (
+            f'db;dur={self.db_time * 1000:.1f};desc="{len(self.queries)} queries", '
+            f'app;dur={self.python_time * 1000:.1f}'
+        )
+
+    def explain(self):
+        """EXPLAIN ANALYZE of the slowest SELECT, as plan lines"""
+        selects = [query for query in self.queries if query[1].lstrip().upper().startswith('SELECT')]
+        if not selects:
+            return None
+        alias, sql, params, _duration, _executed = max(selects, key=lambda query: query[3])
+        try:
+            with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+                cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", params)
+                return [line for line, in cursor.fetchall()]
+        except DatabaseError as e:
+            return [f"EXPLAIN failed: {e}"]
+
+    def as_dict(self):
+        slowest = self.slowest
+        return {
+            'view': self.view_name,
+            'query_count': len(self.queries),
+            'query_budget': self.budget,
+            'over_budget': self.over_budget,
+            'total_ms': round(self.total_time * 1000, 2),
+            'db_ms': round(self.db_time * 1000, 2),
+            'python_ms': round(self.python_time * 1000, 2),
+            'slowest': {'sql': slowest[4], 'ms': round(slowest[3] * 1000, 2)} if slowest else None,
+            'queries': [
+                {'alias': alias, 'sql': executed, 'ms': round(duration * 1000, 2)}
+                for alias, _sql, _params, duration, executed in self.queries
+            ],
+            'explain': self.explain(),
+        }
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper timing each statement into the current request's profile"""
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        connection = context['connection']
+        executed = None
+        if profile.inline:
+            executed = connection.ops.last_executed_query(context['cursor'], sql, params)
+        profile.add(connection.alias, sql, None if many else params, duration, executed)
+
+
+def install_profiler(connection, **kwargs):
+    """Add record_query to a connection's execute wrappers (once)"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def profiling_inline(request):
+    """Whether this request asked for (and may see) the inline profile"""
+    profile = getattr(request, 'sql_profile', None)
+    return profile is not None and profile.inline
+
+
+class SQLProfilingMiddleware:
+    """Profile each request's SQL; see the module docstring"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SQL_PROFILING', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # Connections opened later (other threads, reconnects) get it on connect
+        connection_created.connect(install_profiler)
+
+    def start(self, request, inline):
+        for connection in connections.all():
+            install_profiler(connection)
+        request.sql_profile = RequestProfile(inline=inline)
+        return request.sql_profile, _current.set(request.sql_profile)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # The user is only looked up (a session query) when a profile is asked for
+        inline = request.GET.get(PROFILE_PARAM) == '1' and request.user.is_staff
+        profile, token = self.start(request, inline)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, profile, response)
+
+    async def __acall__(self, request):
+        inline = request.GET.get(PROFILE_PARAM) == '1' and (await request.auser()).is_staff
+        profile, token = self.start(request, inline)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        if profile.inline:
+            return await sync_to_async(self.finish)(request, profile, response)
+        return self.finish(request, profile, response)
+
+    def finish(self, request, profile, response):
+        if response.streaming:
+            # The body, and the queries behind it, are produced after the
+            # headers have gone out: profile the stream and report once it
+            # closes, in the log only
+            stream = self.profiled_async_stream if response.is_async else self.profiled_stream
+            response.streaming_content = stream(request, profile, response.streaming_content)
+            return response
+
+        self.report(request, profile)
+        response['Server-Timing'] = profile.server_timing()
+        if profile.over_budget:
+            response['X-Query-Budget'] = f"exceeded ({len(profile.queries)}/{profile.budget})"
+
+        is_json = response.get('Content-Type', '').startswith('application/json')
+        if profile.inline and is_json:
+            data = json.loads(response.content)
+            if isinstance(data, dict):
+                data['_profile'] = profile.as_dict()
+                response.content = dumps(data)
+        return response
+
+    def report(self, request, profile):
+        """Stop the profile and log it, with a warning if it went over budget"""
+        profile.stop(getattr(request, 'resolver_match', None))
+        logger.info(
+            "%s %s: %d queries, db %.1f ms, python %.1f ms",
+            request.method, request.path, len(profile.queries),
+            profile.db_time * 1000, profile.python_time * 1000,
+        )
+        if profile.over_budget:
+            logger.warning(
+                "%s ran %d SQL queries (budget %d): %s %s",
+                profile.view_name, len(profile.queries), profile.budget, request.method, request.get_full_path(),
+            )
+
+    def profiled_stream(self, request, profile, content):
+        iterator = iter(content)
+        try:
+            while True:
+                token = _current.set(profile)
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    _current.reset(token)
+                yield chunk
+        finally:
+            self.report(request, profile)
+
+    async def profiled_async_stream(self, request, profile, content):
+        iterator = aiter(content)
+        try:
+            while True:
+                token = _current.set(profile)
+                try:
+                    chunk = await anext(iterator)
+                except StopAsyncIteration:
+                    return
+                finally:
+                    _current.reset(token)
+                yield chunk
+        finally:
+            self.report(request, profile)
@@ -0,0 +1,227 @@
+# search_function/response_cache.py
+"""
+Two-tier cache for read-only JSON endpoints.
+
+Responses are looked up first in a small per-process LRU (bounded by entry
+count and TTL), then in Django's cache framework, which is shared by every
+worker when CACHES points at Redis or memcached. Keys are built from the
+endpoint name, the canonicalized query parameters (search terms normalized
+with ProviderSearchService.normalize_search_term, so "Smith", " smith " and
+"SMITH" share an entry) and the providers data version, which ingestion
+bumps: a reload makes every old entry unreachable without a flush. State
+and city suggestions also key on the provider stats version.
+"""
+import functools
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .data_version import PROVIDER_DATA, get_data_version
+from .profiling import profiling_inline
+from .serializers import FastJsonResponse
+
+
+# Hit/miss counter names reported by response_cache_stats()
+LOCAL_HIT = 'local_hits'
+SHARED_HIT = 'shared_hits'
+MISS = 'misses'
+
+
+class LRUCache:
+    """Thread-safe LRU mapping whose entries also expire after ttl seconds"""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_local = None
+_local_lock = threading.Lock()
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def get_local_cache():
+    """The per-process tier, sized from settings on first use"""
+    global _local
+    if _local is None:
+        with _local_lock:
+            if _local is None:
+                _local = LRUCache(
+                    getattr(settings, 'RESPONSE_CACHE_MAX_ENTRIES', 1000),
+                    getattr(settings, 'RESPONSE_CACHE_LOCAL_TTL', 60),
+                )
+    return _local
+
+
+def clear_response_cache():
+    """Empty this process's LRU and counters (the shared tier expires on its own)"""
+    get_local_cache().clear()
+    with _stats_lock:
+        _stats.clear()
+
+
+def _record(endpoint, outcome):
+    with _stats_lock:
+        counters = _stats.setdefault(endpoint, {LOCAL_HIT: 0, SHARED_HIT: 0, MISS: 0})
+        counters[outcome] += 1
+
+
+def response_cache_stats():
+    """Per-endpoint hit/miss counters for this process"""
+    with _stats_lock:
+        stats = {endpoint: dict(counters) for endpoint, counters in _stats.items()}
+    for counters in stats.values():
+        lookups = sum(counters.values())
+        counters['hit_rate'] = round((counters[LOCAL_HIT] + counters[SHARED_HIT]) / lookups, 3) if lookups else 0
+    return {
+        'endpoints': stats,
+        'local_entries': len(get_local_cache()),
+        'data_version': get_data_version(),
+    }
+
+
+def response_cache_key(endpoint, params, normalized=(), kwargs=None, data_versions=()):
+    """Key for a response: endpoint, canonical QueryDict parameters and data version
+
+    data_versions names further data versions the response depends on
+    (e.g. the provider stats), added to the providers one.
+
+    Parameters named in normalized are compared case- and
+    whitespace-insensitively, and dropped when empty; all others (cursors,
+    page numbers) are only stripped, and kept when empty since an empty
+    cursor asks for the first keyset page.
+    """
+    from .views import ProviderSearchService
+
+    canonical = {}
+    for key in sorted(params):
+        values = [value.strip() for value in params.getlist(key)]
+        if key in normalized:
+            values = [ProviderSearchService.normalize_search_term(value) for value in values]
+            values = [value for value in values if value]
+        if values:
+            canonical[key] = values
+    for key, value in sorted((kwargs or {}).items()):
+        canonical[f':{key}'] = str(value)
+
+    payload = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+    digest = hashlib.sha1(payload.encode()).hexdigest()
+    version = '.'.join(str(get_data_version(name)) for name in (PROVIDER_DATA, *data_versions))
+    return f"response:{endpoint}:v{version}:{digest}"
+
+
+def _cached_content(endpoint, request, normalized, kwargs, data_versions):
+    """(key, content, outcome) for a request; content is None on a miss"""
+    key = response_cache_key(endpoint, request.GET, normalized, kwargs, data_versions)
+    local = get_local_cache()
+    content = local.get(key)
+    if content is not None:
+        return key, content, LOCAL_HIT
+    content = cache.get(key)
+    if content is not None:
+        local.set(key, content)
+        return key, content, SHARED_HIT
+    return key, None, MISS
+
+
+def _store(key, response):
+    if response.status_code == 200 and not response.streaming:
+        get_local_cache().set(key, response.content)
+        cache.set(key, response.content, getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+def _hit_response(request, content, outcome, echo):
+    if echo:
+        data = json.loads(content)
+        data[echo] = request.GET
+        response = FastJsonResponse(data)
+    else:
+        response = HttpResponse(content, content_type='application/json')
+    response['X-Cache'] = 'HIT-LOCAL' if outcome == LOCAL_HIT else 'HIT-SHARED'
+    return response
+
+
+def _bypass(request):
+    # A ?_profile=1 request must run (and not store) the real queries
+    return (
+        request.method != 'GET' or getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300) <= 0
+        or profiling_inline(request)
+    )
+
+
+def cache_response(endpoint, normalized=(), echo=None, data_versions=()):
+    """Decorator caching a view's successful GET responses in both tiers
+
+    echo names a top-level response key that repeats the request's own
+    parameters (e.g. 'search_params'); it is replaced on a cache hit so
+    every caller sees what they sent rather than the first caller's spelling.
+    data_versions is passed on to response_cache_key(). Works on both sync
+    and async views.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if _bypass(request):
+                    return await view(request, *args, **kwargs)
+                key, content, outcome = await sync_to_async(_cached_content)(
+                    endpoint, request, normalized, kwargs, data_versions
+                )
+                _record(endpoint, outcome)
+                if content is None:
+                    response = await view(request, *args, **kwargs)
+                    return await sync_to_async(_store)(key, response)
+                return _hit_response(request, content, outcome, echo)
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if _bypass(request):
+                return view(request, *args, **kwargs)
+            key, content, outcome = _cached_content(endpoint, request, normalized, kwargs, data_versions)
+            _record(endpoint, outcome)
+            if content is None:
+                return _store(key, view(request, *args, **kwargs))
+            return _hit_response(request, content, outcome, echo)
+        return wrapper
+    return decorator
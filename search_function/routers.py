@@ -0,0 +1,289 @@
+# search_function/routers.py
+"""
+Read replicas for search traffic.
+
+ReplicaRoutingMiddleware picks one replica for each request to a
+search_function view, so a page and its count read the same snapshot, and
+ReplicaRouter sends that request's reads there. Writes always go to the
+primary and send the rest of the request's reads there too. Anything that
+is not such a request (ingestion, management commands, the admin) never
+sees a replica.
+
+Replicas are chosen round robin or by least load (active backends at the
+last check plus this worker's requests in flight). Every
+DB_REPLICA_CHECK_INTERVAL seconds a replica is asked how far it is behind;
+one that lags more than DB_REPLICA_MAX_LAG seconds, or cannot be reached,
+is out of rotation until a later check finds it healthy. With no replica
+available requests read from the primary.
+
+A client that needs to see an ingest it just ran sends the new data version
+in an X-Min-Data-Version header; replicas that have not replayed that
+version yet are skipped for the request.
+"""
+import contextvars
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.urls import Resolver404, resolve
+
+from .data_version import PROVIDER_DATA
+from .models import DataVersion
+
+
+logger = logging.getLogger(__name__)
+
+ROUND_ROBIN = 'round_robin'
+LEAST_LOADED = 'least_loaded'
+SELECTIONS = (ROUND_ROBIN, LEAST_LOADED)
+
+MIN_DATA_VERSION_HEADER = 'HTTP_X_MIN_DATA_VERSION'
+
+# Replay lag in seconds, active client backends and data version. Lag is 0
+# on a server that is not a standby, and on a standby that is streaming and
+# has replayed everything it received. Otherwise (replay behind, or a WAL
+# receiver that is not streaming, which also leaves received = replayed)
+# it is the age of the last replayed transaction. Reading the receiver's
+# status needs pg_read_all_stats; without it a replica looks disconnected
+REPLICA_STATUS_SQL = f"""
+    SELECT CASE
+               WHEN NOT pg_is_in_recovery() THEN 0
+               WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+                    AND EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN 0
+               ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+           END,
+           (SELECT COUNT(*) FROM pg_stat_activity WHERE state = 'active' AND backend_type = 'client backend'),
+           (SELECT version FROM {DataVersion._meta.db_table} WHERE name = %s)
+"""
+
+
+class RequestRoute:
+    """Database a request reads from; switched to the primary once it writes"""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+
+_route = contextvars.ContextVar('read_route', default=None)
+
+
+@contextmanager
+def reading_from(alias):
+    """Route reads in this block (and threads it starts via asgiref) to alias"""
+    route = RequestRoute(alias)
+    token = _route.set(route)
+    try:
+        yield route
+    finally:
+        _route.reset(token)
+
+
+def read_alias():
+    """Database alias the current request reads from"""
+    route = _route.get()
+    return route.alias if route is not None else DEFAULT_DB_ALIAS
+
+
+def read_connection():
+    """Connection for raw SQL reads, which routers never see"""
+    return connections[read_alias()]
+
+
+class ReplicaState:
+    """What the last check found out about one replica"""
+
+    def __init__(self):
+        self.checked_at = None
+        self.healthy = False
+        self.lag = None
+        self.active = 0
+        self.data_version = 0
+        self.in_flight = 0
+        self.checking = False
+
+
+class ReplicaSet:
+    """Replica aliases with their health and the selection policy"""
+
+    def __init__(self, aliases, selection=ROUND_ROBIN, max_lag=30, check_interval=5):
+        if selection not in SELECTIONS:
+            raise ValueError(f"Replica selection must be one of: {', '.join(SELECTIONS)}")
+        self.aliases = list(aliases)
+        self.selection = selection
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.states = {alias: ReplicaState() for alias in self.aliases}
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+
+    def check(self, alias):
+        """Query the replica's lag, load and data version; take it out of rotation if needed"""
+        state = self.states[alias]
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(REPLICA_STATUS_SQL, [PROVIDER_DATA])
+                lag, active, data_version = cursor.fetchone()
+        except DatabaseError as e:
+            healthy, lag, active, data_version = False, None, 0, state.data_version
+            error = str(e).strip()
+        else:
+            lag, data_version = float(lag), data_version or 0
+            healthy, error = lag <= self.max_lag, f"{lag:.1f}s behind"
+
+        if healthy != state.healthy or state.checked_at is None:
+            if healthy:
+                logger.info("Replica %s in rotation (%.1fs behind)", alias, lag)
+            else:
+                logger.warning("Replica %s out of rotation: %s", alias, error)
+        state.healthy, state.lag, state.active, state.data_version = healthy, lag, active, data_version
+        state.checked_at = time.monotonic()
+        return state
+
+    def claim_check(self, alias, now):
+        """Whether the caller should run alias's due check; only one caller at a time does"""
+        state = self.states[alias]
+        with self._lock:
+            if state.checking or (state.checked_at is not None and now - state.checked_at < self.check_interval):
+                return False
+            state.checking = True
+            return True
+
+    def available(self, min_data_version=None):
+        """Healthy replicas (checked if due), holding at least min_data_version
+
+        Requests arriving while another one runs a due check go by the
+        previous result instead of waiting on the same (possibly
+        unreachable) replica.
+        """
+        now = time.monotonic()
+        replicas = []
+        for alias in self.aliases:
+            if self.claim_check(alias, now):
+                try:
+                    self.check(alias)
+                finally:
+                    self.states[alias].checking = False
+            state = self.states[alias]
+            if state.healthy and (min_data_version is None or state.data_version >= min_data_version):
+                replicas.append(alias)
+        return replicas
+
+    def acquire(self, min_data_version=None):
+        """Pick a replica for a request (None: use the primary); release() it afterwards"""
+        replicas = self.available(min_data_version)
+        if not replicas:
+            return None
+        with self._lock:
+            # Rotate the starting point so least-loaded ties are spread too
+            turn = next(self._turn) % len(replicas)
+            replicas = replicas[turn:] + replicas[:turn]
+            if self.selection == LEAST_LOADED:
+                alias = min(replicas, key=lambda alias: self.states[alias].active + self.states[alias].in_flight)
+            else:
+                alias = replicas[0]
+            self.states[alias].in_flight += 1
+        return alias
+
+    def release(self, alias):
+        with self._lock:
+            self.states[alias].in_flight -= 1
+
+
+_replicas = None
+_replicas_lock = threading.Lock()
+
+
+def get_replica_set():
+    """The configured replicas, built from settings on first use"""
+    global _replicas
+    if _replicas is None:
+        with _replicas_lock:
+            if _replicas is None:
+                _replicas = ReplicaSet(
+                    getattr(settings, 'DB_REPLICAS', []),
+                    getattr(settings, 'DB_REPLICA_SELECTION', ROUND_ROBIN),
+                    getattr(settings, 'DB_REPLICA_MAX_LAG', 30),
+                    getattr(settings, 'DB_REPLICA_CHECK_INTERVAL', 5),
+                )
+    return _replicas
+
+
+class ReplicaRouter:
+    """Reads of a routed request go to its replica; everything else to the primary"""
+
+    def db_for_read(self, model, **hints):
+        route = _route.get()
+        return route.alias if route is not None else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        route = _route.get()
+        if route is not None:
+            # Read your own writes for the rest of the request
+            route.alias = DEFAULT_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def reads_from_replica(request):
+    """Whether the request is served by a search_function view"""
+    try:
+        match = resolve(request.path_info, urlconf=getattr(request, 'urlconf', None))
+    except Resolver404:
+        return False
+    return match.func.__module__.startswith('search_function.')
+
+
+def min_data_version(request):
+    try:
+        return int(request.META[MIN_DATA_VERSION_HEADER])
+    except (KeyError, ValueError):
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Pick the database each request reads from; see the module docstring"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'DB_REPLICAS', None):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        alias = get_replica_set().acquire(min_data_version(request)) if reads_from_replica(request) else None
+        try:
+            with reading_from(alias or DEFAULT_DB_ALIAS):
+                return self.get_response(request)
+        finally:
+            if alias:
+                get_replica_set().release(alias)
+
+    async def __acall__(self, request):
+        alias = None
+        if reads_from_replica(request):
+            # A due lag check queries the replica
+            alias = await sync_to_async(get_replica_set().acquire)(min_data_version(request))
+        try:
+            with reading_from(alias or DEFAULT_DB_ALIAS):
+                return await self.get_response(request)
+        finally:
+            if alias:
+                get_replica_set().release(alias)
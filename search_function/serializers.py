@@ -0,0 +1,114 @@
+# search_function/serializers.py
+"""
+Row serialization for the list endpoints.
+
+Search, advanced search and grouped search fetch a page as plain tuples
+(QuerySet.values_list) holding only the provider_search columns the response
+shows, instead of full model instances. Each endpoint's RowSerializer
+resolves the tuple position of every output key once, at import, so turning a
+row into a result dict is one itemgetter call and one dict update. Responses
+are encoded with orjson when it is installed and with the stdlib encoder
+JsonResponse uses otherwise; both produce the same JSON values.
+"""
+import json
+from collections.abc import Mapping
+from operator import itemgetter
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import FloatField, Value
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Columns that only exist as annotations on some searches (distance_miles on
+# a radius search); they are selected as NULL when the queryset lacks them
+ANNOTATED_COLUMNS = {
+    'distance_miles': FloatField(),
+}
+
+
+def _tuple_getter(positions):
+    # itemgetter returns a bare value, not a 1-tuple, for a single position
+    if len(positions) == 1:
+        position, = positions
+        return lambda row: (row[position],)
+    return itemgetter(*positions)
+
+
+class RowSerializer:
+    """Build result dicts from values_list() rows of a ProviderSearch queryset
+
+    fields maps each output key to the column it is read from, in output
+    order; constants are copied in first. optional keys are added only when
+    at least one of their columns is set (taxonomy text for providers whose
+    code is not in NUCC). converters post-process single keys. npi is
+    always selected first, so keyset cursors can be read from the rows.
+    """
+
+    def __init__(self, fields, constants=None, optional=None, converters=None):
+        self.constants = dict(constants or {})
+        self.converters = tuple((converters or {}).items())
+        fields, optional = dict(fields), dict(optional or {})
+        self.columns = tuple(dict.fromkeys(['npi', *fields.values(), *optional.values()]))
+
+        position = {column: index for index, column in enumerate(self.columns)}
+        self._keys = tuple(fields)
+        self._values = _tuple_getter([position[column] for column in fields.values()])
+        self._optional_keys = tuple(optional)
+        self._optional_values = _tuple_getter([position[column] for column in optional.values()]) if optional else None
+
+    def __call__(self, row):
+        result = self.constants.copy()
+        result.update(zip(self._keys, self._values(row)))
+        if self._optional_values:
+            optional_values = self._optional_values(row)
+            if any(optional_values):
+                result.update(zip(self._optional_keys, optional_values))
+        for key, convert in self.converters:
+            result[key] = convert(result[key])
+        return result
+
+    def annotate(self, queryset):
+        """queryset with every annotation-only column present (NULL if the search didn't add it)"""
+        missing = {
+            column: Value(None, output_field=output_field)
+            for column, output_field in ANNOTATED_COLUMNS.items()
+            if column in self.columns and column not in queryset.query.annotations
+        }
+        return queryset.annotate(**missing) if missing else queryset
+
+    def values(self, queryset):
+        """queryset yielding this serializer's columns as tuples"""
+        return self.annotate(queryset).values_list(*self.columns)
+
+
+def _orjson_default(obj):
+    # Subclasses of dict, str, int and list arrive here (OPT_PASSTHROUGH_SUBCLASS)
+    # so a QueryDict is encoded through items(), one value per key, as json.dumps does
+    if isinstance(obj, Mapping):
+        return dict(obj.items())
+    if isinstance(obj, str):
+        return str.__str__(obj)
+    for builtin in (int, list):
+        if isinstance(obj, builtin):
+            return builtin(obj)
+    return DjangoJSONEncoder().default(obj)
+
+
+def dumps(data):
+    """Encode data as JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_orjson_default, option=orjson.OPT_PASSTHROUGH_SUBCLASS)
+    return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+class FastJsonResponse(HttpResponse):
+    """JsonResponse for a dict, encoded by dumps()"""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
@@ -0,0 +1,179 @@
+# search_function/stats.py
+"""
+Precomputed provider statistics.
+
+The health check, state and city suggestions and the API index used to run
+COUNT(*) and DISTINCT scans over the whole providers table on every call.
+Ingestion now calls refresh_provider_stats(), which computes per-state
+counts, the distinct cities and the overall total in one GROUP BY ROLLUP
+scan and stores them in the small provider_stats table. A delta only
+recomputes the states it touched. Each worker keeps
+the snapshot in memory until the 'provider_stats' data version changes.
+"""
+import logging
+import threading
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .data_version import bump_data_version, get_data_version
+from .models import ProviderStats
+
+
+logger = logging.getLogger(__name__)
+
+STATS_DATA = 'provider_stats'
+
+# One row per practice state plus a grand total row (is_total = 1)
+STATS_SQL = """
+    SELECT GROUPING(NULLIF(UPPER(practice_state), '')) AS is_total,
+           NULLIF(UPPER(practice_state), '') AS state,
+           COUNT(*),
+           array_remove(array_agg(DISTINCT NULLIF(practice_city, '') ORDER BY NULLIF(practice_city, '')), NULL)
+    FROM providers
+    WHERE entity_type_code = '1'
+    GROUP BY ROLLUP (NULLIF(UPPER(practice_state), ''))
+"""
+
+# Counts and cities of the given states, read from their provider_search
+# partitions only
+STATE_STATS_SQL = """
+    SELECT practice_state,
+           COUNT(*),
+           array_remove(array_agg(DISTINCT NULLIF(practice_city, '') ORDER BY NULLIF(practice_city, '')), NULL)
+    FROM provider_search
+    WHERE practice_state = ANY(%s)
+    GROUP BY practice_state
+"""
+
+SORTED_CITIES_SQL = "SELECT coalesce(array_agg(city ORDER BY city), '{}') FROM unnest(%s::text[]) city"
+
+
+def compute_provider_stats():
+    """Run the stats scan; returns unsaved ProviderStats rows (ALL first)"""
+    with connection.cursor() as cursor:
+        cursor.execute(STATS_SQL)
+        rows = cursor.fetchall()
+
+    stats = [ProviderStats(state=ProviderStats.ALL, individual_providers=0, cities=[])]
+    for is_total, state, count, cities in rows:
+        if is_total:
+            stats[0] = ProviderStats(state=ProviderStats.ALL, individual_providers=count, cities=cities)
+        elif state and len(state) <= 2:
+            stats.append(ProviderStats(state=state, individual_providers=count, cities=cities))
+    return stats
+
+
+def compute_state_stats(states):
+    """Unsaved rows for the given states plus ALL, or None if a full scan is needed
+
+    The ALL row is derived from the stored rows: its total moves by the
+    states' change and its cities are the stored cities of every other
+    state plus those only providers outside any state row had. That only
+    holds when each state has a row of its own (two letters) and a
+    previous refresh stored an ALL row.
+    """
+    if any(not state or len(state) > 2 for state in states):
+        return None
+    current = {row.state: row for row in ProviderStats.objects.all()}
+    total = current.pop(ProviderStats.ALL, None)
+    if total is None:
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(STATE_STATS_SQL, [sorted(states)])
+        fresh = [
+            ProviderStats(state=state, individual_providers=count, cities=cities)
+            for state, count, cities in cursor.fetchall()
+        ]
+        kept = [row for state, row in current.items() if state not in states]
+        outside_states = set(total.cities).difference(*(row.cities for row in current.values()))
+        cursor.execute(SORTED_CITIES_SQL, [sorted(outside_states.union(*(row.cities for row in kept + fresh)))])
+        cities = cursor.fetchone()[0]
+
+    individual_providers = total.individual_providers + sum(row.individual_providers for row in fresh) - sum(
+        current[state].individual_providers for state in states if state in current
+    )
+    all_row = ProviderStats(state=ProviderStats.ALL, individual_providers=individual_providers, cities=cities)
+    return [all_row] + fresh
+
+
+def refresh_provider_stats(states=None):
+    """Recompute the snapshot and make every worker reload it; returns the rows
+
+    states limits the refresh to the practice states an ingest changed:
+    only their provider_search partitions are read. Falls back to the
+    full scan when compute_state_stats() cannot derive the ALL row.
+    """
+    stats = compute_state_stats(set(states)) if states is not None else None
+    if stats is None:
+        states = None
+        stats = compute_provider_stats()
+    now = timezone.now()
+    for row in stats:
+        row.refreshed_at = now
+    with transaction.atomic():
+        if states is None:
+            ProviderStats.objects.all().delete()
+        else:
+            ProviderStats.objects.filter(state__in=[ProviderStats.ALL, *states]).delete()
+        ProviderStats.objects.bulk_create(stats)
+    bump_data_version(STATS_DATA)
+    return stats
+
+
+class ProviderStatsSnapshot:
+    """In-memory copy of provider_stats"""
+
+    def __init__(self, rows, version=0):
+        self.version = version
+        self.refreshed_at = None
+        self.total_individual_providers = 0
+        self.state_counts = {}
+        self._cities = {}
+        for row in rows:
+            self._cities[row.state] = tuple(row.cities)
+            if row.state == ProviderStats.ALL:
+                self.total_individual_providers = row.individual_providers
+                self.refreshed_at = row.refreshed_at
+            else:
+                self.state_counts[row.state] = row.individual_providers
+        self.states = tuple(sorted(self.state_counts))
+
+    @classmethod
+    def from_database(cls, version=0):
+        rows = list(ProviderStats.objects.all())
+        if not rows:
+            # Never refreshed (e.g. a fresh deployment): serve empty stats
+            # rather than scanning providers from whichever request got here
+            logger.warning("provider_stats is empty; run `manage.py refresh_provider_stats`")
+        return cls(rows, version)
+
+    def cities(self, state=None, limit=50):
+        """Sorted distinct cities, optionally for one state"""
+        key = state.strip().upper() if state else ProviderStats.ALL
+        return list(self._cities.get(key, ())[:limit])
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_provider_stats():
+    """Return the process-wide snapshot, reloading it after a refresh"""
+    global _snapshot
+    version = get_data_version(STATS_DATA)
+    snapshot = _snapshot
+    if snapshot is None or snapshot.version != version:
+        with _snapshot_lock:
+            if _snapshot is None or _snapshot.version != version:
+                _snapshot = ProviderStatsSnapshot.from_database(version)
+            snapshot = _snapshot
+    return snapshot
+
+
+def invalidate_provider_stats():
+    """Drop the cached snapshot so the next read reloads it"""
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = None
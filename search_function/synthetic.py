@@ -0,0 +1,276 @@
+# search_function/synthetic.py
+"""
+Deterministic synthetic NPPES data for benchmarks.
+
+iter_synthetic_provider_rows(count, seed) yields provider rows in
+PROVIDER_FIELDS order, as ingest.iter_provider_rows does for a real NPPES
+file, so they load through the same pipeline. The same count and seed
+always give the same rows.
+
+The distributions follow the real file's skew rather than being uniform:
+surnames and first names are Zipf-distributed over a few hundred common
+names and a long tail of rare ones (Smith is about 1 in 50 providers,
+most surnames a handful), states follow population, ZIP codes cluster in
+each state's largest metro, providers in a practice share its address and
+phone number, and a few specialties (nursing, family and internal
+medicine, therapy, counseling) cover most individuals. Taxonomy codes
+come from the NUCC release CSV: Individual-section codes for people,
+Non-Individual ones for organizations.
+"""
+import bisect
+import functools
+import itertools
+import os
+import random
+from operator import itemgetter
+
+from django.conf import settings
+
+from .ingest import PROVIDER_FIELDS, iter_taxonomy_rows
+from .phonetic import phonetic_key
+
+
+DEFAULT_TAXONOMY_PATH = os.path.join(settings.BASE_DIR, 'nucc_taxonomy_251.csv')
+
+# Share of NPIs that belong to individuals (entity type 1); the rest are organizations
+INDIVIDUAL_SHARE = 0.78
+
+SURNAMES = (
+    'SMITH JOHNSON WILLIAMS BROWN JONES GARCIA MILLER DAVIS RODRIGUEZ MARTINEZ HERNANDEZ LOPEZ GONZALEZ '
+    'WILSON ANDERSON THOMAS TAYLOR MOORE JACKSON MARTIN LEE PEREZ THOMPSON WHITE HARRIS SANCHEZ CLARK '
+    'RAMIREZ LEWIS ROBINSON WALKER YOUNG ALLEN KING WRIGHT SCOTT TORRES NGUYEN HILL FLORES GREEN ADAMS '
+    'NELSON BAKER HALL RIVERA CAMPBELL MITCHELL CARTER ROBERTS PATEL SHAH KIM CHEN WANG LI ZHANG SINGH '
+    'KHAN GOMEZ PHILLIPS EVANS TURNER DIAZ PARKER CRUZ EDWARDS COLLINS REYES STEWART MORRIS MORALES '
+    'MURPHY COOK ROGERS GUTIERREZ ORTIZ MORGAN COOPER PETERSON BAILEY REED KELLY HOWARD RAMOS COX WARD '
+    'RICHARDSON WATSON BROOKS CHAVEZ WOOD JAMES BENNETT GRAY MENDOZA RUIZ HUGHES PRICE ALVAREZ CASTILLO '
+    'SANDERS MYERS LONG ROSS FOSTER JIMENEZ POWELL JENKINS PERRY RUSSELL SULLIVAN BELL COLEMAN BUTLER '
+    'HENDERSON BARNES GONZALES FISHER VASQUEZ SIMMONS ROMERO JORDAN PATTERSON ALEXANDER HAMILTON GRAHAM '
+    'REYNOLDS GRIFFIN WALLACE MORENO WEST COLE HAYES BRYANT HERRERA GIBSON ELLIS TRAN MEDINA AGUILAR '
+    'STEVENS MURRAY FORD CASTRO MARSHALL OWENS HARRISON FERNANDEZ MCDONALD WOODS WASHINGTON KENNEDY WELLS '
+    'VARGAS HENRY SHAW COHEN GOLDBERG FRIEDMAN KAPLAN LEVINE RAO REDDY GUPTA KUMAR SHARMA MEHTA'
+).split()
+
+FIRST_NAMES = (
+    'MICHAEL JAMES JOHN ROBERT DAVID WILLIAM MARY JENNIFER CHRISTOPHER ELIZABETH JESSICA SARAH RICHARD '
+    'JOSEPH THOMAS DANIEL MATTHEW LISA KAREN PATRICIA LAURA SUSAN MARK ANDREW KIMBERLY AMY PAUL STEVEN '
+    'MICHELLE BRIAN ANGELA MELISSA KEVIN JASON ERIC STEPHANIE NICOLE AMANDA REBECCA JEFFREY RACHEL SCOTT '
+    'HEATHER JULIE EMILY ASHLEY TIMOTHY ANTHONY CHRISTINE KATHERINE LINDA BARBARA NANCY ANNA MARIA PETER '
+    'GREGORY SAMUEL RYAN JOSHUA BENJAMIN ALEXANDER CATHERINE MEGAN LAUREN SAMANTHA ANDREA RAJ PRIYA WEI '
+    'MIN JUN ANH AHMED MOHAMMED FATIMA CARLOS JOSE JUAN LUIS ANA SOFIA OLGA IVAN YUKI HIROSHI KWAME'
+).split()
+
+# Syllables the long tail of rare names is built from
+_TAIL_HEADS = (
+    'AB AD AL AM AN AR AS BAR BEL BER BOR BRA CAL CAR COR DAL DEL DOR ELL FAR FEL GAL GOR HAL HAR HOL '
+    'KAL KEL KOR LAN LAR LEV LOR MAL MAR MER MOR NAL NOR OL OR PAL PER QUIN RAD RAL REN ROS SAL SAR SEL '
+    'SOR TAL TER TOR VAL VER WAL WIN ZAL ZER'
+).split()
+_TAIL_MIDDLES = 'A E I O U AN EN IN ON AR ER OR EL IL AL OS ES IS AD ED'.split()
+_TAIL_ENDS = (
+    'BERG STEIN SON MAN FORD WELL TON LEY EZ ANI SKI OV IAN ELLO ETTI AKIS OGLU ENKO SEN ER HOLM WOOD '
+    'FIELD ROSS'
+).split()
+_FIRST_TAIL_ENDS = 'A AH ANA ELLE IA INA ON EN IO US EL ETTE'.split()
+
+# Zipf exponents: surnames have the longest tail, first names a shorter one
+SURNAME_SKEW = 0.75
+FIRST_NAME_SKEW = 1.0
+
+# State -> (relative provider count, ZIP3 prefixes, largest city)
+STATES = {
+    'CA': (395, (900, 961), 'LOS ANGELES'), 'TX': (291, (750, 799), 'HOUSTON'),
+    'FL': (215, (320, 349), 'MIAMI'), 'NY': (202, (100, 149), 'NEW YORK'),
+    'PA': (130, (150, 196), 'PHILADELPHIA'), 'IL': (128, (600, 629), 'CHICAGO'),
+    'OH': (118, (430, 459), 'COLUMBUS'), 'GA': (107, (300, 319), 'ATLANTA'),
+    'NC': (104, (270, 289), 'CHARLOTTE'), 'MI': (101, (480, 499), 'DETROIT'),
+    'NJ': (93, (70, 89), 'NEWARK'), 'VA': (86, (220, 246), 'VIRGINIA BEACH'),
+    'WA': (77, (980, 994), 'SEATTLE'), 'AZ': (72, (850, 865), 'PHOENIX'),
+    'MA': (70, (10, 27), 'BOSTON'), 'TN': (69, (370, 385), 'NASHVILLE'),
+    'IN': (68, (460, 479), 'INDIANAPOLIS'), 'MD': (62, (206, 219), 'BALTIMORE'),
+    'MO': (62, (630, 658), 'KANSAS CITY'), 'WI': (59, (530, 549), 'MILWAUKEE'),
+    'CO': (58, (800, 816), 'DENVER'), 'MN': (57, (550, 567), 'MINNEAPOLIS'),
+    'SC': (51, (290, 299), 'COLUMBIA'), 'AL': (50, (350, 369), 'BIRMINGHAM'),
+    'LA': (47, (700, 714), 'NEW ORLEANS'), 'KY': (45, (400, 427), 'LOUISVILLE'),
+    'OR': (42, (970, 979), 'PORTLAND'), 'OK': (40, (730, 749), 'OKLAHOMA CITY'),
+    'CT': (36, (60, 69), 'HARTFORD'), 'UT': (33, (840, 847), 'SALT LAKE CITY'),
+    'IA': (32, (500, 528), 'DES MOINES'), 'NV': (31, (889, 898), 'LAS VEGAS'),
+    'AR': (30, (716, 729), 'LITTLE ROCK'), 'MS': (30, (386, 397), 'JACKSON'),
+    'KS': (29, (660, 679), 'WICHITA'), 'NM': (21, (870, 884), 'ALBUQUERQUE'),
+    'NE': (20, (680, 693), 'OMAHA'), 'ID': (18, (832, 838), 'BOISE'),
+    'WV': (18, (247, 268), 'CHARLESTON'), 'HI': (15, (967, 968), 'HONOLULU'),
+    'NH': (14, (30, 38), 'MANCHESTER'), 'ME': (14, (39, 49), 'PORTLAND'),
+    'RI': (11, (28, 29), 'PROVIDENCE'), 'MT': (11, (590, 599), 'BILLINGS'),
+    'DE': (10, (197, 199), 'WILMINGTON'), 'SD': (9, (570, 577), 'SIOUX FALLS'),
+    'ND': (8, (580, 588), 'FARGO'), 'AK': (7, (995, 999), 'ANCHORAGE'),
+    'DC': (7, (200, 205), 'WASHINGTON'), 'VT': (6, (50, 59), 'BURLINGTON'),
+    'WY': (6, (820, 831), 'CHEYENNE'),
+}
+
+TOWNS = (
+    'SPRINGFIELD FRANKLIN GREENVILLE CLINTON MADISON SALEM GEORGETOWN ARLINGTON FAIRVIEW RIVERSIDE '
+    'ASHLAND BURLINGTON MANCHESTER MILFORD OXFORD CLAYTON DAYTON JACKSONVILLE LEXINGTON WINCHESTER '
+    'AUBURN BRISTOL CAMDEN DOVER HUDSON KINGSTON LINCOLN MARION NEWPORT PLYMOUTH RICHMOND SHELBYVILLE '
+    'TROY WASHINGTON CENTERVILLE VERNON OAKLAND HAMILTON LEBANON MONROE'
+).split()
+
+STREETS = (
+    'MAIN ST', 'OAK AVE', 'PARK AVE', 'MEDICAL CENTER DR', 'HOSPITAL DR', 'WASHINGTON ST', 'ELM ST',
+    'MAPLE AVE', 'CENTRAL AVE', 'BROADWAY', 'HIGHLAND AVE', 'LAKE ST', 'HILL RD', 'PROFESSIONAL PKWY',
+    'UNIVERSITY BLVD', 'CHURCH ST', 'MARKET ST', 'RIVER RD', 'COMMERCE DR', 'HEALTH WAY',
+)
+
+ORGANIZATION_KINDS = (
+    'MEDICAL GROUP', 'FAMILY PRACTICE LLC', 'PHARMACY', 'PHYSICAL THERAPY INC', 'DENTAL ASSOCIATES',
+    'HOME HEALTH SERVICES', 'CLINIC', 'LABORATORY', 'AMBULANCE SERVICE', 'BEHAVIORAL HEALTH',
+)
+
+# The most common individual taxonomies and their relative weights; the
+# other Individual-section codes share TAIL_TAXONOMY_WEIGHT between them
+HEAD_TAXONOMIES = {
+    '390200000X': 6, '363LF0000X': 6, '163W00000X': 6, '207Q00000X': 5, '207R00000X': 5,
+    '225100000X': 4, '1041C0700X': 3.5, '101YM0800X': 3.5, '122300000X': 3.5, '183500000X': 3,
+    '363A00000X': 3, '103T00000X': 2.5, '111N00000X': 2, '2084P0800X': 1.5, '367500000X': 1.5,
+    '235Z00000X': 1.5, '225X00000X': 1.5, '207P00000X': 1.5, '208000000X': 1.5, '133V00000X': 1,
+    '207RC0000X': 1, '208600000X': 1, '207V00000X': 1, '1223G0001X': 1, '152W00000X': 1,
+    '106H00000X': 1, '364S00000X': 0.5,
+}
+TAIL_TAXONOMY_WEIGHT = 25
+
+# Practices (sharing an address and phone number) per ZIP code
+PRACTICES_PER_ZIP = 40
+MISSING_TAXONOMY_SHARE = 0.01
+MISSING_PHONE_SHARE = 0.05
+FOREIGN_SHARE = 0.002
+
+
+class _Weighted:
+    """Draw from values with the given weights, one rng.random() per draw"""
+
+    def __init__(self, values, weights):
+        self.values = list(values)
+        self.cumulative = list(itertools.accumulate(weights))
+
+    def draw(self, rng):
+        return self.values[bisect.bisect(self.cumulative, rng.random() * self.cumulative[-1])]
+
+
+def _zipf(values, skew=1.0):
+    return _Weighted(values, [1 / rank ** skew for rank in range(1, len(values) + 1)])
+
+
+def _tail_names(heads, ends, middles=('',)):
+    # Fixed shuffle so rarity doesn't follow the alphabet; independent of the seed
+    names = [head + middle + end for head in heads for middle in middles for end in ends]
+    random.Random(0).shuffle(names)
+    return names
+
+
+# Names repeat heavily, so each one is encoded once
+_phonetic_key = functools.lru_cache(maxsize=None)(phonetic_key)
+
+_in_field_order = itemgetter(*PROVIDER_FIELDS)
+
+
+def npi_check_digit(base):
+    """Luhn check digit of a 9-digit NPI base (with the 80840 card-issuer prefix)"""
+    total = 24  # Luhn sum of the 80840 prefix
+    for position, digit in enumerate(reversed(base)):
+        value = int(digit) * (2 if position % 2 == 0 else 1)
+        total += value - 9 if value > 9 else value
+    return str((10 - total % 10) % 10)
+
+
+class SyntheticProviders:
+    """Samplers behind iter_synthetic_provider_rows, built once per taxonomy file"""
+
+    def __init__(self, taxonomy_path=DEFAULT_TAXONOMY_PATH):
+        surnames = dict.fromkeys(SURNAMES + _tail_names(_TAIL_HEADS, _TAIL_ENDS, _TAIL_MIDDLES))
+        self.surnames = _zipf(list(surnames), SURNAME_SKEW)
+        self.first_names = _zipf(FIRST_NAMES + _tail_names(_TAIL_HEADS, _FIRST_TAIL_ENDS), FIRST_NAME_SKEW)
+        self.states = _Weighted(STATES, [weight for weight, _zip3, _city in STATES.values()])
+        # ZIP3 prefixes in order, so each state's first prefix (its main metro) is the busiest
+        self.zip3 = {state: _zipf(range(low, high + 1)) for state, (_w, (low, high), _c) in STATES.items()}
+        self.zip_suffix = _zipf(range(1, 100))
+        self.practice = _zipf(range(PRACTICES_PER_ZIP))
+
+        individual, organization = [], []
+        for code, *_fields, section in iter_taxonomy_rows(taxonomy_path):
+            (individual if section == 'Individual' else organization).append(code)
+        if not individual or not organization:
+            raise ValueError(f"{taxonomy_path} has no Individual or Non-Individual taxonomy codes")
+        tail = [code for code in individual if code not in HEAD_TAXONOMIES]
+        head = {code: weight for code, weight in HEAD_TAXONOMIES.items() if code in individual}
+        tail_weights = _zipf(tail).cumulative
+        self.individual_taxonomies = _Weighted(
+            [*head, *tail],
+            [*head.values(), *(
+                TAIL_TAXONOMY_WEIGHT * (cumulative - previous) / tail_weights[-1]
+                for previous, cumulative in zip([0, *tail_weights], tail_weights)
+            )],
+        )
+        self.organization_taxonomies = _zipf(organization)
+
+    def location(self, rng):
+        """(line1, line2, city, state, postal_code, phone) of a practice"""
+        if rng.random() < FOREIGN_SHARE:
+            return f"{rng.randrange(1, 999)} KING ST W", None, 'TORONTO', None, 'M5V3L9', None
+
+        state = self.states.draw(rng)
+        _weight, (low, _high), largest_city = STATES[state]
+        zip3 = self.zip3[state].draw(rng)
+        zip5 = zip3 * 100 + self.zip_suffix.draw(rng)
+        city = largest_city if zip3 == low else TOWNS[zip5 * 2654435761 % 2 ** 32 % len(TOWNS)]
+        postal_code = f"{zip5:05d}{rng.randrange(10000):04d}" if rng.random() < 0.6 else f"{zip5:05d}"
+
+        # Providers in the same practice share its address and main number
+        practice = self.practice.draw(rng)
+        key = zip5 * PRACTICES_PER_ZIP + practice
+        line1 = f"{100 + key * 37 % 9800} {STREETS[key * 7 % len(STREETS)]}"
+        line2 = f"SUITE {100 + practice * 10}" if practice % 3 == 0 else None
+        phone = None
+        if rng.random() >= MISSING_PHONE_SHARE:
+            phone = f"{201 + zip3 * 7 % 780}{200 + key * 31 % 800}{key * 97 % 10000:04d}"
+        return line1, line2, city, state, postal_code, phone
+
+    def row(self, rng, index, npi_offset):
+        """One provider tuple in PROVIDER_FIELDS order"""
+        # Distinct for every index below 200 million: 7919 is prime to 2 * 10^8
+        base = f"{100000000 + (index * 7919 + npi_offset) % 200000000:09d}"
+        line1, line2, city, state, postal_code, phone = self.location(rng)
+        row = {
+            'npi': base + npi_check_digit(base),
+            'organization_name': None, 'last_name': None, 'first_name': None, 'middle_name': None,
+            'practice_address_line1': line1, 'practice_address_line2': line2, 'practice_city': city,
+            'practice_state': state, 'practice_postal_code': postal_code, 'practice_phone': phone,
+            'first_name_phonetic': None, 'last_name_phonetic': None,
+        }
+
+        if rng.random() < INDIVIDUAL_SHARE:
+            first_name, last_name = self.first_names.draw(rng), self.surnames.draw(rng)
+            middle_draw = rng.random()
+            if middle_draw < 0.55:
+                row['middle_name'] = chr(ord('A') + int(middle_draw * 26 / 0.55))
+            elif middle_draw < 0.65:
+                row['middle_name'] = self.first_names.draw(rng)
+            taxonomy = self.individual_taxonomies.draw(rng)
+            row.update({
+                'entity_type_code': '1', 'first_name': first_name, 'last_name': last_name,
+                'primary_taxonomy_code': taxonomy if rng.random() >= MISSING_TAXONOMY_SHARE else None,
+                'first_name_phonetic': _phonetic_key(first_name), 'last_name_phonetic': _phonetic_key(last_name),
+            })
+        else:
+            kind = ORGANIZATION_KINDS[rng.randrange(len(ORGANIZATION_KINDS))]
+            row.update({
+                'entity_type_code': '2', 'organization_name': f"{self.surnames.draw(rng)} {kind}",
+                'primary_taxonomy_code': self.organization_taxonomies.draw(rng),
+            })
+        return _in_field_order(row)
+
+
+def iter_synthetic_provider_rows(count, seed=0, taxonomy_path=DEFAULT_TAXONOMY_PATH):
+    """Yield count deterministic synthetic provider tuples, in PROVIDER_FIELDS order"""
+    providers = SyntheticProviders(taxonomy_path)
+    rng = random.Random(seed)
+    npi_offset = rng.randrange(200000000)
+    for index in range(count):
+        yield providers.row(rng, index, npi_offset)
@@ -0,0 +1,124 @@
+# search_function/taxonomy.py
+"""
+In-memory registry of the NUCC taxonomy table.
+
+The nucc_taxonomy table is small (~880 rows) and only changes when a new NUCC
+release is loaded, so each worker loads it once and serves every taxonomy
+lookup from memory instead of issuing one query per provider row. load_taxonomy
+bumps the 'taxonomy' data version, which makes every worker reload.
+"""
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+
+from .data_version import get_data_version
+
+
+TAXONOMY_DATA = 'taxonomy'
+
+TAXONOMY_FIELDS = (
+    'code', 'grouping', 'classification', 'specialization',
+    'definition', 'notes', 'display_name', 'section',
+)
+
+# Read-only stand-in for a NuccTaxonomy instance (same attribute names)
+TaxonomyEntry = namedtuple('TaxonomyEntry', TAXONOMY_FIELDS)
+
+
+def _contains(value, term):
+    """Case-insensitive substring match, mirroring the ORM's icontains"""
+    return bool(value) and term in value.lower()
+
+
+class TaxonomyRegistry:
+    """Immutable snapshot of nucc_taxonomy with O(1) lookup by code"""
+
+    def __init__(self, entries, version=0):
+        self.version = version
+        self.entries = tuple(sorted(entries, key=lambda entry: entry.code))
+        self._by_code = MappingProxyType({entry.code: entry for entry in self.entries})
+        self.groups = tuple(sorted({entry.grouping for entry in self.entries if entry.grouping}))
+
+    @classmethod
+    def from_database(cls, version=0):
+        """Build a registry from the current contents of the nucc_taxonomy table"""
+        from .models import NuccTaxonomy
+
+        rows = NuccTaxonomy.objects.values_list(*TAXONOMY_FIELDS)
+        return cls((TaxonomyEntry(*row) for row in rows), version)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, code):
+        return code in self._by_code
+
+    def get(self, code):
+        """Return the entry for a taxonomy code, or None if it is unknown"""
+        if not code:
+            return None
+        return self._by_code.get(code)
+
+    def codes_matching(self, term, fields=('classification', 'specialization', 'grouping')):
+        """Return the codes whose given fields contain term (case-insensitive)"""
+        term = term.lower()
+        return [
+            entry.code for entry in self.entries
+            if any(_contains(getattr(entry, field), term) for field in fields)
+        ]
+
+    def search(self, query=None, limit=20):
+        """Return up to limit entries matching query on any descriptive field or code"""
+        if not query or len(query) < 2:
+            return list(self.entries[:limit])
+
+        query = query.lower()
+        fields = ('classification', 'specialization', 'grouping', 'code')
+        matches = []
+        for entry in self.entries:
+            if any(_contains(getattr(entry, field), query) for field in fields):
+                matches.append(entry)
+                if len(matches) >= limit:
+                    break
+        return matches
+
+    def classifications(self, group=None):
+        """Return the sorted distinct classifications, optionally filtered by group"""
+        group = group.lower() if group else None
+        return sorted({
+            entry.classification for entry in self.entries
+            if entry.classification and (not group or _contains(entry.grouping, group))
+        })
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_taxonomy_registry():
+    """Return the process-wide registry, loading it on first use or after a new release"""
+    global _registry
+    version = get_data_version(TAXONOMY_DATA)
+    registry = _registry
+    if registry is None or registry.version != version:
+        with _registry_lock:
+            if _registry is None or _registry.version != version:
+                _registry = TaxonomyRegistry.from_database(version)
+            registry = _registry
+    return registry
+
+
+def reload_taxonomy_registry():
+    """Rebuild the registry from the database and swap it in atomically"""
+    global _registry
+    registry = TaxonomyRegistry.from_database(get_data_version(TAXONOMY_DATA, refresh=True))
+    with _registry_lock:
+        _registry = registry
+    return registry
+
+
+def invalidate_taxonomy_registry():
+    """Drop the cached registry so the next lookup reloads it"""
+    global _registry
+    with _registry_lock:
+        _registry = None
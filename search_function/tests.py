@@ -11,7 +11,12 @@ class ProviderSearchTestCase(TestCase):
     
     def setUp(self):
         """Set up test client"""
+        from django.core.cache import cache
+        from .response_cache import clear_response_cache
+        
         self.client = Client()
+        cache.clear()
+        clear_response_cache()
     
     def test_api_info_endpoint(self):
         """Test the main API info endpoint"""
@@ -90,6 +95,47 @@ class ProviderSearchTestCase(TestCase):
         self.assertIn('grouped_by', data)
         self.assertEqual(data['grouped_by'], 'specialty')
     
+    def test_search_grouped_by_specialty_paginates_within_group(self):
+        """Test grouped search is bounded per group and reports group totals"""
+        response = self.client.get('/api/search/?group_by_specialty=true&page_size=5')
+        self.assertEqual(response.status_code, 200)
+        
+        data = json.loads(response.content)
+        self.assertIn('groups', data)
+        for specialty_key, providers in data['grouped_results'].items():
+            self.assertLessEqual(len(providers), 5)
+            self.assertIn(specialty_key, data['groups'])
+        
+        if data['groups']:
+            specialty_key = next(iter(data['groups']))
+            response = self.client.get(
+                '/api/search/', {'group_by_specialty': 'true', 'group': specialty_key, 'page': 2}
+            )
+            data = json.loads(response.content)
+            self.assertEqual(list(data['groups']), [specialty_key])
+            self.assertEqual(data['groups'][specialty_key]['current_page'], 2)
+    
+    def test_search_grouped_by_specialty_matching_nothing(self):
+        """Test grouped search returns empty groups when the filters can match nothing"""
+        for params in ({'q': '!!!'}, {'last_name': '!!!', 'match': 'phonetic'}):
+            response = self.client.get('/api/search/', {**params, 'group_by_specialty': 'true'})
+            self.assertEqual(response.status_code, 200)
+            
+            data = json.loads(response.content)
+            self.assertEqual(data['grouped_results'], {})
+            self.assertEqual(data['groups'], {})
+            self.assertEqual(data['total_results'], 0)
+    
+    def test_search_grouped_by_specialty_lenient_paging(self):
+        """Test grouped search falls back to page 1 and a page size of at least 1"""
+        response = self.client.get('/api/search/?group_by_specialty=true&page=abc&page_size=0')
+        self.assertEqual(response.status_code, 200)
+        
+        data = json.loads(response.content)
+        self.assertEqual(data['page_size'], 1)
+        for group in data['groups'].values():
+            self.assertEqual(group['current_page'], 1)
+    
     def test_quick_search_endpoint(self):
         """Test quick search for autocomplete"""
         response = self.client.get('/api/quick-search/?q=John')
@@ -199,6 +245,47 @@ class ProviderSearchTestCase(TestCase):
         self.assertIn('pagination', data)
         self.assertEqual(data['pagination']['page_size'], 10)
     
+    def test_cursor_pagination(self):
+        """Test keyset pagination returns cursors instead of page numbers"""
+        response = self.client.get('/api/search/?cursor=&page_size=5')
+        self.assertEqual(response.status_code, 200)
+        
+        data = json.loads(response.content)
+        self.assertIn('next_cursor', data['pagination'])
+        self.assertIsNone(data['pagination']['prev_cursor'])
+        self.assertNotIn('current_page', data['pagination'])
+        
+        next_cursor = data['pagination']['next_cursor']
+        if next_cursor:
+            response = self.client.get(f'/api/search/?cursor={next_cursor}&page_size=5')
+            data = json.loads(response.content)
+            self.assertTrue(data['pagination']['has_previous'])
+    
+    def test_invalid_cursor(self):
+        """Test a malformed cursor is rejected"""
+        response = self.client.get('/api/search/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+        
+        response = self.client.get('/api/advanced-search/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+        
+        # Decodes, but its key is not (last_name, first_name, npi)
+        response = self.client.get('/api/search/?cursor=eyJrIjpbWzFdLFsyXSxbM11dLCJkIjoibmV4dCJ9')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_count_strategies(self):
+        """Test the pagination block reports which count strategy was used"""
+        for strategy in ('exact', 'estimated', 'capped'):
+            response = self.client.get(f'/api/search/?state=CA&count={strategy}')
+            self.assertEqual(response.status_code, 200)
+            
+            data = json.loads(response.content)
+            self.assertEqual(data['pagination']['count_strategy'], strategy)
+            self.assertIn('total_results', data['pagination'])
+        
+        response = self.client.get('/api/search/?count=approximate')
+        self.assertEqual(response.status_code, 400)
+    
     def test_invalid_json_post(self):
         """Test POST request with invalid JSON"""
         response = self.client.post(
@@ -211,6 +298,159 @@ class ProviderSearchTestCase(TestCase):
         data = json.loads(response.content)
         self.assertIn('error', data)
     
+    def test_batch_lookup_endpoint(self):
+        """Test batch NPI lookup reports found and not-found NPIs"""
+        response = self.client.post(
+            '/api/providers/batch/',
+            data=json.dumps({'npis': ['not-an-npi', '0000000000', '0000000000']}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        
+        data = json.loads(response.content)
+        self.assertEqual(data['requested'], 2)
+        self.assertEqual(data['found'], {})
+        self.assertEqual(data['not_found']['not-an-npi'], 'Invalid NPI')
+        self.assertEqual(data['not_found']['0000000000'], 'Individual provider not found')
+    
+    def test_batch_lookup_limit(self):
+        """Test batch NPI lookup rejects oversized and malformed requests"""
+        from django.test import override_settings
+        
+        with override_settings(BATCH_LOOKUP_MAX_NPIS=2):
+            response = self.client.post(
+                '/api/providers/batch/',
+                data=json.dumps(['1234567893', '1234567894', '1234567895']),
+                content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 400)
+        
+        response = self.client.post(
+            '/api/providers/batch/', data=json.dumps({'npis': '1234567893'}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        
+        response = self.client.get('/api/providers/batch/')
+        self.assertEqual(response.status_code, 405)
+
+    def test_export_endpoint(self):
+        """Test streaming export in CSV and gzipped NDJSON"""
+        import gzip
+        from .export import EXPORT_FIELDS
+
+        response = self.client.get('/api/export/', {'state': 'ZZ', 'format': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.strip(), ','.join(EXPORT_FIELDS))
+
+        response = self.client.get('/api/export/', {'state': 'ZZ'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), b'')
+
+        response = self.client.get('/api/export/', {'format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_radius_search(self):
+        """Test lat/lon and near_zip radius search parameters"""
+        from .models import ZipCentroid
+        
+        ZipCentroid.objects.create(zip_code='02115', latitude=42.342, longitude=-71.092)
+        
+        response = self.client.get('/api/search/', {'near_zip': '02115', 'radius_miles': '10', 'sort': 'distance'})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        for result in data['results']:
+            self.assertLessEqual(result['distance_miles'], 10)
+        
+        response = self.client.get('/api/search/', {'lat': '42.3', 'lon': '-71.1'})
+        self.assertEqual(response.status_code, 200)
+        
+        for params in ({'near_zip': '00000'}, {'lat': '42.3'}, {'lat': '95', 'lon': '0'},
+                       {'radius_miles': '10'}, {'near_zip': '02115', 'radius_miles': '-1'},
+                       {'sort': 'distance'}, {'near_zip': '02115', 'sort': 'distance', 'cursor': ''}):
+            response = self.client.get('/api/search/', params)
+            self.assertEqual(response.status_code, 400, params)
+    
+    def test_full_text_search(self):
+        """Test q= full-text search ranks matches and rejects cursor pagination"""
+        response = self.client.get('/api/search/', {'q': 'smith', 'page_size': '10'})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        for result in data['results']:
+            self.assertIn('smith', ' '.join(str(value) for value in result.values()).lower())
+        
+        response = self.client.get('/api/search/', {'q': '!!!'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['results'], [])
+        
+        response = self.client.get('/api/search/', {'q': 'smith', 'cursor': ''})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_phonetic_search(self):
+        """Test match=phonetic finds sound-alike surnames, closest spelling first"""
+        from .phonetic import edit_distance, phonetic_keys
+        
+        response = self.client.get('/api/search/', {'last_name': 'Smyth', 'match': 'phonetic'})
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.content)['results']
+        for result in results:
+            self.assertIn(phonetic_keys(result['last_name'])[0], phonetic_keys('Smyth'))
+        distances = [edit_distance('Smyth', result['last_name']) for result in results]
+        self.assertEqual(distances, sorted(distances))
+        
+        response = self.client.get('/api/search/', {'last_name': 'Smyth', 'match': 'phonetic', 'cursor': ''})
+        self.assertEqual(response.status_code, 400)
+
+    def test_phonetic_search_past_candidate_cap(self):
+        """Test phonetic matches beyond PHONETIC_MAX_CANDIDATES stay in the results and the count"""
+        from django.test import override_settings
+        from .models import ProviderSearch
+        from .phonetic import edit_distance, phonetic_keys
+
+        matches = ProviderSearch.objects.filter(last_name_phonetic__in=phonetic_keys('Smyth'))
+        if matches.count() < 2:
+            self.skipTest("needs more sound-alikes of Smyth than the cap")
+
+        with override_settings(PHONETIC_MAX_CANDIDATES=1):
+            response = self.client.get('/api/search/', {'last_name': 'Smyth', 'match': 'phonetic', 'page_size': 100})
+        data = json.loads(response.content)
+        self.assertEqual(data['pagination']['total_results'], matches.count())
+
+        # The one ranked spelling comes first, the rest after it by name
+        names = [result['last_name'] for result in data['results']]
+        ranked = [name for name in names if name == names[0]]
+        self.assertEqual(names[:len(ranked)], ranked)
+
+        response = self.client.get(
+            '/api/advanced-search/', {'last_name': 'Smyth', 'match': 'phonetic', 'state': 'CA'}
+        )
+        self.assertEqual(
+            json.loads(response.content)['pagination']['total_results'],
+            matches.filter(practice_state='CA').count()
+        )
+        distances = [edit_distance('Smyth', result['last_name']) for result in json.loads(response.content)['results']]
+        self.assertEqual(distances, sorted(distances))
+
+    def test_response_cache_normalizes_params(self):
+        """Test equivalent searches share a cached response and are counted per endpoint"""
+        response = self.client.get('/api/search/', {'last_name': 'Smith'})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        
+        response = self.client.get('/api/search/', {'last_name': ' SMITH '})
+        self.assertEqual(response['X-Cache'], 'HIT-LOCAL')
+        data = json.loads(response.content)
+        self.assertEqual(data['search_params']['last_name'], ' SMITH ')
+        
+        # Cursors are opaque and must not be case-folded
+        response = self.client.get('/api/search/', {'last_name': 'smith', 'cursor': 'AbC'})
+        self.assertNotEqual(response.get('X-Cache'), 'HIT-LOCAL')
+        
+        response = self.client.get('/api/cache-stats/')
+        stats = json.loads(response.content)['endpoints']['search']
+        self.assertEqual(stats['local_hits'], 1)
+        self.assertEqual(stats['misses'], 2)
+    
     def test_health_check_endpoint(self):
         """Test database health check endpoint"""
         response = self.client.get('/api/health/')
@@ -271,6 +511,38 @@ class DatabaseConnectionTestCase(TestCase):
         except Exception as e:
             self.fail(f"Provider model field access failed: {e}")
     
+    def test_provider_search_projection_matches_providers(self):
+        """Test provider_search rows carry the same display values as providers"""
+        from .models import ProviderSearch
+    
+        for row in ProviderSearch.objects.order_by('npi')[:50]:
+            provider = Provider.objects.get(npi=row.npi)
+            self.assertEqual(provider.entity_type_code, '1')
+            self.assertEqual(row.full_name, provider.full_name)
+            self.assertEqual(row.full_address, provider.full_address)
+            self.assertEqual(row.last_name_lower, (provider.last_name or '').lower())
+            self.assertEqual(row.zip5, (provider.practice_postal_code or '')[:5] or None)
+
+    def test_provider_search_state_partition(self):
+        """Test a state search reads one partition and a state refresh keeps its rows"""
+        from django.db import transaction
+        from .ingest import build_provider_search_partition, swap_provider_search_partition
+        from .models import ProviderSearch
+
+        state = ProviderSearch.objects.filter(practice_state='CA')
+        plan = state.order_by('last_name', 'first_name', 'npi')[:20].explain()
+        self.assertIn('provider_search_ca', plan)
+        self.assertNotIn('provider_search_tx', plan)
+        self.assertNotIn('provider_search_default', plan)
+
+        npis = sorted(state.values_list('npi', flat=True))
+        with connection.cursor() as cursor:
+            rows = build_provider_search_partition(cursor, 'ca')
+            with transaction.atomic():
+                swap_provider_search_partition(cursor, 'ca')
+        self.assertEqual(rows, len(npis))
+        self.assertEqual(sorted(state.values_list('npi', flat=True)), npis)
+
     def test_taxonomy_model_fields(self):
         """Test that NuccTaxonomy model can access database fields"""
         try:
@@ -286,6 +558,55 @@ class DatabaseConnectionTestCase(TestCase):
         except Exception as e:
             self.fail(f"Taxonomy model field access failed: {e}")
 
+    def test_prepared_statements_only_inside_block(self):
+        """Test only statements run inside prepared_statements() are prepared"""
+        from .prepared import prepared_statements, preparing_cursor_class
+
+        connection.ensure_connection()
+        raw = connection.connection
+        original = raw.cursor_factory, raw.prepare_threshold
+        raw.cursor_factory, raw.prepare_threshold = preparing_cursor_class(), 2 ** 31 - 1
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT %s::int", [1])
+                with prepared_statements():
+                    cursor.execute("SELECT %s::int + 1", [1])
+                    self.assertEqual(cursor.fetchone()[0], 2)
+                cursor.execute("SELECT statement FROM pg_prepared_statements")
+                statements = [row[0] for row in cursor.fetchall()]
+                cursor.execute("DEALLOCATE ALL")
+        finally:
+            raw.cursor_factory, raw.prepare_threshold = original
+
+        self.assertEqual(statements, ["SELECT $1::int + 1"])
+
+    def test_only_first_offset_page_prepared(self):
+        """Test later OFFSET pages, each its own statement, are not prepared"""
+        from .counts import ResultCount
+        from .models import ProviderSearch
+        from .pagination import CountedPaginator
+        from .prepared import preparing_cursor_class
+
+        queryset = ProviderSearch.objects.order_by('last_name', 'first_name', 'npi').values_list('npi')
+        paginator = CountedPaginator(queryset, 2, ResultCount(10, 'exact', True, '10'))
+        connection.ensure_connection()
+        raw = connection.connection
+        original = raw.cursor_factory, raw.prepare_threshold
+        raw.cursor_factory, raw.prepare_threshold = preparing_cursor_class(), 2 ** 31 - 1
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("DEALLOCATE ALL")
+                paginator.page(1)
+                paginator.page(2)
+                cursor.execute("SELECT statement FROM pg_prepared_statements")
+                statements = [row[0] for row in cursor.fetchall()]
+                cursor.execute("DEALLOCATE ALL")
+        finally:
+            raw.cursor_factory, raw.prepare_threshold = original
+
+        self.assertEqual(len(statements), 1)
+        self.assertNotIn('OFFSET', statements[0])
+
 
 class SearchServiceTestCase(TestCase):
     """Test the ProviderSearchService utility functions"""
@@ -318,4 +639,822 @@ class SearchServiceTestCase(TestCase):
         self.assertFalse(ProviderSearchService.is_zip_code("1234"))
         self.assertFalse(ProviderSearchService.is_zip_code("123456"))
         self.assertFalse(ProviderSearchService.is_zip_code("abcde"))
-        self.assertFalse(ProviderSearchService.is_zip_code(""))
\ No newline at end of file
+        self.assertFalse(ProviderSearchService.is_zip_code(""))
+    
+    def test_bounding_box_contains_radius(self):
+        """Test the prefilter box contains every point within the radius"""
+        import math
+        from .geo import EARTH_RADIUS_MILES, bounding_box
+        
+        latitude, longitude, radius = 61.2, -149.9, 50
+        min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius)
+        for bearing in range(0, 360, 15):
+            # Destination point at exactly radius miles along the bearing
+            angle, theta = radius / EARTH_RADIUS_MILES, math.radians(bearing)
+            lat1, lon1 = math.radians(latitude), math.radians(longitude)
+            lat2 = math.asin(math.sin(lat1) * math.cos(angle) + math.cos(lat1) * math.sin(angle) * math.cos(theta))
+            lon2 = lon1 + math.atan2(math.sin(theta) * math.sin(angle) * math.cos(lat1),
+                                     math.cos(angle) - math.sin(lat1) * math.sin(lat2))
+            self.assertTrue(min_lat <= math.degrees(lat2) <= max_lat)
+            self.assertTrue(min_lon <= math.degrees(lon2) <= max_lon)
+    
+    def test_lru_cache_bounds(self):
+        """Test the in-process response cache evicts by size and expires by TTL"""
+        from unittest import mock
+        from .response_cache import LRUCache
+        
+        lru = LRUCache(max_entries=2, ttl=10)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('a'), 1)
+        
+        with mock.patch('search_function.response_cache.time.monotonic', return_value=10 ** 9):
+            self.assertIsNone(lru.get('a'))
+    
+    def test_canonical_params(self):
+        """Test equivalent searches normalize to the same parameters"""
+        from .views import ProviderSearchService
+        
+        keys = ProviderSearchService.FILTER_PARAMS
+        self.assertEqual(
+            ProviderSearchService.canonical_params({'last_name': ' SMITH ', 'page': '3'}, keys),
+            ProviderSearchService.canonical_params({'last_name': 'smith'}, keys)
+        )
+    
+    def test_full_text_query(self):
+        """Test free text becomes a prefix-matching tsquery"""
+        from .views import ProviderSearchService
+        
+        self.assertEqual(ProviderSearchService.full_text_query(' John  CARDIO-logy '), 'john:* & cardio:* & logy:*')
+        self.assertEqual(ProviderSearchService.full_text_query("o'brien & | !"), 'o:* & brien:*')
+        self.assertEqual(ProviderSearchService.full_text_query('--'), '')
+    
+    def test_cursor_round_trip(self):
+        """Test cursor tokens encode and decode the sort key"""
+        from .pagination import encode_cursor, decode_cursor, InvalidCursor
+        
+        token = encode_cursor(('Smith', 'John', '1234567890'), 'prev')
+        self.assertEqual(decode_cursor(token), (('Smith', 'John', '1234567890'), 'prev'))
+        
+        self.assertEqual(decode_cursor(encode_cursor((None, 'Jo', 1234567890))), ((None, 'Jo', '1234567890'), 'next'))
+        
+        with self.assertRaises(InvalidCursor):
+            decode_cursor('garbage')
+        for key in ([[1], [2], [3]], ['Smith', 'John'], ['Smith', 'John', '1', '2'], ['Smith', 5, '1'], ['Smith', 'John', None]):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(encode_cursor(key))
+
+    def test_row_serializer(self):
+        """Test serializers map row positions to keys and encode like JsonResponse"""
+        from unittest import mock
+        from django.http import QueryDict
+        from . import serializers
+
+        serializer = serializers.RowSerializer(
+            {'last': 'last_name', 'miles': 'distance_miles'},
+            constants={'kind': 'Individual'},
+            optional={'group': 'taxonomy_grouping'},
+            converters={'miles': lambda miles: miles or 0},
+        )
+        self.assertEqual(serializer.columns, ('npi', 'last_name', 'distance_miles', 'taxonomy_grouping'))
+        self.assertEqual(
+            serializer(('1', 'Smith', None, 'Nursing')),
+            {'kind': 'Individual', 'last': 'Smith', 'miles': 0, 'group': 'Nursing'}
+        )
+        self.assertNotIn('group', serializer(('1', 'Smith', 1.5, None)))
+
+        data = {'params': QueryDict('name=a&name=b'), 'count': 2}
+        expected = {'params': {'name': 'b'}, 'count': 2}
+        self.assertEqual(json.loads(serializers.dumps(data)), expected)
+        with mock.patch.object(serializers, 'orjson', None):
+            self.assertEqual(json.loads(serializers.dumps(data)), expected)
+
+    def test_estimated_count(self):
+        """Test the planner estimate is read from either shape of EXPLAIN JSON output"""
+        from unittest import mock
+        from .counts import estimated_count
+        from .models import ProviderSearch
+
+        queryset = ProviderSearch.objects.filter(practice_state='CA')
+        count = estimated_count(queryset)
+        self.assertGreaterEqual(count.total, 0)
+        self.assertEqual(count.display, f"~{count.total:,}")
+        self.assertFalse(count.is_exact)
+
+        plan = {'Plan': {'Node Type': 'Seq Scan', 'Plan Rows': 1234}}
+        for output in (json.dumps([plan]), json.dumps(plan)):
+            with mock.patch.object(type(queryset), 'explain', return_value=output):
+                self.assertEqual(estimated_count(queryset).total, 1234)
+
+
+class ManagementCommandTestCase(TestCase):
+    """Test the search_function management commands"""
+    
+    def test_check_search_indexes_command(self):
+        """Test that the index report runs and lists every expected index"""
+        from io import StringIO
+        from django.core.management import call_command
+        from .management.commands.check_search_indexes import EXPECTED_INDEXES
+        
+        out = StringIO()
+        call_command('check_search_indexes', stdout=out)
+        output = out.getvalue()
+        
+        self.assertIn('CHECKING SEARCH INDEXES', output)
+        for name, _ in EXPECTED_INDEXES:
+            self.assertIn(name, output)
+
+
+class TaxonomyRegistryTestCase(TestCase):
+    """Test the in-memory NUCC taxonomy registry"""
+    
+    def setUp(self):
+        from .taxonomy import TaxonomyRegistry, TaxonomyEntry
+        
+        def entry(code, grouping, classification, specialization=None):
+            return TaxonomyEntry(code, grouping, classification, specialization,
+                                 None, None, None, 'Individual')
+        
+        self.registry = TaxonomyRegistry([
+            entry('207RC0000X', 'Allopathic & Osteopathic Physicians', 'Internal Medicine', 'Cardiovascular Disease'),
+            entry('207Q00000X', 'Allopathic & Osteopathic Physicians', 'Family Medicine'),
+            entry('1223G0001X', 'Dental Providers', 'Dentist', 'General Practice'),
+        ])
+    
+    def test_lookup_by_code(self):
+        """Test O(1) lookup by taxonomy code"""
+        self.assertEqual(self.registry.get('207Q00000X').classification, 'Family Medicine')
+        self.assertIsNone(self.registry.get('UNKNOWN'))
+        self.assertIsNone(self.registry.get(None))
+        self.assertIn('1223G0001X', self.registry)
+    
+    def test_codes_matching_is_case_insensitive(self):
+        """Test specialty matching mirrors icontains"""
+        self.assertEqual(self.registry.codes_matching('CARDIO'), ['207RC0000X'])
+        self.assertEqual(
+            self.registry.codes_matching('physicians', fields=('grouping',)),
+            ['207Q00000X', '207RC0000X']
+        )
+    
+    def test_groups_and_classifications(self):
+        """Test distinct groups and classifications are sorted"""
+        self.assertEqual(
+            list(self.registry.groups),
+            ['Allopathic & Osteopathic Physicians', 'Dental Providers']
+        )
+        self.assertEqual(
+            self.registry.classifications('dental'), ['Dentist']
+        )
+    
+    def test_search_limit(self):
+        """Test suggestion search honours the limit"""
+        self.assertEqual(len(self.registry.search(None, limit=2)), 2)
+        self.assertEqual([e.code for e in self.registry.search('dent')], ['1223G0001X'])
+    
+    def test_search_page_has_no_per_row_taxonomy_queries(self):
+        """Test a search page does not issue one taxonomy query per row"""
+        from django.test.utils import CaptureQueriesContext
+        from .taxonomy import reload_taxonomy_registry
+        
+        reload_taxonomy_registry()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/search/?page_size=100')
+        self.assertEqual(response.status_code, 200)
+        # At most: data version check, COUNT(*) and the page itself
+        self.assertLessEqual(len(queries), 3)
+
+
+class IngestTestCase(TestCase):
+    """Test NPPES file parsing used by the ingestion commands"""
+    
+    def write_nppes_file(self, rows):
+        import csv
+        import os
+        import tempfile
+        from .ingest import NPPES_COLUMNS
+        
+        header = [name for _field, name in NPPES_COLUMNS]
+        header += ['Healthcare Provider Taxonomy Code_1', 'Healthcare Provider Primary Taxonomy Switch_1',
+                   'Healthcare Provider Taxonomy Code_2', 'Healthcare Provider Primary Taxonomy Switch_2']
+        handle = tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', delete=False)
+        with handle:
+            writer = csv.writer(handle)
+            writer.writerow(header)
+            writer.writerows(rows)
+        self.addCleanup(os.unlink, handle.name)
+        return handle.name
+    
+    def test_iter_provider_rows_projects_columns(self):
+        """Test NPPES records are projected onto the Provider columns"""
+        from .ingest import PROVIDER_FIELDS, iter_provider_rows
+        
+        path = self.write_nppes_file([
+            ['1234567893', '1', '', 'SMITH', 'JOHN', '', '1 MAIN ST', '', 'BOSTON', 'MA',
+             '021151234', '6175550100', '207Q00000X', 'N', '207RC0000X', 'Y'],
+            ['1234567894', '1', '', 'JONES', 'MARY', '', '2 KING ST', '', 'TORONTO', 'ONTARIO',
+             'M5V', '', '363L00000X', 'X', '', ''],
+        ])
+        rows = [dict(zip(PROVIDER_FIELDS, row)) for row in iter_provider_rows(path)]
+        
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['last_name'], 'SMITH')
+        self.assertIsNone(rows[0]['middle_name'])
+        # The taxonomy flagged 'Y' wins over the first one listed
+        self.assertEqual(rows[0]['primary_taxonomy_code'], '207RC0000X')
+        self.assertEqual((rows[0]['first_name_phonetic'], rows[0]['last_name_phonetic']), ('JN', 'SM0'))
+        # Without a 'Y' flag the first taxonomy is used
+        self.assertEqual(rows[1]['primary_taxonomy_code'], '363L00000X')
+        self.assertIsNone(rows[1]['practice_state'])
+    
+    def test_iter_provider_rows_rejects_other_files(self):
+        """Test a CSV without the NPPES columns is rejected"""
+        import tempfile
+        from .ingest import iter_provider_rows
+        
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as handle:
+            handle.write('Code,Grouping\n')
+            handle.flush()
+            with self.assertRaises(ValueError):
+                list(iter_provider_rows(handle.name))
+    
+    def test_iter_zip_centroid_rows_reads_gazetteer(self):
+        """Test ZIP centroids are read from a tab-delimited Gazetteer ZCTA file"""
+        import tempfile
+        from .ingest import iter_zip_centroid_rows
+        
+        with tempfile.NamedTemporaryFile('w', suffix='.txt') as handle:
+            handle.write('GEOID\tALAND\tINTPTLAT\tINTPTLONG      \n'
+                         '02115\t1\t42.342\t-71.092\n'
+                         '2116\t1\t42.350\t-71.077\n'
+                         '02115\t1\t0\t0\n'
+                         '99999\t1\t\t\n')
+            handle.flush()
+            rows = list(iter_zip_centroid_rows(handle.name))
+        
+        self.assertEqual(rows, [('02115', 42.342, -71.092), ('02116', 42.35, -71.077)])
+    
+    def test_iter_deactivated_npis_skips_header_rows(self):
+        """Test only NPI rows are read from a deactivation report"""
+        import tempfile
+        from .ingest import iter_deactivated_npis
+        
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as handle:
+            handle.write('NPPES Deactivated NPI Report\nNPI,NPPES Deactivation Date\n'
+                         '1234567893,01/05/2026\n1234567894,01/06/2026\n')
+            handle.flush()
+            self.assertEqual(list(iter_deactivated_npis(handle.name)), ['1234567893', '1234567894'])
+    
+    def test_shipped_nucc_release_parses(self):
+        """Test the NUCC CSV shipped with the project can be loaded"""
+        from django.conf import settings
+        from .ingest import iter_taxonomy_rows, taxonomy_release_version
+        
+        path = settings.BASE_DIR / 'nucc_taxonomy_251.csv'
+        self.assertEqual(taxonomy_release_version(str(path)), '25.1')
+        
+        rows = {row[0]: row for row in iter_taxonomy_rows(path)}
+        self.assertGreater(len(rows), 800)
+        self.assertEqual(rows['193200000X'][2], 'Multi-Specialty')
+        self.assertIsNone(rows['193200000X'][3])
+
+    def test_synthetic_provider_rows_are_deterministic(self):
+        """Test the synthetic dataset is repeatable and uses valid NPIs and NUCC codes"""
+        from .ingest import PROVIDER_FIELDS, iter_taxonomy_rows
+        from .synthetic import DEFAULT_TAXONOMY_PATH, iter_synthetic_provider_rows, npi_check_digit
+
+        rows = list(iter_synthetic_provider_rows(500, seed=7))
+        self.assertEqual(rows, list(iter_synthetic_provider_rows(500, seed=7)))
+        self.assertNotEqual(rows, list(iter_synthetic_provider_rows(500, seed=8)))
+
+        self.assertEqual(npi_check_digit('123456789'), '3')
+        codes = {row[0] for row in iter_taxonomy_rows(DEFAULT_TAXONOMY_PATH)}
+        providers = [dict(zip(PROVIDER_FIELDS, row)) for row in rows]
+        self.assertEqual(len({provider['npi'] for provider in providers}), 500)
+        for provider in providers:
+            self.assertEqual(len(provider), len(PROVIDER_FIELDS))
+            self.assertEqual(provider['npi'][9], npi_check_digit(provider['npi'][:9]))
+            self.assertIn(provider['primary_taxonomy_code'], codes | {None})
+            self.assertEqual(provider['last_name'] is None, provider['entity_type_code'] == '2')
+
+
+class PhoneticTestCase(TestCase):
+    """Test cases for phonetic name keys"""
+    
+    def test_sound_alike_names_share_keys(self):
+        """Test common misspellings map to the same Double Metaphone key"""
+        from .phonetic import double_metaphone
+        
+        for name, misspelling in [('Smith', 'Smyth'), ('Katz', 'Kats'), ('Phillips', 'Philips'),
+                                  ('Catherine', 'Kathryn'), ('Knight', 'Night')]:
+            self.assertEqual(double_metaphone(name)[0], double_metaphone(misspelling)[0], name)
+        
+        # Schmidt's alternate pronunciation matches Smith's
+        self.assertEqual(double_metaphone('Schmidt'), ('XMT', 'SMT'))
+        self.assertEqual(double_metaphone('Smith'), ('SM0', 'XMT'))
+        self.assertEqual(double_metaphone("O'Brien-2"), double_metaphone('OBrien'))
+        self.assertEqual(double_metaphone(None), ('', ''))
+    
+    def test_edit_distance(self):
+        """Test Levenshtein distance is case-insensitive"""
+        from .phonetic import edit_distance
+        
+        self.assertEqual(edit_distance('kitten', 'sitting'), 3)
+        self.assertEqual(edit_distance('SMITH', 'smyth'), 1)
+        self.assertEqual(edit_distance('', 'abc'), 3)
+        self.assertEqual(edit_distance(None, None), 0)
+
+
+class AutocompleteIndexTestCase(TestCase):
+    """Test the in-memory prefix index behind quick search"""
+    
+    def setUp(self):
+        from .autocomplete import PrefixIndex
+        
+        rows = [
+            # key, weight, npi, first, middle, last, city, state, taxonomy
+            ('john smith', 40, '1000000001', 'JOHN', None, 'SMITH', 'BOSTON', 'MA', '207Q00000X'),
+            ('smialek anna', 2, '1000000002', 'ANNA', None, 'SMIALEK', 'AUSTIN', 'TX', None),
+            ('smith jane', 25, '1000000003', 'JANE', 'Q', 'SMITH', 'DENVER', 'CO', None),
+            ('smith john', 40, '1000000001', 'JOHN', None, 'SMITH', 'BOSTON', 'MA', '207Q00000X'),
+        ]
+        self.index = PrefixIndex.from_rows(rows, version=3)
+    
+    def test_short_prefix_ranked_by_popularity(self):
+        """Test precomputed short prefixes return the most common names first"""
+        keys = [entry['key'] for entry in self.index.lookup('sm')]
+        self.assertEqual(keys, ['smith john', 'smith jane', 'smialek anna'])
+    
+    def test_long_prefix_and_normalization(self):
+        """Test longer prefixes and punctuation/case normalization"""
+        entries = self.index.lookup('Smith, Ja')
+        self.assertEqual([entry['key'] for entry in entries], ['smith jane'])
+        self.assertEqual(entries[0]['npi'], '1000000003')
+        self.assertEqual(entries[0]['middle_name'], 'Q')
+        
+        self.assertEqual([entry['key'] for entry in self.index.lookup('john s')], ['john smith'])
+        self.assertEqual(self.index.lookup('zz'), [])
+        self.assertEqual(self.index.lookup('s'), [])
+    
+    def test_snapshot_round_trip(self):
+        """Test an index saved to a snapshot loads back identically"""
+        import os
+        import tempfile
+        from .autocomplete import PrefixIndex
+        
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'autocomplete.idx')
+            self.index.save(path)
+            loaded = PrefixIndex.load(path)
+        
+        self.assertEqual(loaded.version, 3)
+        self.assertEqual(len(loaded), len(self.index))
+        for query in ('sm', 'smith', 'john smith'):
+            self.assertEqual(loaded.lookup(query), self.index.lookup(query))
+
+    def test_index_rebuilt_in_background_after_data_version_moves(self):
+        """Test requests keep the previous index while a newer one loads off the request path"""
+        from unittest import mock
+        from . import autocomplete
+        from .autocomplete import PrefixIndex
+        from .data_version import get_data_version
+
+        version = get_data_version(refresh=True)
+        previous = PrefixIndex.from_rows([], version=version - 1)
+        current = PrefixIndex.from_rows([], version=version)
+        with mock.patch.object(autocomplete, '_index', previous), \
+                mock.patch.object(autocomplete, 'load_autocomplete_index', return_value=current) as load:
+            self.assertIs(autocomplete.get_autocomplete_index(), previous)
+            autocomplete._loader.join()
+            self.assertIs(autocomplete.get_autocomplete_index(), current)
+            self.assertIs(autocomplete.get_autocomplete_index(), current)
+        self.assertEqual(load.call_count, 1)
+
+    def test_quick_search_while_index_loads(self):
+        """Test quick search answers from the database until the first load finishes"""
+        from unittest import mock
+        from . import autocomplete
+        from .views import quick_search_suggestions
+
+        with mock.patch.object(autocomplete, '_index', None), \
+                mock.patch.object(autocomplete, 'start_autocomplete_index_load') as start:
+            suggestions = quick_search_suggestions('jo')
+        start.assert_called_once_with()
+        self.assertLessEqual(len(suggestions), 10)
+        for suggestion in suggestions:
+            self.assertEqual(suggestion['type'], 'Individual')
+
+    def test_refresh_rewrites_snapshot(self):
+        """Test ingestion's refresh writes a snapshot stamped with the current data version"""
+        import os
+        import tempfile
+        from .autocomplete import PrefixIndex, refresh_autocomplete_index
+        from .data_version import get_data_version
+
+        with self.settings(AUTOCOMPLETE_INDEX_PATH=None):
+            self.assertIsNone(refresh_autocomplete_index())
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'autocomplete.idx')
+            with self.settings(AUTOCOMPLETE_INDEX_PATH=path):
+                entries, version = refresh_autocomplete_index()
+            loaded = PrefixIndex.load(path)
+        self.assertEqual((len(loaded), loaded.version), (entries, version))
+        self.assertEqual(version, get_data_version())
+
+
+class NpiSnapshotTestCase(TestCase):
+    """Test the memory-mapped NPI snapshot behind detail and batch lookups"""
+
+    rows = [
+        # npi, first, middle, last, organization, line1, line2, city, state, postal code, phone, taxonomy
+        ('1000000001', 'JOHN', None, 'SMITH', None, '1 MAIN ST', None, 'BOSTON', 'MA', '02101', '6175550100', None),
+        ('1000000003', 'JOSÉ', 'Q', 'GARCÍA', None, '2 ELM ST', 'STE 5', 'AUSTIN', 'TX', '73301', '', None),
+    ]
+
+    def setUp(self):
+        import tempfile
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f"{directory.name}/npi.snapshot"
+
+    def test_snapshot_round_trip(self):
+        """Test a written snapshot maps back with the same providers and misses unknown NPIs"""
+        from .npi_snapshot import NpiSnapshot, write_snapshot
+
+        self.assertEqual(write_snapshot(self.path, self.rows, 7), 2)
+        snapshot = NpiSnapshot.open(self.path)
+
+        self.assertEqual((snapshot.version, len(snapshot)), (7, 2))
+        provider = snapshot.get('1000000003')
+        self.assertEqual(provider.full_name, 'JOSÉ Q GARCÍA')
+        self.assertEqual(provider.full_address, '2 ELM ST, STE 5, AUSTIN, TX, 73301')
+        self.assertEqual(provider.practice_phone, '')
+        self.assertIsNone(snapshot.get('1000000002'))
+        self.assertIsNone(snapshot.get('100000000x'))
+        self.assertEqual(list(snapshot.get_many(['1000000001', '0000000000'])), ['1000000001'])
+
+        with self.assertRaises(ValueError):
+            write_snapshot(self.path, list(reversed(self.rows)), 7)
+
+    def test_detail_served_from_current_snapshot(self):
+        """Test detail lookups read a snapshot at the current data version and ignore a stale one"""
+        from django.test import override_settings
+        from django.test.utils import CaptureQueriesContext
+        from .data_version import get_data_version
+        from .npi_snapshot import get_npi_snapshot, write_snapshot
+
+        version = get_data_version(refresh=True)
+        with override_settings(NPI_SNAPSHOT_PATH=self.path, RESPONSE_CACHE_TIMEOUT=0):
+            write_snapshot(self.path, self.rows[:1], version - 1)
+            self.assertIsNone(get_npi_snapshot())
+
+            write_snapshot(self.path, self.rows, version)
+            self.assertEqual(get_npi_snapshot().version, version)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/api/provider/1000000003/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.content)['full_name'], 'JOSÉ Q GARCÍA')
+            self.assertFalse([query for query in queries if 'providers' in query['sql']])
+
+
+    def test_patch_replaces_only_changed_npis(self):
+        """Test a delta patch re-reads the changed NPIs and copies every other record"""
+        from django.test import override_settings
+        from .data_version import bump_data_version
+        from .npi_snapshot import NpiSnapshot, patch_npi_snapshot, write_snapshot
+
+        provider = Provider.objects.filter(entity_type_code='1').exclude(
+            npi__in=[row[0] for row in self.rows]
+        ).order_by('npi').first()
+        if provider is None:
+            self.skipTest("No individual providers in the test database")
+        # Deactivated since the snapshot was written
+        removed = ('0999999999', 'GONE', *self.rows[0][2:])
+        rows = sorted([removed, self.rows[0], (provider.npi, 'STALE', *self.rows[0][2:])])
+        with override_settings(NPI_SNAPSHOT_PATH=self.path):
+            write_snapshot(self.path, rows, bump_data_version())
+            version = bump_data_version()
+            self.assertEqual(patch_npi_snapshot({provider.npi, removed[0]}), (2, version))
+
+        snapshot = NpiSnapshot.open(self.path)
+        self.assertEqual(snapshot.version, version)
+        self.assertEqual(snapshot.get(provider.npi).first_name, provider.first_name)
+        self.assertEqual(snapshot.get('1000000001').first_name, 'JOHN')
+        self.assertIsNone(snapshot.get(removed[0]))
+
+class ProviderStatsTestCase(TestCase):
+    """Test the precomputed provider stats snapshot"""
+    
+    def test_snapshot_reads(self):
+        """Test totals, states and cities are served from the snapshot rows"""
+        from .models import ProviderStats
+        from .stats import ProviderStatsSnapshot
+        
+        snapshot = ProviderStatsSnapshot([
+            ProviderStats(state=ProviderStats.ALL, individual_providers=5, cities=['AUSTIN', 'BOSTON', 'DALLAS']),
+            ProviderStats(state='TX', individual_providers=3, cities=['AUSTIN', 'DALLAS']),
+            ProviderStats(state='MA', individual_providers=2, cities=['BOSTON']),
+        ])
+        
+        self.assertEqual(snapshot.total_individual_providers, 5)
+        self.assertEqual(snapshot.states, ('MA', 'TX'))
+        self.assertEqual(snapshot.cities('tx'), ['AUSTIN', 'DALLAS'])
+        self.assertEqual(snapshot.cities(limit=2), ['AUSTIN', 'BOSTON'])
+        self.assertEqual(snapshot.cities('ZZ'), [])
+    
+    def test_refresh_command(self):
+        """Test the refresh stores a total row matching a live count"""
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import ProviderStats
+        from .stats import get_provider_stats
+        
+        call_command('refresh_provider_stats', stdout=StringIO())
+        
+        total = ProviderStats.objects.get(state=ProviderStats.ALL)
+        self.assertEqual(total.individual_providers, Provider.objects.filter(entity_type_code='1').count())
+        self.assertEqual(get_provider_stats().total_individual_providers, total.individual_providers)
+
+    
+    def test_empty_table_not_computed_per_worker(self):
+        """Test an unrefreshed provider_stats serves empty stats instead of scanning providers"""
+        from .models import ProviderStats
+        from .stats import ProviderStatsSnapshot
+        
+        ProviderStats.objects.all().delete()
+        with self.assertNumQueries(1), self.assertLogs('search_function.stats', 'WARNING'):
+            snapshot = ProviderStatsSnapshot.from_database()
+        self.assertEqual((snapshot.total_individual_providers, snapshot.states), (0, ()))
+    
+    def test_suggestions_cached_per_stats_version(self):
+        """Test cached states and cities responses are dropped by a stats-only refresh"""
+        from django.core.cache import cache
+        from .response_cache import clear_response_cache
+        from .stats import refresh_provider_stats
+        
+        cache.clear()
+        clear_response_cache()
+        for url in ('/api/states/', '/api/cities/?state=CA'):
+            self.client.get(url)
+            self.assertEqual(self.client.get(url)['X-Cache'], 'HIT-LOCAL')
+            refresh_provider_stats()
+            self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+    
+    def test_api_info_without_database(self):
+        """Test the API index still answers when the stats cannot be read"""
+        from unittest import mock
+        from django.db import DatabaseError
+        
+        with mock.patch('provider_lookup.urls.get_provider_stats', side_effect=DatabaseError):
+            response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['total_individual_providers'], 'unavailable')
+    
+    def test_state_refresh_matches_full_refresh(self):
+        """Test refreshing only some states leaves the same rows as a full refresh"""
+        from .models import ProviderStats
+        from .stats import compute_provider_stats, refresh_provider_stats
+        
+        def stored():
+            return {row.state: (row.individual_providers, row.cities) for row in ProviderStats.objects.all()}
+        
+        refresh_provider_stats()
+        states = sorted(state for state in stored() if state != ProviderStats.ALL)
+        if not states:
+            self.skipTest("No providers with a practice state in the test database")
+        
+        # Remove some of one state's providers, as a deactivation report would
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT npi FROM provider_search WHERE practice_state = %s ORDER BY npi LIMIT 10", [states[0]]
+            )
+            npis = [npi for npi, in cursor.fetchall()]
+            cursor.execute("DELETE FROM providers WHERE npi = ANY(%s)", [npis])
+            cursor.execute("DELETE FROM provider_search WHERE npi = ANY(%s)", [npis])
+        
+        refresh_provider_stats({states[0], 'ZZ'})
+        full = {row.state: (row.individual_providers, row.cities) for row in compute_provider_stats()}
+        self.assertEqual(stored(), full)
+        
+        # A state without a row of its own needs the full scan
+        ProviderStats.objects.filter(state=ProviderStats.ALL).update(individual_providers=0)
+        refresh_provider_stats({None})
+        self.assertEqual(stored(), full)
+
+class AsyncViewsTestCase(TestCase):
+    """Test the async views return what the sync views return"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from .response_cache import clear_response_cache
+        
+        cache.clear()
+        clear_response_cache()
+    
+    async def compare(self, async_view, sync_view, path, **kwargs):
+        from asgiref.sync import sync_to_async
+        from django.core.cache import cache
+        from django.test import AsyncRequestFactory, RequestFactory
+        from .response_cache import clear_response_cache
+        
+        async_response = await async_view(AsyncRequestFactory().get(path), **kwargs)
+        await sync_to_async(cache.clear)()
+        clear_response_cache()
+        sync_response = await sync_to_async(sync_view)(RequestFactory().get(path), **kwargs)
+        
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        self.assertEqual(json.loads(async_response.content), json.loads(sync_response.content))
+        return json.loads(async_response.content)
+    
+    async def test_search_matches_sync_view(self):
+        """Test page, cursor and grouped searches through the async view"""
+        from . import async_views, views
+        
+        data = await self.compare(
+            async_views.search_providers_view, views.search_providers_view,
+            '/api/search/?last_name=smith&page=2&count=exact'
+        )
+        self.assertIn('total_results', data['pagination'])
+        await self.compare(
+            async_views.search_providers_view, views.search_providers_view,
+            '/api/search/?cursor=&count=capped'
+        )
+        await self.compare(
+            async_views.search_providers_view, views.search_providers_view,
+            '/api/search/?group_by_specialty=true&page_size=2'
+        )
+        await self.compare(
+            async_views.search_providers_view, views.search_providers_view, '/api/search/?cursor=bogus'
+        )
+    
+    async def test_other_views_match_sync_views(self):
+        """Test advanced search, quick search and detail through the async views"""
+        from unittest import mock
+        from . import async_views, autocomplete, views
+        from .autocomplete import PrefixIndex
+        
+        await self.compare(
+            async_views.advanced_search_view, views.advanced_search_view,
+            '/api/advanced-search/?state=CA&page=999'
+        )
+        with mock.patch.object(autocomplete, '_index', PrefixIndex.from_rows([], version=2 ** 31)):
+            await self.compare(async_views.quick_search_view, views.quick_search_view, '/api/quick-search/?q=jo')
+        await self.compare(
+            async_views.provider_detail_view, views.provider_detail_view, '/api/provider/0000000000/',
+            npi='0000000000'
+        )
+
+
+class ProfilingTestCase(TestCase):
+    """Test per-request SQL profiling and query budgets"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from .response_cache import clear_response_cache
+        
+        cache.clear()
+        clear_response_cache()
+    
+    def test_staff_inline_profile(self):
+        """Test ?_profile=1 adds statements and EXPLAIN for staff only"""
+        from django.contrib.auth.models import User
+        
+        response = self.client.get('/api/search/', {'last_name': 'smith', '_profile': '1'})
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertNotIn('_profile', json.loads(response.content))
+        
+        staff = User.objects.create_user('staff', password='x', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get('/api/search/', {'_profile': '1'})
+        self.assertNotIn('X-Cache', response)
+        profile = json.loads(response.content)['_profile']
+        self.assertEqual(profile['view'], 'search_function:search')
+        self.assertEqual(profile['query_budget'], 4)
+        self.assertEqual(profile['query_count'], len(profile['queries']))
+        self.assertTrue(profile['explain'])
+    
+    def test_query_budget_exceeded(self):
+        """Test a view running more statements than its budget is logged and flagged"""
+        from django.contrib.auth.models import AnonymousUser
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from django.urls import ResolverMatch
+        from .profiling import SQLProfilingMiddleware, query_budget
+        
+        @query_budget(1)
+        def view(request):
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.execute("SELECT 2")
+            return HttpResponse()
+        
+        request = RequestFactory().get('/budget/')
+        request.user = AnonymousUser()
+        request.resolver_match = ResolverMatch(view, (), {}, url_name='budget')
+        with self.assertLogs('search_function.profiling', 'WARNING'):
+            response = SQLProfilingMiddleware(view)(request)
+        self.assertEqual(response['X-Query-Budget'], 'exceeded (2/1)')
+    
+    def test_streaming_response_profiled_until_closed(self):
+        """Test statements run while a response streams count against its budget"""
+        from django.contrib.auth.models import AnonymousUser
+        from django.http import StreamingHttpResponse
+        from django.test import RequestFactory
+        from django.urls import ResolverMatch
+        from .profiling import SQLProfilingMiddleware, query_budget
+        
+        def rows():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                yield b'1\n'
+                cursor.execute("SELECT 2")
+                yield b'2\n'
+        
+        @query_budget(1)
+        def view(request):
+            return StreamingHttpResponse(rows())
+        
+        request = RequestFactory().get('/export/')
+        request.user = AnonymousUser()
+        request.resolver_match = ResolverMatch(view, (), {}, url_name='export')
+        response = SQLProfilingMiddleware(view)(request)
+        self.assertNotIn('Server-Timing', response)
+        with self.assertLogs('search_function.profiling', 'INFO') as logs:
+            self.assertEqual(b''.join(response.streaming_content), b'1\n2\n')
+        self.assertIn('GET /export/: 2 queries', logs.output[0])
+        self.assertIn('ran 2 SQL queries (budget 1)', logs.output[1])
+
+
+class ReplicaRoutingTestCase(TestCase):
+    """Test read replica selection and routing"""
+    
+    def replica_set(self, selection, **states):
+        import time
+        from .routers import ReplicaSet
+        
+        replicas = ReplicaSet(list(states), selection, max_lag=30, check_interval=3600)
+        for alias, (healthy, active, data_version) in states.items():
+            state = replicas.states[alias]
+            state.checked_at = time.monotonic()
+            state.healthy, state.active, state.data_version = healthy, active, data_version
+        return replicas
+    
+    def test_router_sends_request_reads_to_replica(self):
+        """Test reads follow the request's replica until the request writes"""
+        from .models import Provider
+        from .routers import ReplicaRouter, reading_from
+        
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Provider), 'default')
+        with reading_from('replica_1'):
+            self.assertEqual(router.db_for_read(Provider), 'replica_1')
+            self.assertEqual(router.db_for_write(Provider), 'default')
+            self.assertEqual(router.db_for_read(Provider), 'default')
+        self.assertFalse(router.allow_migrate('replica_1', 'search_function'))
+    
+    def test_replica_selection(self):
+        """Test round robin and least-loaded selection skip lagging and stale replicas"""
+        replicas = self.replica_set(
+            'round_robin', a=(True, 0, 5), b=(False, 0, 5), c=(True, 0, 5)
+        )
+        picked = [replicas.acquire() for _ in range(4)]
+        self.assertEqual(sorted(picked), ['a', 'a', 'c', 'c'])
+        for alias in picked:
+            replicas.release(alias)
+        
+        replicas = self.replica_set(
+            'least_loaded', a=(True, 4, 5), b=(True, 1, 5), c=(True, 0, 4)
+        )
+        self.assertEqual(replicas.acquire(), 'c')
+        # Only b has replayed data version 5, whatever its load
+        self.assertEqual(replicas.acquire(min_data_version=5), 'b')
+        self.assertEqual(replicas.acquire(), 'c')
+        self.assertIsNone(replicas.acquire(min_data_version=6))
+    
+    def test_replica_check(self):
+        """Test the lag check on a server that is not a standby"""
+        from .routers import ReplicaSet
+        
+        with self.assertLogs('search_function.routers', 'INFO'):
+            state = ReplicaSet(['default']).check('default')
+        self.assertTrue(state.healthy)
+        self.assertEqual(state.lag, 0)
+    
+    def test_due_check_runs_once(self):
+        """Test requests arriving during a replica check use the previous result"""
+        from unittest import mock
+        from .routers import ReplicaSet
+        
+        replicas = ReplicaSet(['a'], check_interval=5)
+        with mock.patch.object(replicas, 'check') as check:
+            replicas.states['a'].checking = True
+            self.assertEqual(replicas.available(), [])
+            check.assert_not_called()
+            
+            replicas.states['a'].checking = False
+            replicas.available()
+            check.assert_called_once_with('a')
+        self.assertFalse(replicas.states['a'].checking)
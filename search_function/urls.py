@@ -1,64 +1,89 @@
 # search_function/urls.py
 
+from django.conf import settings
 from django.urls import path
 from django.http import JsonResponse
-from . import views
+from . import async_views, views
+from .response_cache import cache_response
+from .stats import STATS_DATA
 from django.shortcuts import render
 
 
 app_name = 'search_function'
 
+# Search, quick search and detail have async versions for ASGI deployments
+search_views = async_views if settings.ASYNC_VIEWS else views
+
 urlpatterns = [
     # Main search endpoint - returns JSON for individual providers only
-    path('api/search/', views.search_providers_view, name='search'),
+    path('api/search/', search_views.search_providers_view, name='search'),
     
     # Quick search for autocomplete
-    path('api/quick-search/', views.quick_search_view, name='quick_search'),
+    path('api/quick-search/', search_views.quick_search_view, name='quick_search'),
     
     # Advanced search with multiple filters
-    path('api/advanced-search/', views.advanced_search_view, name='advanced_search'),
+    path('api/advanced-search/', search_views.advanced_search_view, name='advanced_search'),
     
     # Provider detail view (using NPI internally but not exposed to users)
-    path('api/provider/<str:npi>/', views.provider_detail_view, name='provider_detail'),
+    path('api/provider/<str:npi>/', search_views.provider_detail_view, name='provider_detail'),
+    
+    # Batch NPI lookup (same payload per provider as provider_detail)
+    path('api/providers/batch/', views.provider_batch_view, name='provider_batch'),
+    
+    # Streaming NDJSON/CSV export of search results
+    path('api/export/', views.export_providers_view, name='export'),
+    
+    # Response cache hit/miss counts per endpoint
+    path('api/cache-stats/', views.response_cache_stats_view, name='cache_stats'),
     
     # Database health check
     path('api/health/', views.database_health_check, name='health_check'),
     
     # API endpoints for suggestions
     path('api/states/', 
-         lambda request: JsonResponse({'states': views.get_state_suggestions()}), 
+         cache_response('states', data_versions=(STATS_DATA,))(
+             lambda request: JsonResponse({'states': views.get_state_suggestions()})
+         ), 
          name='api_states'),
     
     path('api/cities/', 
-         lambda request: JsonResponse({
-             'cities': views.get_city_suggestions(
-                 request.GET.get('state'), 
-                 int(request.GET.get('limit', 50))
-             )
-         }), 
+         cache_response('cities', normalized=('state',), data_versions=(STATS_DATA,))(
+             lambda request: JsonResponse({
+                 'cities': views.get_city_suggestions(
+                     request.GET.get('state'), 
+                     int(request.GET.get('limit', 50))
+                 )
+             })
+         ), 
          name='api_cities'),
     
     path('api/taxonomies/', 
-         lambda request: JsonResponse({
-             'taxonomies': views.get_taxonomy_suggestions(
-                 request.GET.get('q'), 
-                 int(request.GET.get('limit', 20))
-             )
-         }), 
+         cache_response('taxonomies', normalized=('q',))(
+             lambda request: JsonResponse({
+                 'taxonomies': views.get_taxonomy_suggestions(
+                     request.GET.get('q'), 
+                     int(request.GET.get('limit', 20))
+                 )
+             })
+         ), 
          name='api_taxonomies'),
     
     path('api/specialty-groups/', 
-         lambda request: JsonResponse({
-             'specialty_groups': views.get_specialty_groups()
-         }), 
+         cache_response('specialty_groups')(
+             lambda request: JsonResponse({
+                 'specialty_groups': views.get_specialty_groups()
+             })
+         ), 
          name='api_specialty_groups'),
     
     path('api/specialty-classifications/', 
-         lambda request: JsonResponse({
-             'classifications': views.get_specialty_classifications(
-                 request.GET.get('group')
-             )
-         }), 
+         cache_response('specialty_classifications', normalized=('group',))(
+             lambda request: JsonResponse({
+                 'classifications': views.get_specialty_classifications(
+                     request.GET.get('group')
+                 )
+             })
+         ), 
          name='api_specialty_classifications'),
 
     path('search/', views.search_interface, 
@@ -1,18 +1,39 @@
 # search_function/views.py
 from django.shortcuts import render
-from django.http import JsonResponse
-from django.db.models import Q, Case, When, IntegerField
-from django.core.paginator import Paginator
+from django.http import JsonResponse, StreamingHttpResponse
+from django.db.models import Q, Case, When, Value, IntegerField, BooleanField, FloatField
+from django.db.models.functions import Least
+from django.db.models.expressions import RawSQL
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 import json
 import re
-from .models import Provider, NuccTaxonomy
+from .models import Provider, ProviderSearch
+from .ingest import FULL_TEXT_CONFIG
+from .phonetic import edit_distance, phonetic_keys
+from .pagination import KeysetPaginator, CountedPaginator, InvalidCursor
+from .counts import COUNT_STRATEGIES, count_results
+from .taxonomy import get_taxonomy_registry
+from .geo import GEO_PARAMS, GeoSearchError, distance_value, filter_by_radius, parse_geo_params
+from .stats import get_provider_stats
+from .response_cache import cache_response, response_cache_stats
+from .serializers import FastJsonResponse, RowSerializer
+from .prepared import prepared_statements
+from .profiling import query_budget
+from .routers import read_connection
+from .export import EXPORT_FORMATS, export_chunks, gzip_chunks
+from .autocomplete import PAYLOAD_FIELDS as AUTOCOMPLETE_PAYLOAD_FIELDS, get_autocomplete_index
+from .npi_snapshot import get_npi_snapshot
 
 
 class ProviderSearchService:
     """Service class to handle all provider search operations"""
     
+    # Parameters that change which providers search_providers matches
+    FILTER_PARAMS = ('q', 'match', 'name', 'first_name', 'last_name', 'city', 'state', 'zip_code', 'specialty', 'phone') + GEO_PARAMS
+    
     @staticmethod
     def normalize_search_term(term):
         """Normalize search terms for better matching"""
@@ -20,21 +41,67 @@ class ProviderSearchService:
             return ""
         return re.sub(r'\s+', ' ', term.strip().lower())
     
+    @staticmethod
+    def canonical_params(params, keys):
+        """Normalized copy of the given search parameters, for cache keys"""
+        canonical = {}
+        for key in keys:
+            value = params.get(key)
+            value = ProviderSearchService.normalize_search_term(str(value) if value is not None else '')
+            if value:
+                canonical[key] = value
+        return canonical
+    
     @staticmethod
     def is_zip_code(term):
         """Check if search term looks like a ZIP code"""
         return bool(re.match(r'^\d{5}(-\d{4})?$', term.strip()))
     
+    @staticmethod
+    def full_text_query(text):
+        """to_tsquery() text for a free-text search: every word, as a prefix
+        
+        "john card" becomes 'john:* & card:*'. Returns '' when the text has
+        no searchable words.
+        """
+        words = re.findall(r'[^\W_]+', ProviderSearchService.normalize_search_term(text))
+        return ' & '.join(f"{word}:*" for word in words)
+    
     @staticmethod
     def search_providers(search_params):
-        """Search providers with various filters - ONLY INDIVIDUALS"""
-        # Start with individual providers only (entity_type_code = '1')
-        queryset = Provider.objects.filter(entity_type_code='1')
+        """Search providers with various filters - ONLY INDIVIDUALS
+        
+        Returns a ProviderSearch queryset: provider_search holds only
+        individual providers, with lowercase copies of the searched text
+        columns so substring filters need no UPPER() on either side.
+        Raises GeoSearchError for unusable radius search parameters.
+        """
+        queryset = ProviderSearch.objects.all()
+        
+        # Ranked full-text search over names, city and specialty, matched
+        # against the GIN-indexed provider_search.search_vector
+        text = search_params.get('q', '').strip()
+        tsquery = ProviderSearchService.full_text_query(text)
+        if text:
+            if tsquery:
+                queryset = queryset.filter(RawSQL(
+                    "provider_search.search_vector @@ to_tsquery(%s, %s)", (FULL_TEXT_CONFIG, tsquery),
+                    output_field=BooleanField()
+                )).annotate(search_rank=RawSQL(
+                    "ts_rank(provider_search.search_vector, to_tsquery(%s, %s))", (FULL_TEXT_CONFIG, tsquery),
+                    output_field=FloatField()
+                ))
+            else:
+                queryset = queryset.none()
         
         # Name search - now split into first and last name
         first_name = search_params.get('first_name', '').strip()
         last_name = search_params.get('last_name', '').strip()
         
+        # match=phonetic finds names that sound alike (Smyth for Smith)
+        # through the indexed Double Metaphone keys instead of substrings
+        phonetic = search_params.get('match') == 'phonetic'
+        
         # Legacy 'name' parameter - try to split it
         name = search_params.get('name', '').strip()
         if name and not first_name and not last_name:
@@ -44,46 +111,55 @@ class ProviderSearchService:
                 last_name = ' '.join(name_parts[1:])
             elif len(name_parts) == 1:
                 # Could be either first or last name, search both
-                queryset = queryset.filter(
-                    Q(first_name__icontains=name) | Q(last_name__icontains=name)
-                )
+                if phonetic:
+                    keys = phonetic_keys(name)
+                    queryset = queryset.filter(
+                        Q(first_name_phonetic__in=keys) | Q(last_name_phonetic__in=keys)
+                    )
+                else:
+                    queryset = queryset.filter(
+                        Q(first_name_lower__contains=name.lower()) | Q(last_name_lower__contains=name.lower())
+                    )
+            else:
+                name = ''
+        else:
+            name = ''
         
         if first_name:
-            queryset = queryset.filter(first_name__icontains=first_name)
+            if phonetic:
+                queryset = queryset.filter(first_name_phonetic__in=phonetic_keys(first_name))
+            else:
+                queryset = queryset.filter(first_name_lower__contains=first_name.lower())
         
         if last_name:
-            queryset = queryset.filter(last_name__icontains=last_name)
+            if phonetic:
+                queryset = queryset.filter(last_name_phonetic__in=phonetic_keys(last_name))
+            else:
+                queryset = queryset.filter(last_name_lower__contains=last_name.lower())
         
         # Location filters
         city = search_params.get('city', '').strip()
         if city:
-            queryset = queryset.filter(practice_city__icontains=city)
+            queryset = queryset.filter(city_lower__contains=city.lower())
         
         state = search_params.get('state', '').strip()
         if state:
-            queryset = queryset.filter(practice_state__iexact=state)
+            queryset = queryset.filter(practice_state=state.upper())
         
         zip_code = search_params.get('zip_code', '').strip()
         if zip_code:
             if ProviderSearchService.is_zip_code(zip_code):
                 # Handle both 5-digit and 9-digit ZIP codes
                 if len(zip_code) == 5:
-                    queryset = queryset.filter(practice_postal_code__startswith=zip_code)
+                    queryset = queryset.filter(zip5=zip_code)
                 else:
                     queryset = queryset.filter(practice_postal_code=zip_code)
         
         # Specialty/taxonomy search
         specialty = search_params.get('specialty', '').strip()
         if specialty:
-            # Search in taxonomy classifications and specializations
-            taxonomy_codes = NuccTaxonomy.objects.filter(
-                Q(classification__icontains=specialty) |
-                Q(specialization__icontains=specialty) |
-                Q(grouping__icontains=specialty)
-            ).values_list('code', flat=True)
-            
-            if taxonomy_codes:
-                queryset = queryset.filter(primary_taxonomy_code__in=taxonomy_codes)
+            # Search in taxonomy classifications, specializations and groupings
+            queryset = queryset.filter(specialty_lower__contains=specialty.lower())
         
         # Phone search
         phone = search_params.get('phone', '').strip()
@@ -93,9 +169,286 @@ class ProviderSearchService:
             if phone_digits:
                 queryset = queryset.filter(practice_phone__contains=phone_digits)
         
-        return queryset.select_related().order_by('last_name', 'first_name')
+        # Radius search around lat/lon or the centroid of near_zip
+        origin = parse_geo_params(search_params)
+        if origin:
+            queryset = filter_by_radius(queryset, origin)
+        
+        phonetic = phonetic and bool(first_name or last_name or name)
+        if phonetic:
+            queryset = ProviderSearchService.rank_by_spelling(queryset, first_name, last_name, name)
+        
+        # npi breaks ties so the ordering is total (required for cursor pagination)
+        ordering = ('last_name', 'first_name', 'npi')
+        if tsquery:
+            ordering = ('-search_rank',) + ordering
+        if phonetic:
+            ordering = ('spelling_rank',) + ordering
+        if search_params.get('sort') == 'distance':
+            if not origin:
+                raise GeoSearchError("sort=distance requires lat/lon or near_zip")
+            ordering = ('distance_miles',) + ordering
+        
+        return queryset.order_by(*ordering)
 
+    @staticmethod
+    def rank_by_spelling(queryset, first_name='', last_name='', name=''):
+        """Annotate phonetic matches with spelling_rank, closest spelling first
+        
+        spelling_rank is the edit distance between the names as typed and
+        the matched spellings; name is a single word that may be either the
+        first or the last name. However many providers sound alike, they
+        share few distinct spellings: those are read in one query (at most
+        PHONETIC_MAX_CANDIDATES per name column), measured in Python and
+        mapped back with a CASE, so every match stays in the results and
+        the count. Spellings past the cap sort after the ranked ones.
+        """
+        if name:
+            typed = {'first_name_lower': name, 'last_name_lower': name}
+        else:
+            typed = {
+                column: text
+                for column, text in (('first_name_lower', first_name), ('last_name_lower', last_name)) if text
+            }
+        
+        cap = settings.PHONETIC_MAX_CANDIDATES
+        spellings = [
+            queryset.order_by().annotate(spelling_column=Value(column))
+            .values_list('spelling_column', column).distinct()[:cap]
+            for column in typed
+        ]
+        spellings = spellings[0].union(*spellings[1:], all=True)
+        
+        by_distance = {column: {} for column in typed}
+        for column, spelling in spellings:
+            by_distance[column].setdefault(edit_distance(typed[column], spelling), []).append(spelling)
+        
+        ranks = []
+        for column, distances in by_distance.items():
+            whens = []
+            for distance, names in sorted(distances.items()):
+                if None in names:
+                    whens.append(When(**{f'{column}__isnull': True}, then=Value(distance)))
+                    names = [spelling for spelling in names if spelling is not None]
+                if names:
+                    whens.append(When(**{f'{column}__in': names}, then=Value(distance)))
+            # No default: unranked spellings are NULL, which sorts last
+            ranks.append(Case(*whens, output_field=IntegerField()) if whens else Value(None, IntegerField()))
+        
+        if name:
+            rank = Least(*ranks)
+        else:
+            rank = ranks[0] if len(ranks) == 1 else ranks[0] + ranks[1]
+        return queryset.annotate(spelling_rank=rank)
+    
+    # Extra filters understood by the advanced search endpoint
+    ADVANCED_PARAMS = ('specialty_group', 'phone_area_code')
+    
+    @staticmethod
+    def advanced_search(search_params):
+        """search_providers plus the advanced-search-only filters"""
+        queryset = ProviderSearchService.search_providers(search_params)
+        
+        specialty_group = search_params.get('specialty_group', '').strip()
+        phone_area_code = search_params.get('phone_area_code', '').strip()
+        
+        if specialty_group:
+            # Filter by taxonomy grouping
+            queryset = queryset.filter(taxonomy_grouping__icontains=specialty_group)
+        
+        if phone_area_code:
+            # Filter by phone area code
+            queryset = queryset.filter(practice_phone__startswith=phone_area_code)
+        
+        return queryset
 
+    @staticmethod
+    def group_by_specialty(queryset, per_group, page=1, group=None, columns=('npi',)):
+        """Group a search queryset by specialty without loading it into Python
+        
+        Returns (group_totals, grouped_rows): the row count of every
+        specialty group (one GROUP BY query over the precomputed
+        specialty_key) and the requested page of at most per_group
+        providers for each group (one ROW_NUMBER() window query), as
+        tuples of columns. Only a bounded number of rows ever leave the
+        database, however many providers match.
+        """
+        try:
+            matched_sql, params = queryset.order_by().query.sql_with_params()
+        except EmptyResultSet:
+            # The filters can match nothing (e.g. no searchable words in q)
+            return {}, {}
+        key_filter = "WHERE specialty_key = %s" if group else ""
+        key_params = [group] if group else []
+        
+        with read_connection().cursor() as cursor:
+            cursor.execute(f"""
+                SELECT specialty_key, COUNT(*)
+                FROM ({matched_sql}) matched
+                {key_filter}
+                GROUP BY specialty_key
+                ORDER BY specialty_key
+            """, [*params, *key_params])
+            group_totals = dict(cursor.fetchall())
+        
+        if not group_totals:
+            return group_totals, {}
+        
+        offset = (page - 1) * per_group
+        with read_connection().cursor() as cursor:
+            cursor.execute(f"""
+                SELECT specialty_key, {', '.join(columns)} FROM (
+                    SELECT matched.*, ROW_NUMBER() OVER (
+                        PARTITION BY specialty_key ORDER BY last_name, first_name, npi
+                    ) AS group_rank
+                    FROM ({matched_sql}) matched
+                    {key_filter}
+                ) ranked
+                WHERE group_rank > %s AND group_rank <= %s
+                ORDER BY specialty_key, group_rank
+            """, [*params, *key_params, offset, offset + per_group])
+            ranked = cursor.fetchall()
+        
+        grouped_rows = {}
+        for row in ranked:
+            grouped_rows.setdefault(row[0], []).append(row[1:])
+        
+        return group_totals, grouped_rows
+
+
+def cursor_unavailable(params):
+    """Error message when keyset pagination can't follow the requested ordering"""
+    if params.get('sort') == 'distance':
+        return 'cursor pagination is not available with sort=distance'
+    if str(params.get('q') or '').strip():
+        return 'cursor pagination is not available with q (results are ranked)'
+    if params.get('match') == 'phonetic':
+        return 'cursor pagination is not available with match=phonetic (results are ranked)'
+    return None
+
+
+def cursor_pagination_info(page_obj):
+    """Pagination block for a keyset page (no page numbers)"""
+    return {
+        'next_cursor': page_obj.next_cursor,
+        'prev_cursor': page_obj.prev_cursor,
+        'has_next': page_obj.has_next(),
+        'has_previous': page_obj.has_previous(),
+        'page_size': page_obj.page_size
+    }
+
+
+def page_number_or_first(value):
+    """Page number from a request parameter; 1 when missing, invalid or below 1"""
+    try:
+        return max(int(value), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def count_info(result_count):
+    """Pagination fields describing how total_results was produced"""
+    return {
+        'total_results': result_count.total,
+        'total_results_display': result_count.display,
+        'total_results_exact': result_count.is_exact,
+        'count_strategy': result_count.strategy
+    }
+
+
+# Output key -> provider_search column for the fields every search result shows
+PROVIDER_RESULT_FIELDS = {
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'middle_name': 'middle_name',
+    'full_name': 'full_name',
+    'address': 'full_address',
+    'phone': 'practice_phone',
+    'city': 'practice_city',
+    'state': 'practice_state',
+    'zip_code': 'practice_postal_code',
+    'distance_miles': 'distance_miles',
+}
+
+# Taxonomy text was joined in when provider_search was built
+TAXONOMY_RESULT_FIELDS = {
+    'taxonomy_description': 'taxonomy_classification',
+    'specialization': 'taxonomy_specialization',
+    'taxonomy_grouping': 'taxonomy_grouping',
+}
+
+# One entry of /api/search/ results
+search_result = RowSerializer(
+    {**PROVIDER_RESULT_FIELDS, **TAXONOMY_RESULT_FIELDS},
+    constants={'entity_type_display': 'Individual'},
+    converters={'distance_miles': distance_value},
+)
+
+# One entry of /api/advanced-search/ results (taxonomy details only when known)
+advanced_search_result = RowSerializer(
+    {
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+        'full_name': 'full_name',
+        'address': 'full_address',
+        'phone': 'practice_phone',
+    },
+    constants={'entity_type_display': 'Individual'},
+    optional={
+        'taxonomy_classification': 'taxonomy_classification',
+        'taxonomy_specialization': 'taxonomy_specialization',
+        'taxonomy_grouping': 'taxonomy_grouping',
+    },
+)
+
+# One provider of a group_by_specialty=true group (taxonomy info only when known)
+grouped_search_result = RowSerializer(
+    PROVIDER_RESULT_FIELDS,
+    constants={'entity_type_display': 'Individual'},
+    optional=TAXONOMY_RESULT_FIELDS,
+    converters={'distance_miles': distance_value},
+)
+
+
+def grouped_search_data(queryset, data, page_size):
+    """Response for group_by_specialty=true: a page of providers per specialty group"""
+    # Group results by specialty group in the database: top page_size
+    # providers per group, optionally paging through a single group
+    group = data.get('group', '').strip() or None
+    group_page = page_number_or_first(data.get('page'))
+    page_size = max(page_size, 1)
+    group_totals, grouped_rows = ProviderSearchService.group_by_specialty(
+        grouped_search_result.annotate(queryset), page_size, page=group_page, group=group,
+        columns=grouped_search_result.columns
+    )
+    
+    specialty_groups = {}
+    groups_info = {}
+    for specialty_key, total in group_totals.items():
+        rows = grouped_rows.get(specialty_key, [])
+        specialty_groups[specialty_key] = [grouped_search_result(row) for row in rows]
+        
+        groups_info[specialty_key] = {
+            'total_results': total,
+            'current_page': group_page,
+            'total_pages': (total + page_size - 1) // page_size,
+            'has_next': group_page * page_size < total,
+            'has_previous': group_page > 1,
+        }
+    
+    return {
+        'grouped_results': specialty_groups,
+        'groups': groups_info,
+        'total_results': sum(group_totals.values()),
+        'search_params': data,
+        'grouped_by': 'specialty',
+        'page_size': page_size
+    }
+
+
+# Data version, ZIP centroid or phonetic spellings, count, page
+@query_budget(4)
+@cache_response('search', normalized=ProviderSearchService.FILTER_PARAMS, echo='search_params')
 def search_providers_view(request):
     """Main search view that handles both GET and POST requests"""
     if request.method == 'POST':
@@ -107,7 +460,14 @@ def search_providers_view(request):
         data = request.GET
     
     # Perform search
-    queryset = ProviderSearchService.search_providers(data)
+    try:
+        queryset = ProviderSearchService.search_providers(data)
+    except GeoSearchError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    count_strategy = data.get('count') or settings.PROVIDER_COUNT_STRATEGY
+    if count_strategy not in COUNT_STRATEGIES:
+        return JsonResponse({'error': f"count must be one of: {', '.join(COUNT_STRATEGIES)}"}, status=400)
     
     # Group results by specialty if requested
     group_by_specialty = data.get('group_by_specialty', 'false').lower() == 'true'
@@ -117,124 +477,84 @@ def search_providers_view(request):
     page_size = min(int(data.get('page_size', 25)), 100)
     
     if group_by_specialty:
-        # Group results by specialty group
-        specialty_groups = {}
-        
-        for provider in queryset:
-            taxonomy = provider.primary_taxonomy
-            specialty_key = 'Unknown Specialty'
-            
-            if taxonomy and taxonomy.grouping:
-                specialty_key = taxonomy.grouping
-            elif taxonomy and taxonomy.classification:
-                specialty_key = taxonomy.classification
-            
-            if specialty_key not in specialty_groups:
-                specialty_groups[specialty_key] = []
-            
-            # Add provider data
-            provider_data = {
-                'entity_type_display': 'Individual',
-                'first_name': provider.first_name,
-                'last_name': provider.last_name,
-                'middle_name': provider.middle_name,
-                'full_name': provider.full_name,
-                'address': provider.full_address,
-                'phone': provider.practice_phone,
-                'city': provider.practice_city,
-                'state': provider.practice_state,
-                'zip_code': provider.practice_postal_code,
-                'distance_miles': getattr(provider, 'distance_miles', 0),
-            }
-            
-            # Add taxonomy info
-            if taxonomy:
-                provider_data.update({
-                    'taxonomy_description': taxonomy.classification,
-                    'specialization': taxonomy.specialization,
-                    'taxonomy_grouping': taxonomy.grouping
-                })
-            
-            specialty_groups[specialty_key].append(provider_data)
-        
-        # Sort each specialty group by last name
-        for specialty in specialty_groups:
-            specialty_groups[specialty] = sorted(
-                specialty_groups[specialty], 
-                key=lambda x: (x['last_name'] or '', x['first_name'] or '')
-            )
-        
-        response_data = {
-            'grouped_results': specialty_groups,
-            'total_results': queryset.count(),
-            'search_params': data,
-            'grouped_by': 'specialty'
-        }
-        
+        response_data = grouped_search_data(queryset, data, page_size)
     else:
-        # Regular paginated results
-        paginator = Paginator(queryset, page_size)
-        page_obj = paginator.get_page(page_number)
-        
-        # Prepare results
-        results = []
-        for provider in page_obj:
-            result = {
-                'entity_type_display': 'Individual',
-                'first_name': provider.first_name,
-                'last_name': provider.last_name,
-                'middle_name': provider.middle_name,
-                'full_name': provider.full_name,
-                'address': provider.full_address,
-                'phone': provider.practice_phone,
-                'city': provider.practice_city,
-                'state': provider.practice_state,
-                'zip_code': provider.practice_postal_code,
-                'distance_miles': getattr(provider, 'distance_miles', 0),
-            }
-            
-            # Add taxonomy description if available
-            taxonomy = provider.primary_taxonomy
-            if taxonomy:
-                result['taxonomy_description'] = taxonomy.classification
-                result['specialization'] = taxonomy.specialization
-                result['taxonomy_grouping'] = taxonomy.grouping
-            else:
-                result['taxonomy_description'] = None
-                result['specialization'] = None
-                result['taxonomy_grouping'] = None
-            
-            results.append(result)
-        
-        response_data = {
-            'results': results,
-            'pagination': {
+        # Regular paginated results: keyset pagination when a cursor is
+        # given (empty cursor = first page), OFFSET pages otherwise; pages
+        # are fetched as tuples of just the columns search_result reads
+        rows = search_result.values(queryset)
+        cursor = data.get('cursor')
+        if cursor is not None and cursor_unavailable(data):
+            return JsonResponse({'error': cursor_unavailable(data)}, status=400)
+        if cursor is not None:
+            try:
+                page_obj = KeysetPaginator(rows, page_size).get_page(cursor)
+            except InvalidCursor:
+                return JsonResponse({'error': 'Invalid cursor'}, status=400)
+            pagination = cursor_pagination_info(page_obj)
+            # Totals are opt-in for cursor pages so deep pages stay cheap
+            if data.get('count'):
+                pagination.update(count_info(count_results(
+                    queryset, count_strategy,
+                    ProviderSearchService.canonical_params(data, ProviderSearchService.FILTER_PARAMS)
+                )))
+        else:
+            result_count = count_results(
+                queryset, count_strategy,
+                ProviderSearchService.canonical_params(data, ProviderSearchService.FILTER_PARAMS)
+            )
+            paginator = CountedPaginator(rows, page_size, result_count)
+            page_obj = paginator.get_page(page_number)
+            pagination = {
                 'current_page': page_obj.number,
                 'total_pages': paginator.num_pages,
-                'total_results': paginator.count,
                 'has_next': page_obj.has_next(),
                 'has_previous': page_obj.has_previous(),
-                'page_size': page_size
-            },
+                'page_size': page_size,
+                **count_info(result_count)
+            }
+        
+        # Prepare results
+        response_data = {
+            'results': [search_result(row) for row in page_obj],
+            'pagination': pagination,
             'search_params': data
         }
     
-    return JsonResponse(response_data)
+    return FastJsonResponse(response_data)
 
 
+# Data version, plus a name search while the prefix index is still loading
+@query_budget(4)
 @require_http_methods(["GET"])
+@cache_response('quick_search', normalized=('q',))
 def quick_search_view(request):
     """Quick search endpoint for autocomplete/suggestions"""
     query = request.GET.get('q', '').strip()
     
+    return JsonResponse({'suggestions': quick_search_suggestions(query)})
+
+
+def quick_search_suggestions(query):
+    """Autocomplete suggestions for a name prefix"""
     if len(query) < 2:
-        return JsonResponse({'suggestions': []})
+        return []
     
-    # Limit to 10 suggestions for performance - individuals only
-    queryset = ProviderSearchService.search_providers({'name': query})[:10]
+    # Prefix lookup in the in-memory autocomplete index - individuals only,
+    # most common names first, no database access
+    index = get_autocomplete_index()
+    if index is not None:
+        entries = index.lookup(query, 10)
+    else:
+        # The worker's index is still loading in the background
+        entries = ProviderSearchService.search_providers({'name': query}).values(*AUTOCOMPLETE_PAYLOAD_FIELDS)[:10]
     
     suggestions = []
-    for provider in queryset:
+    for entry in entries:
+        provider = Provider(
+            entity_type_code='1',
+            **{field: entry[field] for field in AUTOCOMPLETE_PAYLOAD_FIELDS}
+        )
         suggestions.append({
             'first_name': provider.first_name,
             'last_name': provider.last_name,
@@ -244,18 +564,11 @@ def quick_search_view(request):
             'specialty': provider.specialty_description
         })
     
-    return JsonResponse({'suggestions': suggestions})
+    return suggestions
 
 
-@require_http_methods(["GET"])
-def provider_detail_view(request, npi):
-    """Get detailed information for a specific provider"""
-    try:
-        # Only allow individual providers
-        provider = Provider.objects.get(npi=npi, entity_type_code='1')
-    except Provider.DoesNotExist:
-        return JsonResponse({'error': 'Individual provider not found'}, status=404)
-    
+def provider_detail_data(provider):
+    """Detail payload for one provider (shared by the detail and batch endpoints)"""
     # Get taxonomy information
     taxonomy_info = None
     taxonomy = provider.primary_taxonomy
@@ -270,7 +583,7 @@ def provider_detail_view(request, npi):
             'section': taxonomy.section
         }
     
-    provider_data = {
+    return {
         'entity_type_display': 'Individual',
         'first_name': provider.first_name,
         'middle_name': provider.middle_name,
@@ -287,94 +600,192 @@ def provider_detail_view(request, npi):
         'phone': provider.practice_phone,
         'taxonomy': taxonomy_info
     }
+
+
+# Data version, taxonomy version, provider (unless the NPI snapshot has it)
+@query_budget(3)
+@require_http_methods(["GET"])
+@cache_response('provider_detail')
+def provider_detail_view(request, npi):
+    """Get detailed information for a specific provider"""
+    snapshot = get_npi_snapshot()
+    provider = snapshot.get(npi) if snapshot is not None else None
+    if provider is None:
+        try:
+            # Only allow individual providers
+            with prepared_statements():
+                provider = Provider.objects.get(npi=npi, entity_type_code='1')
+        except Provider.DoesNotExist:
+            return JsonResponse({'error': 'Individual provider not found'}, status=404)
+    
+    return JsonResponse(provider_detail_data(provider))
+
+
+# Taxonomy version, one query per BATCH_LOOKUP_CHUNK_SIZE NPIs (two at the defaults)
+@query_budget(3)
+@csrf_exempt
+@require_http_methods(["POST"])
+def provider_batch_view(request):
+    """Look up many individual providers by NPI in one request
+    
+    Accepts {"npis": [...]} (or a bare JSON list) of up to
+    BATCH_LOOKUP_MAX_NPIS NPIs and resolves them from the NPI snapshot,
+    then the rest with one ``npi = ANY(%s)`` query per
+    BATCH_LOOKUP_CHUNK_SIZE NPIs.
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    
+    npis = data.get('npis') if isinstance(data, dict) else data
+    if not isinstance(npis, list):
+        return JsonResponse({'error': 'Expected a list of NPIs in "npis"'}, status=400)
+    if len(npis) > settings.BATCH_LOOKUP_MAX_NPIS:
+        return JsonResponse(
+            {'error': f'At most {settings.BATCH_LOOKUP_MAX_NPIS} NPIs per request'}, status=400
+        )
     
-    return JsonResponse(provider_data)
+    # De-duplicate while keeping request order; malformed NPIs never reach the query
+    requested = list(dict.fromkeys(str(npi).strip() for npi in npis))
+    not_found = {npi: 'Invalid NPI' for npi in requested if not re.match(r'^\d{10}$', npi)}
+    lookup = [npi for npi in requested if npi not in not_found]
+    
+    found = {}
+    snapshot = get_npi_snapshot()
+    if snapshot is not None:
+        for npi, provider in snapshot.get_many(lookup).items():
+            found[npi] = provider_detail_data(provider)
+    missing = [npi for npi in lookup if npi not in found]
+    
+    chunk_size = settings.BATCH_LOOKUP_CHUNK_SIZE
+    for start in range(0, len(missing), chunk_size):
+        with prepared_statements():
+            providers = list(Provider.objects.raw(
+                "SELECT * FROM providers WHERE npi = ANY(%s) AND entity_type_code = '1'",
+                [missing[start:start + chunk_size]]
+            ))
+        for provider in providers:
+            found[provider.npi] = provider_detail_data(provider)
+    
+    for npi in lookup:
+        if npi not in found:
+            not_found[npi] = 'Individual provider not found'
+    
+    return JsonResponse({
+        'found': {npi: found[npi] for npi in lookup if npi in found},
+        'not_found': {npi: not_found[npi] for npi in requested if npi in not_found},
+        'requested': len(requested),
+        'found_count': len(found)
+    })
 
 
+# Data version, ZIP centroid or phonetic spellings, count, page
+@query_budget(4)
 @require_http_methods(["GET"])
+@cache_response(
+    'advanced_search',
+    normalized=ProviderSearchService.FILTER_PARAMS + ProviderSearchService.ADVANCED_PARAMS
+)
 def advanced_search_view(request):
     """Advanced search with multiple filters"""
-    queryset = ProviderSearchService.search_providers(request.GET)
-    
-    # Add additional filters for advanced search
-    specialty_group = request.GET.get('specialty_group', '').strip()
-    phone_area_code = request.GET.get('phone_area_code', '').strip()
-    
-    if specialty_group:
-        # Filter by taxonomy grouping
-        taxonomy_codes = NuccTaxonomy.objects.filter(
-            grouping__icontains=specialty_group
-        ).values_list('code', flat=True)
-        queryset = queryset.filter(primary_taxonomy_code__in=taxonomy_codes)
-    
-    if phone_area_code:
-        # Filter by phone area code
-        queryset = queryset.filter(practice_phone__startswith=phone_area_code)
+    try:
+        queryset = ProviderSearchService.advanced_search(request.GET)
+    except GeoSearchError as e:
+        return JsonResponse({'error': str(e)}, status=400)
     
     # Pagination
     page_number = request.GET.get('page', 1)
     page_size = min(int(request.GET.get('page_size', 50)), 100)
     
-    paginator = Paginator(queryset, page_size)
-    page_obj = paginator.get_page(page_number)
-    
-    # Prepare results with additional detail for advanced search
-    results = []
-    for provider in page_obj:
-        result = {
-            'entity_type_display': 'Individual',
-            'first_name': provider.first_name,
-            'last_name': provider.last_name,
-            'full_name': provider.full_name,
-            'address': provider.full_address,
-            'phone': provider.practice_phone,
-        }
-        
-        # Add taxonomy details
-        taxonomy = provider.primary_taxonomy
-        if taxonomy:
-            result.update({
-                'taxonomy_classification': taxonomy.classification,
-                'taxonomy_specialization': taxonomy.specialization,
-                'taxonomy_grouping': taxonomy.grouping
-            })
-        
-        results.append(result)
+    count_strategy = request.GET.get('count') or settings.PROVIDER_COUNT_STRATEGY
+    if count_strategy not in COUNT_STRATEGIES:
+        return JsonResponse({'error': f"count must be one of: {', '.join(COUNT_STRATEGIES)}"}, status=400)
+    count_params = ProviderSearchService.canonical_params(
+        request.GET, ProviderSearchService.FILTER_PARAMS + ProviderSearchService.ADVANCED_PARAMS
+    )
     
-    response_data = {
-        'results': results,
-        'pagination': {
+    rows = advanced_search_result.values(queryset)
+    cursor = request.GET.get('cursor')
+    if cursor is not None and cursor_unavailable(request.GET):
+        return JsonResponse({'error': cursor_unavailable(request.GET)}, status=400)
+    if cursor is not None:
+        try:
+            page_obj = KeysetPaginator(rows, page_size).get_page(cursor)
+        except InvalidCursor:
+            return JsonResponse({'error': 'Invalid cursor'}, status=400)
+        pagination = cursor_pagination_info(page_obj)
+        if request.GET.get('count'):
+            pagination.update(count_info(count_results(queryset, count_strategy, count_params)))
+    else:
+        result_count = count_results(queryset, count_strategy, count_params)
+        paginator = CountedPaginator(rows, page_size, result_count)
+        page_obj = paginator.get_page(page_number)
+        pagination = {
             'current_page': page_obj.number,
             'total_pages': paginator.num_pages,
-            'total_results': paginator.count,
             'has_next': page_obj.has_next(),
             'has_previous': page_obj.has_previous(),
+            **count_info(result_count)
         }
+    
+    # Prepare results with additional detail for advanced search
+    response_data = {
+        'results': [advanced_search_result(row) for row in page_obj],
+        'pagination': pagination
     }
     
-    return JsonResponse(response_data)
+    return FastJsonResponse(response_data)
+
+
+@require_http_methods(["GET"])
+def export_providers_view(request):
+    """Stream every provider matching the search parameters as NDJSON or CSV"""
+    export_format = request.GET.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}, status=400)
+    
+    try:
+        queryset = ProviderSearchService.search_providers(request.GET)
+    except GeoSearchError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    # Rows are read after the view returns, outside the request's routing
+    queryset = queryset.using(queryset.db)
+    chunks = export_chunks(queryset, export_format, settings.EXPORT_CHUNK_SIZE)
+    
+    content_type, extension = EXPORT_FORMATS[export_format]
+    use_gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    response = StreamingHttpResponse(
+        gzip_chunks(chunks) if use_gzip else chunks, content_type=content_type
+    )
+    if use_gzip:
+        response['Content-Encoding'] = 'gzip'
+    response['Vary'] = 'Accept-Encoding'
+    response['Content-Disposition'] = f'attachment; filename="providers.{extension}"'
+    return response
+
+
+@require_http_methods(["GET"])
+def response_cache_stats_view(request):
+    """Hit/miss counts of the response cache, per endpoint, for this worker"""
+    return JsonResponse(response_cache_stats())
 
 
 @require_http_methods(["GET"])
 def database_health_check(request):
     """Check database connectivity and return basic stats"""
     try:
-        # Count individual providers only
-        total_individual_providers = Provider.objects.filter(entity_type_code='1').count()
-        
-        # Get state distribution for individuals
-        states = Provider.objects.filter(
-            entity_type_code='1'
-        ).exclude(
-            practice_state__isnull=True
-        ).exclude(
-            practice_state__exact=''
-        ).values_list('practice_state', flat=True).distinct()
+        with read_connection().cursor() as cursor:
+            cursor.execute("SELECT 1")
+        
+        # Counts come from the snapshot ingestion refreshes, not a table scan
+        stats = get_provider_stats()
         
         return JsonResponse({
             'status': 'healthy',
-            'total_individual_providers': total_individual_providers,
-            'states_with_providers': len(states),
+            'total_individual_providers': stats.total_individual_providers,
+            'states_with_providers': len(stats.states),
+            'stats_refreshed_at': stats.refreshed_at,
             'database_connection': 'ok'
         })
     except Exception as e:
@@ -398,50 +809,19 @@ def get_state_suggestions():
     ]
     
     # Filter to only states that have individual providers
-    states_with_providers = Provider.objects.filter(
-        entity_type_code='1',
-        practice_state__in=us_states
-    ).exclude(
-        practice_state__isnull=True
-    ).exclude(
-        practice_state__exact=''
-    ).values_list('practice_state', flat=True).distinct().order_by('practice_state')
-    
-    return list(states_with_providers)
+    states_with_providers = get_provider_stats().state_counts
+    return [state for state in sorted(us_states) if state in states_with_providers]
 
 
 def get_city_suggestions(state=None, limit=50):
     """Get list of cities, optionally filtered by state - individuals only"""
-    queryset = Provider.objects.filter(entity_type_code='1').exclude(
-        practice_city__isnull=True
-    ).exclude(
-        practice_city__exact=''
-    )
-    
-    if state:
-        queryset = queryset.filter(practice_state__iexact=state)
-    
-    cities = queryset.values_list(
-        'practice_city', flat=True
-    ).distinct().order_by('practice_city')[:limit]
-    
-    return list(cities)
+    return get_provider_stats().cities(state, limit)
 
 
 def get_taxonomy_suggestions(query=None, limit=20):
-    """Get taxonomy suggestions for autocomplete"""
-    queryset = NuccTaxonomy.objects.all()
-    
-    if query and len(query) >= 2:
-        queryset = queryset.filter(
-            Q(classification__icontains=query) |
-            Q(specialization__icontains=query) |
-            Q(grouping__icontains=query) |
-            Q(code__icontains=query)
-        )
-    
+    """Get taxonomy suggestions for autocomplete (served from the in-memory registry)"""
     suggestions = []
-    for taxonomy in queryset[:limit]:
+    for taxonomy in get_taxonomy_registry().search(query, limit):
         display_name = taxonomy.classification
         if taxonomy.specialization:
             display_name += f" - {taxonomy.specialization}"
@@ -459,31 +839,12 @@ def get_taxonomy_suggestions(query=None, limit=20):
 
 def get_specialty_groups():
     """Get all unique specialty groups"""
-    groups = NuccTaxonomy.objects.exclude(
-        grouping__isnull=True
-    ).exclude(
-        grouping__exact=''
-    ).values_list('grouping', flat=True).distinct().order_by('grouping')
-    
-    return list(groups)
+    return list(get_taxonomy_registry().groups)
 
 
 def get_specialty_classifications(group=None):
     """Get specialty classifications, optionally filtered by group"""
-    queryset = NuccTaxonomy.objects.exclude(
-        classification__isnull=True
-    ).exclude(
-        classification__exact=''
-    )
-    
-    if group:
-        queryset = queryset.filter(grouping__icontains=group)
-    
-    classifications = queryset.values_list(
-        'classification', flat=True
-    ).distinct().order_by('classification')
-    
-    return list(classifications)
+    return get_taxonomy_registry().classifications(group)
 
 def search_interface(request):
     """Serve the HTML search interface"""